@@ -1,3 +1,5 @@
+from .batch_proposal_agent import BatchProposalAgent
+from .detect_and_propose_agent import DetectAndProposeAgent
 from .fix_agent import FixAgent
 from .proposal_agent import ProposalAgent
 from .quick_actions import (
@@ -11,12 +13,16 @@ from .quick_actions import (
     SummarizeAgent,
 )
 from .sentence_rewrite_agent import SentenceRewriteAgent
+from .verification_agent import VerificationAgent
 from .violation_detection_agent import ViolationDetectionAgent
 from .word_synonym_agent import WordSynonymAgent
 
 __all__ = [
     "ViolationDetectionAgent",
+    "DetectAndProposeAgent",
     "ProposalAgent",
+    "BatchProposalAgent",
+    "VerificationAgent",
     "FixAgent",
     "SentenceRewriteAgent",
     "WordSynonymAgent",
@@ -0,0 +1,98 @@
+import hashlib
+
+from dcc_backend_common.llm_agent import Preprocessor
+from pydantic_ai import Agent, RunContext
+from pydantic_ai.models import Model
+
+from text_mate_backend.agents.agent_utils import build_agent_metadata
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
+from text_mate_backend.models.rule_models import BatchProposalItem, BatchProposalRequest, BatchProposalResult
+from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
+
+INSTRUCTION = """Du bist ein Experte für Redaktionsrichtlinien. In einem vorherigen Schritt \
+wurden Verstösse gegen Regeln gefunden. Deine einzige Aufgabe ist es nun, für **jeden** \
+Verstoss einen **konkreten, umsetzbaren Verbesserungsvorschlag** zu formulieren.
+
+## Arbeitsweise
+1. Lies für jeden Verstoss die zugehörige Regel (über `rule_name`), den Verstoss (`source`), \
+die Begründung (`reason`) und den Kontextsatz.
+2. Formuliere `proposal` als konkreten Ersatz für den `source`-Ausschnitt, der die Absicht \
+der Autorin oder des Autors bewahrt und die Regel erfüllt.
+3. Der Vorschlag muss sprachlich und grammatikalisch in den Kontextsatz passen.
+4. Gib im Feld `proposal` ausschliesslich den Vorschlag als reinen Text aus — keine \
+Erklärung, kein Markdown, keine Anführungszeichen.
+5. Gib genau einen Eintrag pro Verstoss zurück und übernimm dessen `id` unverändert.
+
+## Regeldokumentation
+---------------
+{rules}
+---------------
+
+## Verstösse
+Die Verstösse haben folgendes Format:
+---------------
+{item_model_description}
+---------------
+
+{items}
+
+## Output Format
+Generiere deine Antwort entsprechend diesem Schema:
+---------------
+{output_model_description}
+---------------
+
+Antworte in der Sprache des Eingabetextes."""
+
+# Changes whenever the instruction changes, so cached proposals of an older
+# prompt are never served.
+PROMPT_VERSION = hashlib.sha256(INSTRUCTION.encode()).hexdigest()[:16]
+
+
+def render_instruction(deps: BatchProposalRequest) -> str:
+    """The instruction sent for ``deps``; also used to estimate prompt sizes."""
+    return INSTRUCTION.format(
+        rules="\n".join(rule.prompt_json for rule in deps.rules),
+        item_model_description=BatchProposalItem.model_json_schema(),
+        items="\n".join(item.model_dump_json() for item in deps.items),
+        output_model_description=BatchProposalResult.model_json_schema(),
+    )
+
+
+class BatchProposalAgent(ScheduledAgent[BatchProposalRequest, BatchProposalResult]):
+    """Generates proposals for several violations of one rule batch in a single call."""
+
+    priority = LlmPriority.ADVISOR_PROPOSAL
+
+    def __init__(self, config: Configuration):
+        super().__init__(
+            config,
+            deps_type=BatchProposalRequest,
+            output_type=BatchProposalResult,
+            enable_thinking=False,
+        )
+
+    def _get_postprocessors(self) -> list[Preprocessor]:
+        return []
+
+    def create_agent(self, model: Model):
+        agent = Agent(
+            model=model,
+            deps_type=BatchProposalRequest,
+            output_type=BatchProposalResult,
+            name="Batch Proposal Agent",
+            description="Generates concrete improvement proposals for several editorial rule violations at once",
+            metadata=lambda ctx: build_agent_metadata(
+                "batch_proposal",
+                output_type="BatchProposalResult",
+                item_count=len(ctx.deps.items),
+                rule_count=len(ctx.deps.rules),
+            ),
+        )
+
+        @agent.instructions
+        def get_instruction(ctx: RunContext[BatchProposalRequest]):
+            return render_instruction(ctx.deps)
+
+        return agent
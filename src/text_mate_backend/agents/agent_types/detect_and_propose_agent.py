@@ -0,0 +1,116 @@
+import hashlib
+
+from dcc_backend_common.llm_agent import Preprocessor
+from pydantic_ai import Agent, RunContext
+from pydantic_ai.models import Model
+
+from text_mate_backend.agents.agent_utils import build_agent_metadata
+from text_mate_backend.agents.rule_prompt import RULE_FORMAT, render_rules, schema_text
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
+from text_mate_backend.models.rule_models import CombinedResult, RulesContainer
+from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
+
+INSTRUCTION = """Du bist ein Experte für Redaktionsrichtlinien. Du prüfst den Eingabetext \
+ausschliesslich anhand der untenstehenden Regeln, findest die Verstösse und formulierst für \
+jeden Verstoss direkt einen **konkreten, umsetzbaren Verbesserungsvorschlag**.
+
+## Arbeitsweise
+1. Prüfe den Text sorgfältig gegen jede einzelne Regel.
+2. Für jedes Feld `source`: Kopiere den **exakten Textausschnitt** aus dem Eingabetext, der \
+gegen die Regel verstösst. Kopiere ihn Wort für Wort, inklusive aller Leerzeichen und \
+Satzzeichen. Beschränke dich auf den **minimalen** Ausschnitt, der den Verstoss enthält \
+(z. B. ein einzelnes Wort oder eine kurze Wendung, nicht den ganzen Satz).
+3. Gib `rule_name` exakt so an, wie er in der Regeldokumentation steht.
+4. Formuliere `reason` als kurze Beschreibung, **warum** der Textausschnitt gegen die Regel \
+verstösst.
+5. Formuliere `proposal` als konkreten Ersatz für den `source`-Ausschnitt, der die Absicht \
+der Autorin oder des Autors bewahrt, die Regel erfüllt und sprachlich und grammatikalisch in \
+den Satz passt. Nur der Ersatztext — keine Erklärung, kein Markdown, keine Anführungszeichen.
+6. Wenn es keine relevanten Verstösse gibt, gib eine leere Liste zurück.
+
+Die Regeln haben follgendes Format:
+---------------
+{input_model_description}
+---------------
+
+## Regeldokumentation
+---------------
+{rules}
+---------------
+
+## Output Format
+Generiere deine Antwort ensprechen diesem Schema:
+---------------
+{output_model_description}
+---------------
+
+## Beispiele
+
+Eingabetext: «Die Zeitung "Der Bund" berichtete über 3 neue Gesetze.»
+
+Gute Meldung 1:
+  rule_name: "Guillemets als Anführungszeichen verwenden"
+  source: ""Der Bund""
+  reason: "Es werden gerade Anführungszeichen statt Guillemets verwendet."
+  proposal: "«Der Bund»"
+
+Gute Meldung 2:
+  rule_name: "Kurze Zahlen im Fliesstext ausschreiben"
+  source: "3"
+  reason: "Kurze Zahlen bis zwölf sollten im Fliesstext ausgeschrieben werden."
+  proposal: "drei"
+
+Antworte in der Sprache des Eingabetextes."""
+
+# Changes whenever the instruction changes, so cached results of an older
+# prompt are never served.
+PROMPT_VERSION = hashlib.sha256(INSTRUCTION.encode()).hexdigest()[:16]
+
+
+def render_instruction(deps: RulesContainer) -> str:
+    """The instruction sent for ``deps``; also used to estimate prompt sizes."""
+    return INSTRUCTION.format(
+        rules=render_rules(deps.rules),
+        input_model_description=RULE_FORMAT,
+        output_model_description=schema_text(CombinedResult),
+    )
+
+
+class DetectAndProposeAgent(ScheduledAgent[RulesContainer, CombinedResult]):
+    """Detection and proposals in one call: the advisor's fast path for short texts."""
+
+    priority = LlmPriority.ADVISOR_DETECTION
+
+    def __init__(self, config: Configuration):
+        super().__init__(
+            config,
+            deps_type=RulesContainer,
+            output_type=CombinedResult,
+            enable_thinking=True,
+        )
+
+    def _get_postprocessors(self) -> list[Preprocessor]:
+        return []
+
+    def create_agent(self, model: Model):
+        agent = Agent(
+            model=model,
+            deps_type=RulesContainer,
+            output_type=CombinedResult,
+            name="Detect and Propose Agent",
+            description="Detects violations of editorial rules in a short text and proposes a fix for each",
+            metadata=lambda ctx: build_agent_metadata(
+                "detect_and_propose",
+                enable_thinking=True,
+                output_type="CombinedResult",
+                rule_count=len(ctx.deps.rules),
+                rule_collections=sorted(ctx.deps.document_names),
+            ),
+        )
+
+        @agent.instructions
+        def get_instruction(ctx: RunContext[RulesContainer]):
+            return render_instruction(ctx.deps)
+
+        return agent
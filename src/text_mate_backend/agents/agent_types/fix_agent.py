@@ -1,12 +1,13 @@
 from typing import override
 
-from dcc_backend_common.llm_agent import BaseAgent
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models import Model
 
 from text_mate_backend.agents.agent_utils import build_agent_metadata
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
 from text_mate_backend.models.fix_models import FixRequest
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
 
 INSTRUCTION = """Du bist ein Experte für Textkorrektur. Du erhältst einen Eingabetext und eine \
 Liste von Korrekturen. Deine Aufgabe ist es, einen vollständigen, korrigierten Text \
@@ -35,7 +36,9 @@ keinen Schlusskommentar, kein Markdown, keine HTML-Tags.
 Antworte in der Sprache des Eingabetextes."""
 
 
-class FixAgent(BaseAgent[FixRequest, str]):
+class FixAgent(ScheduledAgent[FixRequest, str]):
+    priority = LlmPriority.QUICK_ACTION
+
     def __init__(self, config: Configuration):
         super().__init__(config, deps_type=FixRequest, output_type=str)
 
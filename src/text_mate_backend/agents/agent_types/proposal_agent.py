@@ -1,10 +1,14 @@
-from dcc_backend_common.llm_agent import BaseAgent, Preprocessor
+import hashlib
+
+from dcc_backend_common.llm_agent import Preprocessor
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models import Model
 
 from text_mate_backend.agents.agent_utils import build_agent_metadata
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
 from text_mate_backend.models.rule_models import ProposalRequest
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
 
 INSTRUCTION = """Du bist ein Experte für Redaktionsrichtlinien. In einem vorherigen Schritt \
 wurde ein Verstoss gegen eine Regel gefunden. Deine einzige Aufgabe ist es nun, einen \
@@ -40,8 +44,24 @@ keine Anführungszeichen, kein Einleitungstext.
 
 Antworte in der Sprache des Eingabetextes."""
 
+# Changes whenever the instruction changes, so cached proposals of an older
+# prompt are never served.
+PROMPT_VERSION = hashlib.sha256(INSTRUCTION.encode()).hexdigest()[:16]
+
+
+def render_instruction(deps: ProposalRequest) -> str:
+    """The instruction sent for ``deps``; also used to estimate prompt sizes."""
+    return INSTRUCTION.format(
+        rule=deps.rule.prompt_json,
+        source=deps.source,
+        reason=deps.reason,
+        context_sentence=deps.context_sentence,
+    )
+
+
+class ProposalAgent(ScheduledAgent[ProposalRequest, str]):
+    priority = LlmPriority.ADVISOR_PROPOSAL
 
-class ProposalAgent(BaseAgent[ProposalRequest, str]):
     def __init__(self, config: Configuration):
         super().__init__(
             config,
@@ -71,12 +91,6 @@ class ProposalAgent(BaseAgent[ProposalRequest, str]):
 
         @agent.instructions
         def get_instruction(ctx: RunContext[ProposalRequest]):
-            deps = ctx.deps
-            return INSTRUCTION.format(
-                rule=deps.rule.model_dump_json(),
-                source=deps.source,
-                reason=deps.reason,
-                context_sentence=deps.context_sentence,
-            )
+            return render_instruction(ctx.deps)
 
         return agent
@@ -1,16 +1,19 @@
 from abc import abstractmethod
 from typing import override
 
-from dcc_backend_common.llm_agent import BaseAgent
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models import Model
 
 from text_mate_backend.agents.agent_utils import build_agent_metadata, get_language_instruction
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
 from text_mate_backend.models.quick_actions_models import QuickActionContext
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
 
 
-class QuickActionBaseAgent(BaseAgent):
+class QuickActionBaseAgent(ScheduledAgent):
+    priority = LlmPriority.QUICK_ACTION
+
     def __init__(self, config: Configuration, enable_thinking: bool = False):
         super().__init__(config, deps_type=QuickActionContext, output_type=str, enable_thinking=enable_thinking)
 
@@ -0,0 +1,93 @@
+from dcc_backend_common.llm_agent import Preprocessor
+from pydantic_ai import Agent, RunContext
+from pydantic_ai.models import Model
+
+from text_mate_backend.agents.agent_utils import build_agent_metadata
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
+from text_mate_backend.models.rule_models import ProposalRequest, VerificationResult
+from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
+
+INSTRUCTION = """Du bist ein Experte für Redaktionsrichtlinien. Ein Textausschnitt wurde \
+als möglicher Verstoss gegen eine Regel gemeldet, die Meldung ist aber unsicher. Deine \
+einzige Aufgabe ist es zu entscheiden, ob der Ausschnitt in seinem Kontext **tatsächlich** \
+gegen die Regel verstösst.
+
+## Regel
+---------------
+{rule}
+---------------
+
+## Ausschnitt (source)
+---------------
+{source}
+---------------
+
+## Gemeldete Begründung (reason)
+---------------
+{reason}
+---------------
+
+## Kontext
+---------------
+{context_sentence}
+---------------
+
+Antworte mit `violated: true` nur, wenn der Verstoss eindeutig ist, sonst mit \
+`violated: false`. Gib keine Erklärung aus."""
+
+
+def render_instruction(deps: ProposalRequest) -> str:
+    """The instruction sent for ``deps``; also used to estimate prompt sizes."""
+    return INSTRUCTION.format(
+        rule=deps.rule.prompt_json,
+        source=deps.source,
+        reason=deps.reason,
+        context_sentence=deps.context_sentence,
+    )
+
+
+class VerificationAgent(ScheduledAgent[ProposalRequest, VerificationResult]):
+    """Yes/no check of one low-agreement advisor candidate.
+
+    Runs on ``llm_verification_model`` when configured, so the checks can use a
+    smaller model than detection and proposals.
+    """
+
+    # The answer decides whether a proposal is requested, so it is detection work.
+    priority = LlmPriority.ADVISOR_DETECTION
+
+    def __init__(self, config: Configuration):
+        if config.llm_verification_model:
+            config = config.model_copy(update={"llm_model": config.llm_verification_model})
+        super().__init__(
+            config,
+            deps_type=ProposalRequest,
+            output_type=VerificationResult,
+            enable_thinking=False,
+        )
+
+    def _get_postprocessors(self) -> list[Preprocessor]:
+        return []
+
+    def create_agent(self, model: Model):
+        agent = Agent(
+            model=model,
+            deps_type=ProposalRequest,
+            output_type=VerificationResult,
+            name="Verification Agent",
+            description="Confirms or rejects a single uncertain editorial rule violation",
+            metadata=lambda ctx: build_agent_metadata(
+                "verification",
+                output_type="VerificationResult",
+                rule_name=ctx.deps.rule.name,
+                source_length=len(ctx.deps.source),
+                context_length=len(ctx.deps.context_sentence),
+            ),
+        )
+
+        @agent.instructions
+        def get_instruction(ctx: RunContext[ProposalRequest]):
+            return render_instruction(ctx.deps)
+
+        return agent
@@ -1,10 +1,15 @@
-from dcc_backend_common.llm_agent import BaseAgent, Preprocessor
+import hashlib
+
+from dcc_backend_common.llm_agent import Preprocessor
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models import Model
 
 from text_mate_backend.agents.agent_utils import build_agent_metadata
+from text_mate_backend.agents.rule_prompt import RULE_FORMAT, render_rules, schema_text
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
 from text_mate_backend.models.rule_models import DetectionResult, RulesContainer
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
 
 INSTRUCTION = """Du bist ein Experte für Redaktionsrichtlinien. Du prüfst den Eingabetext \
 ausschliesslich anhand der untenstehenden Regeln. In diesem Schritt geht es nur darum, \
@@ -53,8 +58,23 @@ Gute Meldung 2:
 
 Antworte in der Sprache des Eingabetextes."""
 
+# Changes whenever the instruction changes, so cached detections of an older
+# prompt are never served.
+PROMPT_VERSION = hashlib.sha256(INSTRUCTION.encode()).hexdigest()[:16]
+
+
+def render_instruction(deps: RulesContainer) -> str:
+    """The instruction sent for ``deps``; also used to estimate prompt sizes."""
+    return INSTRUCTION.format(
+        rules=render_rules(deps.rules),
+        input_model_description=RULE_FORMAT,
+        output_model_description=schema_text(DetectionResult),
+    )
+
+
+class ViolationDetectionAgent(ScheduledAgent[RulesContainer, DetectionResult]):
+    priority = LlmPriority.ADVISOR_DETECTION
 
-class ViolationDetectionAgent(BaseAgent[RulesContainer, DetectionResult]):
     def __init__(self, config: Configuration):
         super().__init__(
             config,
@@ -84,10 +104,6 @@ class ViolationDetectionAgent(BaseAgent[RulesContainer, DetectionResult]):
 
         @agent.instructions
         def get_instruction(ctx: RunContext[RulesContainer]):
-            return INSTRUCTION.format(
-                rules=ctx.deps.model_dump_json(),
-                input_model_description=RulesContainer.model_json_schema(),
-                output_model_description=DetectionResult.model_json_schema(),
-            )
+            return render_instruction(ctx.deps)
 
         return agent
@@ -1,12 +1,13 @@
 from typing import override
 
-from dcc_backend_common.llm_agent import BaseAgent
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models import Model
 
 from text_mate_backend.agents.agent_utils import build_agent_metadata
+from text_mate_backend.agents.scheduled_agent import ScheduledAgent
 from text_mate_backend.models.word_synonym_models import WordSynonymInput, WordSynonymResult
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority
 
 INSTRUCTION = """
 Du bist ein Experte für Sprache und Synonyme. Deine Aufgabe ist es,
@@ -29,7 +30,9 @@ Kontext:
 """
 
 
-class WordSynonymAgent(BaseAgent):
+class WordSynonymAgent(ScheduledAgent):
+    priority = LlmPriority.INTERACTIVE
+
     def __init__(self, config: Configuration):
         super().__init__(config, deps_type=WordSynonymInput, output_type=WordSynonymResult)
 
@@ -0,0 +1,24 @@
+"""Compact rendering of advisor rules and output schemas for the detection prompts."""
+
+import json
+from functools import cache
+
+from pydantic import BaseModel
+
+from text_mate_backend.models.rule_models import Rule
+
+RULE_FORMAT = (
+    "Jede Regel ist ein Block: eine Zeile «### <Name der Regel>», darauf die Beschreibung "
+    "und eine Zeile «Beispiel: <Beispiel>». Die Blöcke sind durch Leerzeilen getrennt."
+)
+
+
+def render_rules(rules: list[Rule]) -> str:
+    """``Rule.prompt_block`` of each rule, separated by blank lines."""
+    return "\n\n".join(rule.prompt_block for rule in rules)
+
+
+@cache
+def schema_text(model: type[BaseModel]) -> str:
+    """Compact JSON schema of ``model``; computed once per type."""
+    return json.dumps(model.model_json_schema(), ensure_ascii=False, separators=(",", ":"))
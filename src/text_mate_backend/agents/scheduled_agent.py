@@ -0,0 +1,67 @@
+from collections.abc import AsyncGenerator
+from typing import Any, ClassVar, override
+
+from dcc_backend_common.llm_agent import BaseAgent, UserPrompt
+from pydantic_ai import AgentRunResultEvent, AgentStreamEvent
+
+from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.llm_scheduler import LlmPriority, LlmScheduler, get_llm_scheduler
+
+
+class ScheduledAgent[DepsType, OutputType](BaseAgent[DepsType, OutputType]):
+    """BaseAgent whose model calls are admitted by the process-wide LlmScheduler.
+
+    Subclasses set ``priority`` to their class of traffic. Streaming runs hold
+    their slot until the stream is exhausted or closed. ``run_stream_text`` is not
+    overridden because it delegates to ``run_stream_events``.
+    """
+
+    priority: ClassVar[LlmPriority] = LlmPriority.QUICK_ACTION
+
+    def __init__(
+        self,
+        config: Configuration,
+        deps_type: type[DepsType] | None = None,
+        output_type: type[OutputType] | None = None,
+        enable_thinking: bool = False,
+    ):
+        super().__init__(config, deps_type=deps_type, output_type=output_type, enable_thinking=enable_thinking)
+        self.scheduler: LlmScheduler = get_llm_scheduler(config.llm_max_in_flight)
+
+    @override
+    async def run(self, user_prompt: UserPrompt = None, deps: DepsType | None = None, **kwargs: Any) -> OutputType:
+        async with self.scheduler.slot(self.priority):
+            return await super().run(user_prompt, deps=deps, **kwargs)
+
+    @override
+    async def stream_list[T](
+        self,
+        user_prompt: UserPrompt = None,
+        deps: DepsType | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[T, None]:
+        async with self.scheduler.slot(self.priority):
+            async for item in super().stream_list(user_prompt, deps=deps, **kwargs):
+                yield item
+
+    @override
+    async def run_stream_output(
+        self,
+        user_prompt: UserPrompt = None,
+        deps: DepsType | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[Any, None]:
+        async with self.scheduler.slot(self.priority):
+            async for chunk in super().run_stream_output(user_prompt, deps=deps, **kwargs):
+                yield chunk
+
+    @override
+    async def run_stream_events(
+        self,
+        user_prompt: UserPrompt = None,
+        deps: DepsType | None = None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[AgentStreamEvent | AgentRunResultEvent[OutputType]]:
+        async with self.scheduler.slot(self.priority):
+            async for event in super().run_stream_events(user_prompt, deps=deps, **kwargs):
+                yield event
@@ -73,6 +73,8 @@ def create_app() -> FastAPI:
         if not config.disable_auth:
             await container.azure_service().load_config()
         yield
+        await container.advisor_job_service().close()
+        container.advisor_service().close()
 
     app = FastAPI(
         title="Text Mate API",
@@ -3,6 +3,7 @@ from dependency_injector import containers, providers
 
 from text_mate_backend.services.actions.quick_action_service import QuickActionService
 from text_mate_backend.services.advisor import AdvisorService
+from text_mate_backend.services.advisor_jobs import AdvisorJobService
 from text_mate_backend.services.azure_service import AzureService
 from text_mate_backend.services.document_conversion_service import DocumentConversionService
 from text_mate_backend.services.fix_service import FixService
@@ -27,6 +28,12 @@ class Container(containers.DeclarativeContainer):
         config=config,
     )
 
+    advisor_job_service: providers.Singleton[AdvisorJobService] = providers.Singleton(
+        AdvisorJobService,
+        config=config,
+        advisor_service=advisor_service,
+    )
+
     fix_service: providers.Singleton[FixService] = providers.Singleton(
         FixService,
         config=config,
@@ -0,0 +1,80 @@
+"""Events of the versioned advisor validation stream.
+
+``POST /advisor/validate`` streams ``RulesValidationContainer`` items unless the
+client asks for events with the ``X-Advisor-Stream`` request header. Each event
+is one JSON line whose ``type`` tells the kinds apart; ``seq`` numbers the events
+of a stream from 0.
+
+The same events are replayed by the advisor job API
+(``GET /advisor/jobs/{id}/events``), which ends a failed or abandoned job
+with an ``error`` event instead of ``done``.
+"""
+
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+from text_mate_backend.models.rule_models import ViolationResult
+
+ADVISOR_STREAM_HEADER = "X-Advisor-Stream"
+ADVISOR_STREAM_CONTAINERS = "containers"
+"""Default: one ``RulesValidationContainer`` per progress step."""
+ADVISOR_STREAM_EVENTS_V1 = "events.v1"
+ADVISOR_STREAM_FORMATS = (ADVISOR_STREAM_CONTAINERS, ADVISOR_STREAM_EVENTS_V1)
+
+
+class ProgressEvent(BaseModel):
+    """Counters after a stage of the check made progress."""
+
+    type: Literal["progress"] = "progress"
+    seq: int = Field(description="Position of the event in the stream")
+    stage: Literal["prefilter", "checker", "detection"] = Field(
+        description=(
+            "prefilter: rules skipped by the prefilter and findings answered from the paragraph cache; "
+            "checker: deterministic rule checkers; detection: one detection cell completed"
+        )
+    )
+    checked: int = Field(default=0, description="Number of rules checked so far")
+    total: int = Field(default=0, description="Total number of rules to check")
+    ranked_out: int = Field(
+        default=0, description="Rules not checked because they ranked below the relevance cut-off; not part of total"
+    )
+    rule_limit: int = Field(default=0, description="Relevance cut-off: maximum rules sent to the LLM (0 = unlimited)")
+    cells_checked: int = Field(default=0, description="Detection cells (rule batch × text window) completed so far")
+    cells_total: int = Field(default=0, description="Detection cells (rule batch × text window) of this request")
+    skipped: int = Field(default=0, description="Detection cells that timed out or failed so far")
+
+
+class ViolationEvent(BaseModel):
+    """One violation, sent as soon as its proposal is ready."""
+
+    type: Literal["violation"] = "violation"
+    seq: int = Field(description="Position of the event in the stream")
+    violation: ViolationResult
+
+
+class DoneEvent(BaseModel):
+    """Last event of a complete stream."""
+
+    type: Literal["done"] = "done"
+    seq: int = Field(description="Position of the event in the stream")
+    checked: int = Field(description="Number of rules checked")
+    total: int = Field(description="Total number of rules to check")
+    cells_total: int = Field(description="Detection cells of this request")
+    skipped: int = Field(description="Detection cells that timed out or failed; coverage was partial if non-zero")
+    violations: int = Field(description="Number of violation events sent")
+    timings_ms: dict[str, int] = Field(
+        description="Milliseconds since the request started: first_violation (if any) and total"
+    )
+
+
+class ErrorEvent(BaseModel):
+    """Last event of an advisor job that did not complete; only sent by the job API."""
+
+    type: Literal["error"] = "error"
+    seq: int = Field(description="Position of the event in the stream")
+    error_id: str = Field(description="Error code, e.g. check_text_error or advisor_job_abandoned")
+    debug_message: str | None = Field(default=None, description="Details for debugging")
+
+
+type AdvisorEvent = Annotated[ProgressEvent | ViolationEvent | DoneEvent | ErrorEvent, Field(discriminator="type")]
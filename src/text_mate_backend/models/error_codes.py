@@ -1,6 +1,9 @@
 UNEXPECTED_ERROR = "unexpected_error"
 NO_DOCUMENT = "no_document"
 CHECK_TEXT_ERROR = "check_text_error"
+UNSUPPORTED_STREAM_FORMAT = "unsupported_stream_format"
+ADVISOR_JOB_NOT_FOUND = "advisor_job_not_found"
+ADVISOR_JOB_ABANDONED = "advisor_job_abandoned"
 REWRITE_TEXT_ERROR = "rewrite_text_error"
 INVALID_MIME_TYPE = "invalid_mime_type"
 LOADING_FILES_ERROR = "loading_files_error"
@@ -1,4 +1,65 @@
-from pydantic import BaseModel, Field
+import re
+from functools import cached_property
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic.json_schema import SkipJsonSchema
+
+from text_mate_backend.utils.token_estimate import estimate_tokens
+
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _compile(pattern: str) -> re.Pattern[str]:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"invalid regular expression {pattern!r}: {e}") from e
+
+
+class CheckerSpec(BaseModel):
+    """Deterministic pattern attached to a rule.
+
+    Every violation of the rule contains a match of ``pattern`` (the pattern is a
+    *trigger*). When ``decides`` is set, every match is also a violation: the
+    advisor reports it directly and the rule is never sent to the LLM.
+    """
+
+    type: str = Field(default="regex", pattern="^regex$", description="Checker type; only 'regex' is supported")
+    pattern: str = Field(description="Python regular expression; no named groups or backreferences")
+    ignore_case: bool = Field(default=False, description="Match case-insensitively")
+    decides: bool = Field(default=False, description="Every match is a violation; the LLM is not consulted")
+    reason: str = Field(default="", description="Reason reported for deterministic violations")
+    replacement: str | None = Field(
+        default=None, description="re.Match.expand template producing the proposal from the match"
+    )
+    translate: dict[str, str] = Field(
+        default_factory=dict, description="Literal substring replacements applied to the proposal"
+    )
+    exceptions: list[str] = Field(
+        default_factory=list, description="Regular expressions; a match fully matching one of them is ignored"
+    )
+
+    @field_validator("pattern")
+    @classmethod
+    def _validate_pattern(cls, pattern: str) -> str:
+        compiled = _compile(pattern)
+        if compiled.groupindex or _BACKREFERENCE.search(pattern):
+            raise ValueError("checker patterns must not use named groups or backreferences")
+        return pattern
+
+    @field_validator("exceptions")
+    @classmethod
+    def _validate_exceptions(cls, exceptions: list[str]) -> list[str]:
+        for exception in exceptions:
+            _compile(exception)
+        return exceptions
+
+    @model_validator(mode="after")
+    def _deciding_checker_needs_output(self) -> "CheckerSpec":
+        if self.decides and (not self.reason or (self.replacement is None and not self.translate)):
+            raise ValueError("deciding checkers need a reason and a replacement or translate table")
+        return self
 
 
 class Rule(BaseModel):
@@ -10,6 +71,40 @@ class Rule(BaseModel):
     collection: str = Field(
         description="Logical collection key used for filtering (matches RuleDocumentDescription.id)"
     )
+    # Backend-only: never serialized into prompts or their schemas.
+    kind: SkipJsonSchema[Literal["mechanical", "lexical", "semantic"]] = Field(
+        default="semantic",
+        exclude=True,
+        description="'mechanical' rules concern surface form, 'lexical' rules word choice, 'semantic' rules meaning",
+    )
+    scope: SkipJsonSchema[Literal["window", "document"]] = Field(
+        default="document",
+        exclude=True,
+        description="'window' rules can be judged on a single paragraph; 'document' rules need the whole text",
+    )
+    checker: SkipJsonSchema[CheckerSpec | None] = Field(
+        default=None, exclude=True, description="Optional deterministic checker for this rule"
+    )
+    all_occurrences: SkipJsonSchema[bool] = Field(
+        default=False,
+        exclude=True,
+        description="Whether a snippet found verbatim is a violation wherever it occurs in the text",
+    )
+
+    @cached_property
+    def prompt_block(self) -> str:
+        """The rule as sent in detection prompts: only the fields the model needs."""
+        return f"### {self.name}\n{self.description}\nBeispiel: {self.example}"
+
+    @cached_property
+    def prompt_json(self) -> str:
+        """The rule as serialized into proposal and verification prompts and hashed into cache keys."""
+        return self.model_dump_json()
+
+    @cached_property
+    def prompt_tokens(self) -> int:
+        """Estimated tokens this rule adds to a detection prompt (see ``estimate_tokens``)."""
+        return estimate_tokens(self.prompt_block) + 1
 
 
 class RulesContainer(BaseModel):
@@ -35,6 +130,21 @@ class DetectionResult(BaseModel):
     violations: list[DetectionViolation] = Field(description="All violations found in the text")
 
 
+class CombinedViolation(DetectionViolation):
+    """Fast-path LLM output model — a detection together with its proposal, for short texts.
+    Position resolution still happens on the backend."""
+
+    proposal: str = Field(
+        description="Konkreter Ersatz für den source-Ausschnitt, der die Regel erfüllt und in den Satz passt"
+    )
+
+
+class CombinedResult(BaseModel):
+    """Fast-path LLM output type — detected violations with their proposals."""
+
+    violations: list[CombinedViolation] = Field(description="All violations found in the text, each with a proposal")
+
+
 class ProposalRequest(BaseModel):
     """Step 2 deps type — context for generating a single proposal."""
 
@@ -44,13 +154,47 @@ class ProposalRequest(BaseModel):
     context_sentence: str = Field(description="Der Satz, der den Verstoss enthält, als Kontext für den Vorschlag")
 
 
+class VerificationResult(BaseModel):
+    """Output type of the verification step for one low-agreement candidate."""
+
+    violated: bool = Field(description="true, wenn der Ausschnitt im Kontext gegen die Regel verstösst, sonst false")
+
+
+class BatchProposalItem(BaseModel):
+    """One violation inside a batched proposal request."""
+
+    id: int = Field(description="Kennung des Verstosses; muss in der Antwort unverändert zurückgegeben werden")
+    rule_name: str = Field(description="Name der verletzten Regel (siehe Regeldokumentation)")
+    source: str = Field(description="Exakter Textausschnitt aus dem Eingabetext, der gegen die Regel verstosst")
+    reason: str = Field(description="Kurze Beschreibung des Verstosses in der Sprache des Textes")
+    context_sentence: str = Field(description="Der Satz, der den Verstoss enthält, als Kontext für den Vorschlag")
+
+
+class BatchProposalRequest(BaseModel):
+    """Deps type of the batched proposal step — each rule is sent once for all items."""
+
+    rules: list[Rule] = Field(description="The rules referenced by the items")
+    items: list[BatchProposalItem] = Field(description="Violations that need a proposal")
+
+
+class BatchProposal(BaseModel):
+    id: int = Field(description="Kennung des Verstosses aus der Anfrage")
+    proposal: str = Field(description="Konkreter Ersatz für den source-Ausschnitt")
+
+
+class BatchProposalResult(BaseModel):
+    """Output type of the batched proposal step."""
+
+    proposals: list[BatchProposal] = Field(description="Ein Vorschlag pro Verstoss")
+
+
 class ViolationRange(BaseModel):
     """Half-open character range into the source text.
 
     The indexing scheme depends on the consumer: internally (e.g.
     ``ResolvedDetection.range``) the offsets are Python code points; at the API
     boundary (``ViolationResult.range``) they are UTF-16 code units. See
-    ``advisor._to_utf16_offset`` for the translation between the two.
+    ``TextIndex.to_utf16`` for the translation between the two.
     """
 
     start: int = Field(description="Start position (0-based, inclusive) of the violating text")
@@ -94,6 +238,16 @@ class RulesValidationContainer(BaseModel):
     violations: list[ViolationResult] = Field(description="Violations found in this batch")
     checked: int = Field(default=0, description="Number of rules checked so far")
     total: int = Field(default=0, description="Total number of rules to check")
+    ranked_out: int = Field(
+        default=0, description="Rules not checked because they ranked below the relevance cut-off; not part of total"
+    )
+    rule_limit: int = Field(default=0, description="Relevance cut-off: maximum rules sent to the LLM (0 = unlimited)")
+    cells_checked: int = Field(default=0, description="Detection cells (rule batch × text window) completed so far")
+    cells_total: int = Field(default=0, description="Detection cells (rule batch × text window) of this request")
+    skipped: int = Field(
+        default=0,
+        description="Detection cells that timed out or failed so far; their rules were checked only partially",
+    )
 
 
 class RuleDocumentDescription(BaseModel):
@@ -7,7 +7,7 @@ from dcc_backend_common.fastapi_error_handling import ApiErrorCodes, api_error_e
 from dcc_backend_common.logger import get_logger
 from dcc_backend_common.usage_tracking import UsageTrackingService
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from fastapi.params import Security
 from fastapi.responses import FileResponse, StreamingResponse
 from fastapi_azure_auth.user import User
@@ -15,11 +15,18 @@ from pydantic import BaseModel, Field
 from starlette.status import HTTP_403_FORBIDDEN
 
 from text_mate_backend.container import Container
-from text_mate_backend.models.error_codes import NO_DOCUMENT
+from text_mate_backend.models.advisor_event_models import (
+    ADVISOR_STREAM_CONTAINERS,
+    ADVISOR_STREAM_FORMATS,
+    ADVISOR_STREAM_HEADER,
+    AdvisorEvent,
+)
+from text_mate_backend.models.error_codes import ADVISOR_JOB_NOT_FOUND, NO_DOCUMENT, UNSUPPORTED_STREAM_FORMAT
 from text_mate_backend.models.error_response import ApiErrorException
 from text_mate_backend.models.fix_models import FixRequest
 from text_mate_backend.models.rule_models import RuleDocumentDescription, RulesValidationContainer
 from text_mate_backend.services.advisor import AdvisorService
+from text_mate_backend.services.advisor_jobs import AdvisorJob, AdvisorJobService
 from text_mate_backend.services.fix_service import FixService
 from text_mate_backend.utils.auth import AuthSchema
 from text_mate_backend.utils.usage_tracking import get_user_id
@@ -29,12 +36,39 @@ logger = get_logger("advisor_router")
 
 class AdvisorInput(BaseModel):
     text: Annotated[str, "The text to analyze and provide advice for"]
-    docs: Annotated[set[str], Field(max_length=5, description="The documents to use for the analysis")]
+    docs: Annotated[set[str], Field(description="The documents to use for the analysis")]
+
+
+class AdvisorJobCreated(BaseModel):
+    job_id: str = Field(description="Id for GET /advisor/jobs/{job_id}/events")
+
+
+def advisor_stream_format(
+    response: Response,
+    stream_format: Annotated[str, Header(alias=ADVISOR_STREAM_HEADER)] = ADVISOR_STREAM_CONTAINERS,
+) -> str:
+    """The stream format requested with the ``X-Advisor-Stream`` header, echoed in the response.
+
+    Resolved as a dependency because a streaming endpoint's body only runs after
+    the response headers were sent.
+    """
+    if stream_format not in ADVISOR_STREAM_FORMATS:
+        raise ApiErrorException(
+            {
+                "status": 400,
+                "errorId": UNSUPPORTED_STREAM_FORMAT,
+                "debugMessage": f"Unsupported {ADVISOR_STREAM_HEADER} '{stream_format}', "
+                f"expected one of {', '.join(ADVISOR_STREAM_FORMATS)}",
+            }
+        )
+    response.headers[ADVISOR_STREAM_HEADER] = stream_format
+    return stream_format
 
 
 @inject
 def create_router(
     advisor_service: AdvisorService = Provide[Container.advisor_service],
+    advisor_job_service: AdvisorJobService = Provide[Container.advisor_job_service],
     fix_service: FixService = Provide[Container.fix_service],
     auth_scheme: AuthSchema = Provide[Container.auth_scheme],
     usage_tracking_service: UsageTrackingService = Provide[Container.usage_tracking_service],
@@ -52,19 +86,23 @@ def create_router(
     async def validate_advisor(
         data: AdvisorInput,
         current_user: Annotated[User, Depends(auth_scheme)],
-    ) -> AsyncIterable[RulesValidationContainer]:
+        stream_format: Annotated[str, Depends(advisor_stream_format)],
+    ) -> AsyncIterable[RulesValidationContainer | AdvisorEvent]:
+        """Stream ``RulesValidationContainer`` items, or events when requested with ``X-Advisor-Stream``."""
         usage_tracking_service.log_event(
             "advisor.validate",
             get_user_id(current_user),
             text_length=len(data.text),
+            stream_format=stream_format,
         )
 
         try:
-            async for validation_result in advisor_service.check_text_stream(
-                data.text,
-                data.docs,
-            ):
-                yield validation_result
+            if stream_format == ADVISOR_STREAM_CONTAINERS:
+                async for validation_result in advisor_service.check_text_stream(data.text, data.docs):
+                    yield validation_result
+            else:
+                async for event in advisor_service.check_text_events(data.text, data.docs):
+                    yield event
         except asyncio.CancelledError:
             logger.info("Client disconnected from advisor JSON Lines stream")
             raise
@@ -72,6 +110,39 @@ def create_router(
             logger.exception("Unhandled error during advisor JSON Lines stream")
             raise api_error_exception(errorId=ApiErrorCodes.UNEXPECTED_ERROR, status=500, debugMessage=str(e)) from e
 
+    def advisor_job(job_id: str, current_user: Annotated[User | None, Depends(auth_scheme)]) -> AdvisorJob:
+        """The job of the path, resolved before streaming so an unknown id answers 404."""
+        job = advisor_job_service.get(job_id, get_user_id(current_user))
+        if job is None:
+            raise ApiErrorException(
+                {"status": 404, "errorId": ADVISOR_JOB_NOT_FOUND, "debugMessage": "Advisor job not found"}
+            )
+        return job
+
+    @router.post("/jobs", status_code=202, dependencies=[Security(auth_scheme)])
+    async def start_advisor_job(
+        data: AdvisorInput,
+        current_user: Annotated[User, Depends(auth_scheme)],
+    ) -> AdvisorJobCreated:
+        """Start a validation that keeps running when the client disconnects."""
+        user_id = get_user_id(current_user)
+        job = advisor_job_service.start(data.text, data.docs, user_id)
+        usage_tracking_service.log_event("advisor.job", user_id, text_length=len(data.text))
+        return AdvisorJobCreated(job_id=job.id)
+
+    @router.get("/jobs/{job_id}/events", dependencies=[Security(auth_scheme)])
+    async def get_advisor_job_events(
+        job: Annotated[AdvisorJob, Depends(advisor_job)],
+        after: Annotated[int, Query(ge=-1, description="Only events with a greater seq; -1 replays all")] = -1,
+    ) -> AsyncIterable[AdvisorEvent]:
+        """Replay the job's events after ``after`` as JSON Lines, then follow the job until it ends."""
+        try:
+            async for event in advisor_job_service.events(job, after):
+                yield event
+        except asyncio.CancelledError:
+            logger.info("Client disconnected from advisor job stream", job_id=job.id)
+            raise
+
     @router.post("/fix", dependencies=[Security(auth_scheme)])
     async def fix_text(
         data: FixRequest,
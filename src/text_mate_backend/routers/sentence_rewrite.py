@@ -14,6 +14,7 @@ from text_mate_backend.routers.utils import handle_exception
 from text_mate_backend.utils.auth import AuthSchema
 from text_mate_backend.utils.cancel_on_disconnect import CancelOnDisconnect
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.single_flight import SingleFlight, single_flight_key
 from text_mate_backend.utils.usage_tracking import get_user_id
 
 logger = get_logger("sentence_rewrite_router")
@@ -33,6 +34,7 @@ def create_router(
     """
     logger.debug("Creating sentence rewrite router")
     router: APIRouter = APIRouter(prefix="/sentence-rewrite", tags=["sentence-rewrite"])
+    flights = SingleFlight("sentence_rewrite")
     agent = SentenceRewriteAgent(config)
 
     @router.post("", response_model=SentenceRewriteResult, dependencies=[Security(auth_scheme)])
@@ -50,7 +52,11 @@ def create_router(
 
         try:
             async with CancelOnDisconnect(request):
-                return await agent.run(deps=data)
+                # Identical concurrent requests, up to whitespace, share one agent call.
+                key = single_flight_key(*(" ".join(value.split()) for value in (data.sentence, data.context)))
+                result = await flights.run(key, lambda: agent.run(deps=data))
+                # The shared result echoes the first caller's sentence; answer with this caller's.
+                return SentenceRewriteResult(sentence=data.sentence, options=result.options)
         except Exception as exp:
             handle_exception(exp)
             raise exp
@@ -13,6 +13,7 @@ from text_mate_backend.routers.utils import handle_exception
 from text_mate_backend.utils.auth import AuthSchema
 from text_mate_backend.utils.cancel_on_disconnect import CancelOnDisconnect
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.single_flight import SingleFlight, single_flight_key
 from text_mate_backend.utils.usage_tracking import get_user_id
 
 logger = get_logger("word_synonym_router")
@@ -32,6 +33,7 @@ def create_router(
     """
     logger.debug("Creating word synonym router")
     router: APIRouter = APIRouter(prefix="/word-synonym", tags=["word-synonym"])
+    flights = SingleFlight("word_synonym")
     agent = WordSynonymAgent(config)
 
     @router.post("", response_model=WordSynonymResult, dependencies=[Security(auth_scheme)])
@@ -48,7 +50,9 @@ def create_router(
 
         try:
             async with CancelOnDisconnect(request):
-                return await agent.run(deps=data)
+                # Identical concurrent requests, up to whitespace, share one agent call.
+                key = single_flight_key(*(" ".join(value.split()) for value in (data.word, data.context)))
+                return await flights.run(key, lambda: agent.run(deps=data))
         except Exception as err:
             handle_exception(err)
             raise err
@@ -1,20 +1,49 @@
 import asyncio
+import hashlib
+import itertools
 import json
-import re
-from collections.abc import Iterator
-from difflib import SequenceMatcher
+import math
+import random
+import time
+from bisect import bisect_right
+from collections.abc import Callable, Coroutine
+from dataclasses import asdict, dataclass
+from functools import partial
 from pathlib import Path
-from typing import cast, final
+from typing import Any, Literal, cast, final
 
 from dcc_backend_common.logger import get_logger
 from fastapi_azure_auth.user import User
 from typing_extensions import AsyncIterator
 
-from text_mate_backend.agents.agent_types.proposal_agent import ProposalAgent
-from text_mate_backend.agents.agent_types.violation_detection_agent import ViolationDetectionAgent
+from text_mate_backend.agents.agent_types.batch_proposal_agent import (
+    PROMPT_VERSION as BATCH_PROPOSAL_PROMPT_VERSION,
+    BatchProposalAgent,
+    render_instruction as render_batch_proposal_instruction,
+)
+from text_mate_backend.agents.agent_types.detect_and_propose_agent import (
+    PROMPT_VERSION as COMBINED_PROMPT_VERSION,
+    DetectAndProposeAgent,
+)
+from text_mate_backend.agents.agent_types.proposal_agent import (
+    PROMPT_VERSION as PROPOSAL_PROMPT_VERSION,
+    ProposalAgent,
+    render_instruction as render_proposal_instruction,
+)
+from text_mate_backend.agents.agent_types.verification_agent import VerificationAgent
+from text_mate_backend.agents.agent_types.violation_detection_agent import (
+    PROMPT_VERSION as DETECTION_PROMPT_VERSION,
+    ViolationDetectionAgent,
+    render_instruction as render_detection_instruction,
+)
+from text_mate_backend.models.advisor_event_models import AdvisorEvent, DoneEvent, ProgressEvent, ViolationEvent
 from text_mate_backend.models.error_codes import CHECK_TEXT_ERROR, LOADING_FILES_ERROR
 from text_mate_backend.models.error_response import ApiErrorException
 from text_mate_backend.models.rule_models import (
+    BatchProposalItem,
+    BatchProposalRequest,
+    CombinedResult,
+    CombinedViolation,
     DetectionResult,
     DetectionViolation,
     ProposalRequest,
@@ -26,15 +55,83 @@ from text_mate_backend.models.rule_models import (
     ViolationRange,
     ViolationResult,
 )
+from text_mate_backend.services.detection_voting import AgreementVoter
+from text_mate_backend.services.rule_checker import CheckerHit, RuleCheckerEngine
+from text_mate_backend.services.rule_index import RuleIndex
+from text_mate_backend.services.rule_prefilter import RulePrefilter
+from text_mate_backend.services.span_resolver import SpanResolver
 from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.interval_index import IntervalIndex
+from text_mate_backend.utils.latency_tracker import LatencyTracker
+from text_mate_backend.utils.llm_scheduler import LlmPriority, slot_granted
+from text_mate_backend.utils.single_flight import SingleFlight, single_flight_key
+from text_mate_backend.utils.text_index import (
+    TextIndex,
+    group_into_windows,
+    split_into_paragraphs,
+)
+from text_mate_backend.utils.token_estimate import estimate_tokens
+from text_mate_backend.utils.ttl_cache import TtlLruCache
 
 logger = get_logger("advisor_service")
-MAX_RULES_PER_REQUEST = 5
-MAX_RULES = 60
 DETECTION_TIMEOUT_SECONDS = 300
 PROPOSAL_TIMEOUT_SECONDS = 60
+VERIFICATION_TIMEOUT_SECONDS = 20
 BATCH_TIMEOUT_SECONDS = 400
-FUZZY_MATCH_THRESHOLD = 0.85
+# Cells are hedged once they run longer than this percentile of their kind.
+HEDGE_PERCENTILE = 95
+# Detection prompt without any rules or text; the fixed part of every batch.
+DETECTION_BASE_TOKENS = estimate_tokens(render_detection_instruction(RulesContainer(rules=[])))
+
+# A resolved detection and the proposal generated for it.
+type Finding = tuple[ResolvedDetection, str]
+# Starts the work of one detection cell; called again for a hedged duplicate.
+type CellWork = Callable[[], Coroutine[Any, Any, list[ViolationResult]]]
+# Receives each violation of a cell as soon as it is final.
+type ViolationSink = Callable[[ViolationResult], None]
+
+
+class ProposalCallCancelled(Exception):
+    """Answer of a shared proposal call whose owning group was cancelled; the groups that joined ask again."""
+
+
+@dataclass(slots=True)
+class ProposalStats:
+    """Per-request accounting of proposal calls, compared to one call per violation."""
+
+    batched_calls: int = 0
+    single_calls: int = 0
+    calls_saved: int = 0
+    prompt_tokens_saved: int = 0
+    """Estimated; see ``estimate_tokens``."""
+    cache_hits: int = 0
+    """Answered by the proposal cache."""
+    deduplicated: int = 0
+    """Answered by an identical request of the same group or by an identical call in flight."""
+    combined_calls: int = 0
+    """Batches answered by the single-call fast path, detection and proposals at once."""
+
+
+@dataclass(slots=True)
+class PrefilterStats:
+    """Per-request accounting of the relevance prefilter (see ``RulePrefilter``)."""
+
+    rules_skipped: int = 0
+    rules_dropped: int = 0
+    rules_ranked_out: int = 0
+    batches_avoided: int = 0
+
+
+@dataclass(slots=True)
+class CellStats:
+    """Per-request accounting of detection cells, their deadlines and hedges."""
+
+    cells: int = 0
+    skipped: int = 0
+    """Timed out or failed; reported without findings."""
+    hedged: int = 0
+    hedge_wins: int = 0
+    """Hedged cells answered by the duplicate call."""
 
 
 @final
@@ -47,6 +144,49 @@ class AdvisorService:
         self.doc_descriptions = self._merge_meta_files(Path("assets/docs/meta"))
         self.detection_agent = ViolationDetectionAgent(config)
         self.proposal_agent = ProposalAgent(config)
+        self.batch_proposal_agent = BatchProposalAgent(config)
+        self.verification_agent = VerificationAgent(config)
+        self.combined_agent = DetectAndProposeAgent(config)
+        self.rule_index = RuleIndex(self.rule_container.rules)
+        logger.info("Rule index built", **self.rule_index.report())
+        self.prefilter = RulePrefilter(
+            self.rule_index,
+            mode=config.advisor_prefilter,
+            min_score=config.advisor_prefilter_min_score,
+            max_rules=config.advisor_max_llm_rules,
+        )
+        self._checker_engines: dict[frozenset[str], RuleCheckerEngine] = {}
+        # Durations of completed cells, per kind; whole-text cells run much longer than windows.
+        self.cell_latency = {"document": LatencyTracker(), "window": LatencyTracker()}
+        # Identical concurrent checks (e.g. a class pasting the same sample letter) run once.
+        self.flights = SingleFlight("advisor")
+        # Fuzzy source resolution runs off the event loop.
+        self.span_resolver = SpanResolver(config.advisor_resolver_workers)
+        self.detection_cache: TtlLruCache[DetectionResult | CombinedResult] = TtlLruCache(
+            max_bytes=config.advisor_detection_cache_max_bytes,
+            ttl_seconds=config.advisor_detection_cache_ttl_seconds,
+            sizeof=lambda result: len(result.model_dump_json().encode()),
+        )
+        # Proposals by rule, snippet and context sentence; the same violations recur across documents.
+        self.proposal_cache: TtlLruCache[str] = TtlLruCache(
+            max_bytes=config.advisor_proposal_cache_max_bytes,
+            ttl_seconds=config.advisor_proposal_cache_ttl_seconds,
+            sizeof=lambda proposal: len(proposal.encode()),
+        )
+        # Proposal calls running for some group, by cache key; resolved with the proposal or the error.
+        self._proposals_in_flight: dict[str, asyncio.Future[str | BaseException]] = {}
+        # Paragraph-relative findings of window-scoped batches, for incremental re-validation.
+        self.paragraph_cache: TtlLruCache[list[Finding]] = TtlLruCache(
+            max_bytes=config.advisor_detection_cache_max_bytes,
+            ttl_seconds=config.advisor_detection_cache_ttl_seconds,
+            sizeof=lambda findings: sum(
+                len(resolved.model_dump_json().encode()) + len(proposal.encode()) for resolved, proposal in findings
+            ),
+        )
+
+    def close(self) -> None:
+        """Stop the span resolver's workers; called on shutdown."""
+        self.span_resolver.close()
 
     def _merge_rules_files(self, directory: Path) -> RulesContainer:
         """
@@ -160,7 +300,7 @@ class AdvisorService:
         """
         doc_descriptions = list(filter(lambda doc: self._has_access(user, doc), self.doc_descriptions))
 
-        doc_names = self.rule_container.document_names
+        doc_names = self.rule_index.collections
 
         return list(
             filter(
@@ -170,32 +310,51 @@ class AdvisorService:
         )
 
     def filter_rules(self, docs: set[str]) -> list[Rule]:
-        filtered_rules: list[Rule] = []
-        for doc in docs:
-            doc_rules = [rule for rule in self.rule_container.rules if rule.collection == doc]
-            filtered_rules.extend(doc_rules)
-        return filtered_rules
+        return self.rule_index.select(docs)
+
+    def _checker_engine(self, docs: set[str], rules: list[Rule]) -> RuleCheckerEngine:
+        """Return the compiled checker engine for a collection selection, building it once."""
+        key = frozenset(docs)
+        engine = self._checker_engines.get(key)
+        if engine is None:
+            engine = RuleCheckerEngine(rules)
+            self._checker_engines[key] = engine
+        return engine
 
     async def check_text_stream(self, text: str, docs: set[str]) -> AsyncIterator[RulesValidationContainer]:
         """
         Checks the text for any violations of the rules and yields validation results
         batch-by-batch. This is intended for streaming (SSE) responses.
+
+        Each container carries the violations that became final since the
+        previous one; see ``check_text_events`` for the event stream.
         """
+        violations: list[ViolationResult] = []
+        async for event in self.check_text_events(text, docs):
+            if isinstance(event, ViolationEvent):
+                violations.append(event.violation)
+            elif isinstance(event, ProgressEvent):
+                yield RulesValidationContainer(
+                    violations=violations, **event.model_dump(exclude={"type", "seq", "stage"})
+                )
+                violations = []
 
-        if len(docs) > 5:
-            raise ApiErrorException(
-                {
-                    "status": 400,
-                    "errorId": CHECK_TEXT_ERROR,
-                    "debugMessage": "A maximum of 5 documents can be selected",
-                }
-            )
+    async def check_text_events(self, text: str, docs: set[str]) -> AsyncIterator[AdvisorEvent]:
+        """
+        Checks the text for any violations of the rules and yields a violation
+        event as soon as each violation is final, a progress event after every
+        stage step and a done event at the end.
 
+        Concurrent calls with the same text and documents share one check; a
+        caller that joins late first gets the events sent so far.
+        """
+
+        key = single_flight_key(text, *sorted(docs))
         try:
-            async for result in self._check_text_stream(text, docs):
-                yield result
+            async for event in self.flights.stream(key, partial(self._check_text_events, text, docs)):
+                yield event
         except asyncio.CancelledError:
-            logger.info("check_text_stream cancelled (client disconnect)")
+            logger.info("check_text_events cancelled (client disconnect)")
             raise
         except Exception as e:
             logger.exception("Error checking text (stream)")
@@ -233,54 +392,218 @@ class AdvisorService:
 
         return False
 
-    async def _check_text_stream(self, text: str, docs: set[str]) -> AsyncIterator[RulesValidationContainer]:
+    async def _check_text_events(self, text: str, docs: set[str]) -> AsyncIterator[AdvisorEvent]:
+        started = time.perf_counter()
+        sequence = itertools.count()
         rules = self.filter_rules(docs)
 
         if not rules:
             logger.warning("No rules found for the selected documents", docs=list(docs))
-            # Maintain parity with the non-streaming API by yielding a single empty container
-            yield RulesValidationContainer(violations=[], checked=0, total=0)
+            # Maintain parity with the non-streaming API by yielding a single empty progress step
+            yield ProgressEvent(seq=next(sequence), stage="prefilter")
+            yield DoneEvent(
+                seq=next(sequence),
+                checked=0,
+                total=0,
+                cells_total=0,
+                skipped=0,
+                violations=0,
+                timings_ms={"total": round((time.perf_counter() - started) * 1000)},
+            )
             return
 
-        total_rules = len(rules)
-        rule_lookup: dict[str, Rule] = {rule.name: rule for rule in rules}
-
-        batches = list(self._batched_rules(rules, MAX_RULES_PER_REQUEST, max_rules=len(rules)))
-
-        # Run all batches concurrently. Each batch carries its own per-batch
-        # dedup state (see _process_batch), so there is no shared mutable state
-        # between them. The wrapper folds timeouts/errors into an empty result
-        # while returning the batch's rule count, so as_completed consumers can
-        # update progress without needing to map futures back to batches.
-        async def run_batch(batch: list[Rule]) -> tuple[int, list[ViolationResult]]:
-            batch_size = len(batch)
+        rule_lookup = self.rule_index.lookup(docs)
+        # Built once per request and shared read-only by every batch.
+        index = await asyncio.to_thread(TextIndex.from_text, text)
+
+        # Rules with a deciding checker are answered by the deterministic stage
+        # and never reach the LLM.
+        checker_engine = self._checker_engine(docs, rules)
+        decided = {rule.name for rule in checker_engine.deciding_rules}
+        llm_rules = [rule for rule in rules if rule.name not in decided]
+
+        # Rules that cannot (or, in aggressive mode, are unlikely to) fire on
+        # this text never reach the LLM and count as checked right away. Rules
+        # ranked below the cut-off are not checked at all: they leave the total
+        # and are reported as ranked_out instead.
+        prefilter = await asyncio.to_thread(self.prefilter.apply, index.text, llm_rules, checker_engine)
+        prefilter_stats = PrefilterStats(
+            rules_skipped=len(prefilter.skipped),
+            rules_dropped=len(prefilter.dropped),
+            rules_ranked_out=len(prefilter.ranked_out),
+        )
+        excluded_rules = prefilter_stats.rules_skipped + prefilter_stats.rules_dropped
+        total = len(rules) - prefilter_stats.rules_ranked_out
+
+        document_batches, window_batches = self._plan_batches(prefilter.kept, text)
+        if excluded_rules or prefilter.ranked_out:
+            planned = sum(len(batches) for batches in self._plan_batches(llm_rules, text))
+            prefilter_stats.batches_avoided = planned - len(document_batches) - len(window_batches)
+        paragraphs = split_into_paragraphs(text, self.config.advisor_window_chars) if window_batches else []
+
+        # Every detection call is a cell: a document batch over the whole text,
+        # or a window batch over one paragraph window. All cells run
+        # concurrently; each carries its own dedup state (see _process_batch),
+        # so there is no shared mutable state between them. Cells hand each
+        # violation to ``emit`` as soon as it is final, and their completion to
+        # the same queue; the wrapper folds timeouts/errors into a skipped
+        # (None) result. A batch's rules count as checked once its last cell
+        # completes.
+        queue: asyncio.Queue[ViolationResult | tuple[int, list[ViolationResult] | None]] = asyncio.Queue()
+        emitted: set[tuple[str, int, int]] = set()
+
+        def emit(violation: ViolationResult) -> None:
+            # The duplicate call of a hedged cell may report a finding again.
+            key = (violation.rule_name, violation.range.start, violation.range.end)
+            if key not in emitted:
+                emitted.add(key)
+                queue.put_nowait(violation)
+
+        async def run_cell(batch_no: int, kind: str, work: CellWork) -> tuple[int, list[ViolationResult] | None]:
+            # The deadline and the hedge delay run from the cell's first detection
+            # slot: time spent queueing behind other cells does not count, and
+            # cells answered from the cache are neither timed nor recorded.
+            deadline, hedge_after = self._cell_timing(kind)
+            admitted = asyncio.Event()
+            admitted_at = 0.0
+            closed = False
             try:
-                result = await asyncio.wait_for(
-                    self._process_batch(text, batch, rule_lookup),
-                    timeout=BATCH_TIMEOUT_SECONDS,
-                )
-            except asyncio.TimeoutError:
-                logger.error(f"Batch timed out after {BATCH_TIMEOUT_SECONDS}s, batch_size={batch_size}")
-                result = []
+                async with asyncio.timeout(None) as timeout:
+
+                    def on_slot(priority: LlmPriority) -> None:
+                        nonlocal admitted_at
+                        if priority == LlmPriority.ADVISOR_DETECTION and not admitted.is_set() and not closed:
+                            admitted.set()
+                            admitted_at = time.perf_counter()
+                            timeout.reschedule(asyncio.get_running_loop().time() + deadline)
+
+                    # Inherited by the tasks of the cell, which acquire the slots.
+                    token = slot_granted.set(on_slot)
+                    try:
+                        result = await self._hedged(work, hedge_after, cell_stats, admitted)
+                    finally:
+                        closed = True
+                        slot_granted.reset(token)
+            except TimeoutError:
+                logger.error(f"Cell timed out after {deadline:.0f}s, kind={kind}, batch_size={len(batches[batch_no])}")
+                return batch_no, None
             except asyncio.CancelledError:
                 raise
             except Exception as e:
-                logger.error(f"Batch failed: {e}")
-                result = []
-            return batch_size, result
+                logger.error(f"Cell failed: {e}")
+                return batch_no, None
+            if admitted.is_set():
+                self.cell_latency[kind].record(time.perf_counter() - admitted_at)
+            return batch_no, result
+
+        proposal_stats = ProposalStats()
+        cell_stats = CellStats()
+        batches: list[list[Rule]] = []
+        jobs: list[tuple[int, str, CellWork]] = []
+        for batch in self._by_relevance(document_batches, prefilter.scores):
+            work = partial(self._process_batch, index, batch, rule_lookup, proposal_stats, emit)
+            jobs.append((len(batches), "document", work))
+            batches.append(batch)
+        cached_violations: list[ViolationResult] = []
+        cached_rules = 0
+        for batch in self._by_relevance(window_batches, prefilter.scores):
+            findings, pending = self._cached_paragraph_findings(index, paragraphs, batch)
+            cached_violations.extend(
+                self._build_violation_result(resolved, proposal, index) for resolved, proposal in findings
+            )
+            if not pending:
+                cached_rules += len(batch)
+                continue
+            for window in group_into_windows(index.text, pending, self.config.advisor_window_chars):
+                work = partial(self._process_paragraphs, index, window, batch, rule_lookup, proposal_stats, emit)
+                jobs.append((len(batches), "window", work))
+            batches.append(batch)
+        cell_stats.cells = len(jobs)
+        open_cells = [0] * len(batches)
+        for batch_no, _, _ in jobs:
+            open_cells[batch_no] += 1
+        checked_rules = 0
+        checked_cells = 0
+        incomplete_batches: set[int] = set()
+        violation_count = 0
+        first_violation_at: float | None = None
+
+        def progress(stage: Literal["prefilter", "checker", "detection"]) -> ProgressEvent:
+            return ProgressEvent(
+                seq=next(sequence),
+                stage=stage,
+                checked=checked_rules,
+                total=total,
+                ranked_out=prefilter_stats.rules_ranked_out,
+                rule_limit=self.prefilter.max_rules,
+                cells_checked=checked_cells,
+                cells_total=len(jobs),
+                skipped=cell_stats.skipped,
+            )
 
-        tasks = [asyncio.ensure_future(run_batch(batch)) for batch in batches]
+        def violation(result: ViolationResult) -> ViolationEvent:
+            nonlocal violation_count, first_violation_at
+            violation_count += 1
+            if first_violation_at is None:
+                first_violation_at = time.perf_counter()
+            return ViolationEvent(seq=next(sequence), violation=result)
+
+        tasks = [asyncio.ensure_future(run_cell(batch_no, kind, work)) for batch_no, kind, work in jobs]
+        for task in tasks:
+            task.add_done_callback(lambda task: task.cancelled() or queue.put_nowait(task.result()))
 
         try:
-            checked_rules = 0
-            for completed in asyncio.as_completed(tasks):
-                batch_size, new_violations = await completed
-                checked_rules += batch_size
-                yield RulesValidationContainer(
-                    violations=new_violations,
-                    checked=checked_rules,
-                    total=total_rules,
-                )
+            if cached_violations or cached_rules or excluded_rules:
+                for cached in cached_violations:
+                    yield violation(cached)
+                checked_rules += cached_rules + excluded_rules
+                yield progress("prefilter")
+            if decided:
+                hits = await asyncio.to_thread(checker_engine.scan, index.text)
+                for hit in hits:
+                    yield violation(self._checker_violation(hit, index))
+                checked_rules += len(decided)
+                yield progress("checker")
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if isinstance(item, ViolationResult):
+                    yield violation(item)
+                    continue
+                remaining -= 1
+                batch_no, result = item
+                checked_cells += 1
+                if result is None:
+                    cell_stats.skipped += 1
+                    # Reported via ``skipped`` only: the batch's rules were not checked everywhere.
+                    incomplete_batches.add(batch_no)
+                open_cells[batch_no] -= 1
+                if not open_cells[batch_no] and batch_no not in incomplete_batches:
+                    checked_rules += len(batches[batch_no])
+                yield progress("detection")
+            finished = time.perf_counter()
+            timings_ms = {"total": round((finished - started) * 1000)}
+            if first_violation_at is not None:
+                timings_ms["first_violation"] = round((first_violation_at - started) * 1000)
+            yield DoneEvent(
+                seq=next(sequence),
+                checked=checked_rules,
+                total=total,
+                cells_total=len(jobs),
+                skipped=cell_stats.skipped,
+                violations=violation_count,
+                timings_ms=timings_ms,
+            )
+            logger.info(
+                "Advisor cache stats",
+                detection=self.detection_cache.stats(),
+                paragraph=self.paragraph_cache.stats(),
+                proposal=self.proposal_cache.stats(),
+            )
+            logger.info("Advisor proposal stats", **asdict(proposal_stats))
+            logger.info("Advisor prefilter stats", mode=self.prefilter.mode, **asdict(prefilter_stats))
+            logger.info("Advisor cell stats", **asdict(cell_stats))
+            logger.info("Advisor resolver stats", **self.span_resolver.stats())
         finally:
             # If the consumer stops iterating (client disconnect → CancelledError),
             # cancel any still-running batches so in-flight LLM calls don't keep
@@ -291,10 +614,100 @@ class AdvisorService:
             if tasks:
                 await asyncio.gather(*tasks, return_exceptions=True)
 
-    def _resolve_and_dedup(
+    def _cell_timing(self, kind: str) -> tuple[float, float | None]:
+        """Deadline and hedge delay in seconds for a cell of ``kind``.
+
+        Until enough cells of the kind completed, the static
+        ``BATCH_TIMEOUT_SECONDS`` applies and cells are not hedged. Then the
+        deadline is ``advisor_cell_deadline_factor`` times the observed p95,
+        between ``advisor_cell_min_deadline_seconds`` and the static timeout,
+        and with ``advisor_hedge`` a duplicate is fired once a cell exceeds p95.
+        """
+        p95 = self.cell_latency[kind].percentile(HEDGE_PERCENTILE)
+        if p95 is None:
+            return BATCH_TIMEOUT_SECONDS, None
+        deadline = BATCH_TIMEOUT_SECONDS
+        if self.config.advisor_cell_deadline_factor:
+            deadline = min(
+                BATCH_TIMEOUT_SECONDS,
+                max(self.config.advisor_cell_min_deadline_seconds, self.config.advisor_cell_deadline_factor * p95),
+            )
+        return deadline, p95 if self.config.advisor_hedge else None
+
+    @staticmethod
+    async def _hedged(
+        work: CellWork, hedge_after: float | None, stats: CellStats, admitted: asyncio.Event | None = None
+    ) -> list[ViolationResult]:
+        """Run ``work``; if it is not done after ``hedge_after`` seconds, race it against a duplicate.
+
+        With ``admitted``, the delay starts once the event is set instead of
+        right away. The first successful answer wins and the other call is
+        cancelled. Only when every started call fails is the first error raised.
+        """
+        primary = asyncio.ensure_future(work())
+        pending: set[asyncio.Future[list[ViolationResult]]] = {primary}
+        first_error: BaseException | None = None
+        hedged = hedge_after is None
+        try:
+            if not hedged and admitted is not None:
+                admission = asyncio.ensure_future(admitted.wait())
+                try:
+                    await asyncio.wait({primary, admission}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    admission.cancel()
+            while pending:
+                timeout = None if hedged else hedge_after
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info("Hedging slow advisor cell", after_s=round(timeout or 0, 1))
+                    hedged = True
+                    stats.hedged += 1
+                    pending.add(asyncio.ensure_future(work()))
+                    continue
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is not primary:
+                            stats.hedge_wins += 1
+                        return task.result()
+                    first_error = first_error or error
+            assert first_error is not None
+            raise first_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def _plan_batches(self, rules: list[Rule], text: str) -> tuple[list[list[Rule]], list[list[Rule]]]:
+        """Pack ``rules`` into document-scoped and window-scoped detection batches for ``text``.
+
+        Window-scoped rules are checked per paragraph window, so long texts are
+        chunked and, in incremental mode, paragraphs unchanged since an earlier
+        request are answered from the paragraph cache. Document-scoped rules
+        always see the whole text.
+        """
+        window_rules = [rule for rule in rules if rule.scope == "window"]
+        window_names = {rule.name for rule in window_rules}
+        document_rules = [rule for rule in rules if rule.name not in window_names]
+        # Window batches see excerpts whose size depends on what was edited.
+        # Packing them for a fixed excerpt allowance keeps their composition,
+        # and with it the paragraph cache keys, stable across re-validations.
+        excerpt_allowance = self.config.advisor_batch_token_budget // 4
+        return (
+            self._batched_rules(document_rules, estimate_tokens(text)),
+            self._batched_rules(window_rules, excerpt_allowance),
+        )
+
+    @staticmethod
+    def _by_relevance(batches: list[list[Rule]], scores: dict[str, float]) -> list[list[Rule]]:
+        """Most relevant batches first, so the scheduler admits them before the rest."""
+        return sorted(batches, key=lambda batch: -max(scores.get(rule.name, 0.0) for rule in batch))
+
+    async def _resolve_and_dedup(
         self,
         violations: list[DetectionViolation],
-        text: str,
+        index: TextIndex,
         rule_lookup: dict[str, Rule],
     ) -> list[ResolvedDetection]:
         """Resolve detection snippets to character positions and drop duplicates.
@@ -304,71 +717,850 @@ class AdvisorService:
         being collapsed onto the first (and then dropped as a duplicate).
         """
         survivors: list[ResolvedDetection] = []
-        consumed_by_rule: dict[str, list[tuple[int, int]]] = {}
+        seen: dict[str, IntervalIndex] = {}
+        consumed_by_rule: dict[str, IntervalIndex] = {}
         for violation in violations:
-            consumed = consumed_by_rule.get(violation.rule_name)
-            resolved = self._resolve_detection(violation, text, rule_lookup, consumed_ranges=consumed)
-            if resolved is None:
-                continue
-            if self._is_duplicate(resolved, survivors):
-                continue
-            survivors.append(resolved)
-            consumed_by_rule.setdefault(violation.rule_name, []).append((resolved.range.start, resolved.range.end))
+            await self._resolve_next(violation, index, rule_lookup, survivors, seen, consumed_by_rule)
         return survivors
 
+    async def _resolve_next(
+        self,
+        violation: DetectionViolation,
+        index: TextIndex,
+        rule_lookup: dict[str, Rule],
+        survivors: list[ResolvedDetection],
+        seen: dict[str, IntervalIndex],
+        consumed_by_rule: dict[str, IntervalIndex],
+    ) -> ResolvedDetection | None:
+        """One step of ``_resolve_and_dedup``: resolve a single violation against the state so far.
+
+        Appends to ``survivors`` (and their spans ``seen``) and ``consumed_by_rule``
+        and returns the resolved detection, or returns ``None`` if it could not be
+        located or is a duplicate.
+        """
+        consumed = consumed_by_rule.get(violation.rule_name)
+        resolved = await self._resolve_detection(violation, index, rule_lookup, consumed_ranges=consumed)
+        if resolved is None:
+            return None
+        if self._is_duplicate(resolved, seen):
+            return None
+        self._keep(resolved, survivors, seen)
+        consumed_by_rule.setdefault(violation.rule_name, IntervalIndex()).add(resolved.range.start, resolved.range.end)
+        return resolved
+
+    def _expand_occurrences(
+        self,
+        violation: DetectionViolation,
+        resolved: ResolvedDetection,
+        index: TextIndex,
+        rule_lookup: dict[str, Rule],
+        survivors: list[ResolvedDetection],
+        seen: dict[str, IntervalIndex],
+        consumed_by_rule: dict[str, IntervalIndex],
+    ) -> int:
+        """Keep the further occurrences of a snippet whose rule has ``all_occurrences``.
+
+        Only snippets found verbatim are expanded. Each further non-overlapping
+        occurrence that is neither consumed nor a duplicate becomes a survivor of
+        its own, appended after ``resolved``; a snippet that is a whole word only
+        matches whole words. Every occurrence is consumed, so later reports of the
+        snippet resolve onto them and are dropped as duplicates. Returns the number
+        of occurrences added.
+        """
+        rule = rule_lookup.get(resolved.rule_name)
+        snippet = resolved.source
+        if rule is None or not rule.all_occurrences or snippet != violation.source.strip():
+            return 0
+        text = index.text
+        whole_word = self._is_whole_word(text, resolved.range.start, resolved.range.end)
+        consumed = consumed_by_rule.setdefault(resolved.rule_name, IntervalIndex())
+        added = 0
+        pos = text.find(snippet)
+        while pos != -1:
+            end = pos + len(snippet)
+            if not consumed.overlaps(pos, end):
+                # Consumed even if skipped: a later report of the snippet is one of the kept occurrences.
+                consumed.add(pos, end)
+                occurrence = resolved.model_copy(update={"range": ViolationRange(start=pos, end=end)})
+                if (not whole_word or self._is_whole_word(text, pos, end)) and not self._is_duplicate(occurrence, seen):
+                    self._keep(occurrence, survivors, seen)
+                    added += 1
+            pos = text.find(snippet, pos + 1)
+        return added
+
     async def _process_batch(
         self,
-        text: str,
+        index: TextIndex,
         rule_batch: list[Rule],
         rule_lookup: dict[str, Rule],
+        stats: ProposalStats | None = None,
+        emit: ViolationSink | None = None,
     ) -> list[ViolationResult]:
         """Run step 1 (detection) then step 2 (parallel proposals) for one rule batch.
 
         Dedup is intentionally local to this batch: rule names are globally unique,
         so the cross-batch dedup performed previously never triggered. Keeping it
         per-batch removes shared mutable state and makes batches safe to run in
-        parallel.
+        parallel. ``emit`` receives each violation as soon as its proposal is ready.
         """
+        on_finding = None
+        if emit is not None:
 
-        # --- Step 1: detection -------------------------------------------------
-        try:
-            detection_result: DetectionResult = await asyncio.wait_for(
-                self.detection_agent.run(text, deps=RulesContainer(rules=rule_batch)),
-                timeout=DETECTION_TIMEOUT_SECONDS,
-            )
-        except asyncio.TimeoutError:
-            logger.error(f"Detection timed out after {DETECTION_TIMEOUT_SECONDS}s")
-            return []
+            def on_finding(finding: Finding) -> None:
+                emit(self._build_violation_result(*finding, index))
 
-        # Resolve positions + dedup before requesting proposals (skip wasted calls).
-        survivors = self._resolve_and_dedup(detection_result.violations, text, rule_lookup)
+        findings, _ = await self._detect_and_propose(index, rule_batch, rule_lookup, stats, on_finding=on_finding)
+        return [self._build_violation_result(resolved, proposal, index) for resolved, proposal in findings]
 
-        if not survivors:
-            return []
-
-        # --- Step 2: parallel proposal generation ------------------------------
-        proposal_tasks = [
-            asyncio.wait_for(
-                self.proposal_agent.run(None, deps=self._build_proposal_request(text, resolved, rule_lookup)),
-                timeout=PROPOSAL_TIMEOUT_SECONDS,
-            )
-            for resolved in survivors
-        ]
-        proposals = await asyncio.gather(*proposal_tasks, return_exceptions=True)
+    async def _detect_and_propose(
+        self,
+        index: TextIndex,
+        rule_batch: list[Rule],
+        rule_lookup: dict[str, Rule],
+        stats: ProposalStats | None = None,
+        reserved: list[tuple[int, int]] | None = None,
+        on_finding: Callable[[Finding], None] | None = None,
+    ) -> tuple[list[Finding], bool]:
+        """Detection, resolution and proposals for one rule batch over ``index.text``.
+
+        Detection is streamed: as soon as a violation of the structured output is
+        complete it is resolved, deduplicated and queued for a proposal. Every
+        ``advisor_proposal_batch_size`` queued violations (and the remainder at the
+        end of detection) are dispatched as one proposal call, so proposals overlap
+        with the remainder of the detection run.
+
+        Returns the findings (ranges in code points of ``index.text``) and whether
+        the result is complete, i.e. neither the detection nor any proposal failed.
+        Only complete results may be cached as the answer for this text.
+
+        ``reserved`` ranges of ``index.text`` are context only: snippets of the
+        batch's rules are not resolved into them. ``on_finding`` is called with
+        each finding as soon as its proposal group returns.
+        """
+        started = time.perf_counter()
+        first_detection_at: float | None = None
+        survivors: list[ResolvedDetection] = []
+        seen: dict[str, IntervalIndex] = {}
+
+        def unreserved() -> dict[str, IntervalIndex]:
+            # Pre-consumed, so the resolver skips occurrences inside the context.
+            return {rule.name: IntervalIndex(reserved) for rule in rule_batch} if reserved else {}
+
+        consumed_by_rule = unreserved()
+        pending_requests: list[ProposalRequest] = []
+        proposal_tasks: list[asyncio.Task[list[str | BaseException]]] = []
+        group_sizes: list[int] = []
+        complete = True
+        detected = expanded = 0
+        stats = stats if stats is not None else ProposalStats()
+        samples, required_votes = self._ensemble_plan(rule_batch)
+        if self._use_combined(index.text, rule_batch, samples):
+            return await self._detect_and_propose_combined(index, rule_batch, rule_lookup, stats, reserved, on_finding)
+        voter = AgreementVoter(samples, required_votes) if samples > 1 else None
+        sample_consumed = {sample: unreserved() for sample in range(samples)}
+        failed_samples: list[BaseException] = []
+        verified = confirmed = 0
+
+        def dispatch() -> None:
+            if pending_requests:
+                task = asyncio.create_task(self._propose_group(list(pending_requests), stats))
+                if on_finding is not None:
+                    # Requests are queued in step with survivors.
+                    group = survivors[-len(pending_requests) :]
+                    task.add_done_callback(partial(self._report_group, group, on_finding))
+                proposal_tasks.append(task)
+                group_sizes.append(len(pending_requests))
+                pending_requests.clear()
 
-        results: list[ViolationResult] = []
+        try:
+            try:
+                async with asyncio.timeout(DETECTION_TIMEOUT_SECONDS):
+                    async for sample, violation in self._sampled_detections(
+                        index.text, rule_batch, samples, failed_samples
+                    ):
+                        detected += 1
+                        if first_detection_at is None:
+                            first_detection_at = time.perf_counter()
+                        # --- Step 2, per violation: resolve, dedup, dispatch proposal --
+                        if voter is None:
+                            resolved = await self._resolve_next(
+                                violation, index, rule_lookup, survivors, seen, consumed_by_rule
+                            )
+                        else:
+                            resolved = await self._vote(
+                                voter, sample, violation, index, rule_lookup, survivors, seen, sample_consumed
+                            )
+                        if resolved is None:
+                            continue
+                        copies = self._expand_occurrences(
+                            violation, resolved, index, rule_lookup, survivors, seen, consumed_by_rule
+                        )
+                        expanded += copies
+                        # Each occurrence is asked with its own sentence: the fix may depend on it.
+                        # ``_propose_group`` still makes one call for occurrences in the same sentence.
+                        pending_requests.extend(
+                            self._build_proposal_request(index, kept, rule_lookup) for kept in survivors[-1 - copies :]
+                        )
+                        if len(pending_requests) >= self.config.advisor_proposal_batch_size:
+                            dispatch()
+            except TimeoutError:
+                # Proposals for the violations streamed so far are still collected.
+                logger.error(f"Detection timed out after {DETECTION_TIMEOUT_SECONDS}s")
+                complete = False
+            if failed_samples:
+                complete = False
+            if voter is not None and self.config.advisor_verify_low_agreement:
+                # --- Verification of the candidates the vote rejected ------------
+                candidates = [cluster.detection for cluster in voter.rejected()]
+                verdicts = await self._verify(index, candidates, rule_lookup)
+                verified = len(candidates)
+                for candidate, verdict in zip(candidates, verdicts, strict=True):
+                    if verdict is None:
+                        complete = False
+                    if not verdict or self._is_duplicate(candidate, seen):
+                        continue
+                    confirmed += 1
+                    self._keep(candidate, survivors, seen)
+                    pending_requests.append(self._build_proposal_request(index, candidate, rule_lookup))
+                    if len(pending_requests) >= self.config.advisor_proposal_batch_size:
+                        dispatch()
+            dispatch()
+            detection_done = time.perf_counter()
+            proposals: list[str | BaseException] = []
+            groups = await asyncio.gather(*proposal_tasks, return_exceptions=True)
+            for size, group in zip(group_sizes, groups, strict=True):
+                proposals.extend(group if isinstance(group, list) else [group] * size)
+        finally:
+            # Only reached with pending tasks if detection raised or we were cancelled.
+            pending = [task for task in proposal_tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finished = time.perf_counter()
+
+        findings: list[Finding] = []
         for resolved, proposal in zip(survivors, proposals, strict=True):
             if isinstance(proposal, BaseException):
                 logger.error(
                     f"Proposal generation failed for rule '{resolved.rule_name}' "
                     f"at [{resolved.range.start}:{resolved.range.end}]: {proposal}. Dropping violation."
                 )
+                complete = False
+                continue
+            findings.append((resolved, proposal))
+
+        logger.info(
+            "Advisor batch timing",
+            path="two_stage",
+            text_length=len(index.text),
+            rules=len(rule_batch),
+            samples=samples,
+            detected=detected,
+            expanded=expanded,
+            rejected=len(voter.rejected()) if voter is not None else 0,
+            verified=verified,
+            confirmed=confirmed,
+            proposals=len(survivors),
+            proposal_calls=len(proposal_tasks),
+            first_detection_ms=round((first_detection_at - started) * 1000) if first_detection_at else None,
+            detection_ms=round((detection_done - started) * 1000),
+            proposal_tail_ms=round((finished - detection_done) * 1000),
+            total_ms=round((finished - started) * 1000),
+        )
+        return findings, complete
+
+    def _use_combined(self, text: str, rule_batch: list[Rule], samples: int) -> bool:
+        """Whether ``rule_batch`` over ``text`` takes the single-call fast path.
+
+        Short texts checked against few rules are answered by one call that
+        returns the proposals with the detections, saving the proposal round
+        trips. Ensembles always run both stages: only accepted clusters get
+        proposals.
+        """
+        return (
+            samples == 1
+            and 0 < len(text) <= self.config.advisor_fast_path_max_chars
+            and len(rule_batch) <= self.config.advisor_fast_path_max_rules
+        )
+
+    async def _detect_and_propose_combined(
+        self,
+        index: TextIndex,
+        rule_batch: list[Rule],
+        rule_lookup: dict[str, Rule],
+        stats: ProposalStats,
+        reserved: list[tuple[int, int]] | None = None,
+        on_finding: Callable[[Finding], None] | None = None,
+    ) -> tuple[list[Finding], bool]:
+        """Fast path of ``_detect_and_propose``: detections and their proposals from one call.
+
+        Each finding is resolved and reported as soon as it is complete in the
+        stream. Findings without a usable proposal fall back to a proposal call.
+        """
+        started = time.perf_counter()
+        first_detection_at: float | None = None
+        survivors: list[ResolvedDetection] = []
+        seen: dict[str, IntervalIndex] = {}
+        answers: list[str | BaseException | None] = []
+        consumed_by_rule = {rule.name: IntervalIndex(reserved) for rule in rule_batch} if reserved else {}
+        complete = True
+        detected = expanded = 0
+        stats.combined_calls += 1
+        try:
+            async with asyncio.timeout(DETECTION_TIMEOUT_SECONDS):
+                async for violation in self._stream_combined(index.text, rule_batch):
+                    detected += 1
+                    if first_detection_at is None:
+                        first_detection_at = time.perf_counter()
+                    resolved = await self._resolve_next(
+                        violation, index, rule_lookup, survivors, seen, consumed_by_rule
+                    )
+                    if resolved is None:
+                        continue
+                    proposal = violation.proposal.strip()
+                    answers.append(proposal or None)
+                    if proposal and on_finding is not None:
+                        on_finding((resolved, proposal))
+                    copies = self._expand_occurrences(
+                        violation, resolved, index, rule_lookup, survivors, seen, consumed_by_rule
+                    )
+                    expanded += copies
+                    # The streamed proposal fits the reported sentence only; the copies fall back.
+                    answers.extend([None] * copies)
+        except TimeoutError:
+            logger.error(f"Detection timed out after {DETECTION_TIMEOUT_SECONDS}s")
+            complete = False
+        detection_done = time.perf_counter()
+
+        missing = [i for i, answer in enumerate(answers) if answer is None]
+        if missing:
+            requests = [self._build_proposal_request(index, survivors[i], rule_lookup) for i in missing]
+            for i, proposal in zip(missing, await self._propose_group(requests, stats), strict=True):
+                answers[i] = proposal
+                if isinstance(proposal, str) and on_finding is not None:
+                    on_finding((survivors[i], proposal))
+        finished = time.perf_counter()
+
+        findings: list[Finding] = []
+        for resolved, answer in zip(survivors, answers, strict=True):
+            if isinstance(answer, BaseException):
+                logger.error(
+                    f"Proposal generation failed for rule '{resolved.rule_name}' "
+                    f"at [{resolved.range.start}:{resolved.range.end}]: {answer}. Dropping violation."
+                )
+                complete = False
+            elif answer is not None:
+                findings.append((resolved, answer))
+
+        logger.info(
+            "Advisor batch timing",
+            path="combined",
+            text_length=len(index.text),
+            rules=len(rule_batch),
+            detected=detected,
+            expanded=expanded,
+            proposals=len(survivors),
+            fallback_proposals=len(missing),
+            first_detection_ms=round((first_detection_at - started) * 1000) if first_detection_at else None,
+            detection_ms=round((detection_done - started) * 1000),
+            proposal_tail_ms=round((finished - detection_done) * 1000),
+            total_ms=round((finished - started) * 1000),
+        )
+        return findings, complete
+
+    @staticmethod
+    def _report_group(
+        group: list[ResolvedDetection],
+        on_finding: Callable[[Finding], None],
+        task: asyncio.Task[list[str | BaseException]],
+    ) -> None:
+        """Done callback of a proposal group: report the findings whose proposal succeeded."""
+        if task.cancelled() or task.exception() is not None:
+            return
+        for resolved, proposal in zip(group, task.result(), strict=True):
+            if not isinstance(proposal, BaseException):
+                on_finding((resolved, proposal))
+
+    async def _verify(
+        self, index: TextIndex, candidates: list[ResolvedDetection], rule_lookup: dict[str, Rule]
+    ) -> list[bool | None]:
+        """Yes/no verdict of the verification agent for each candidate, in order.
+
+        The candidates are checked concurrently, each with its rule and the
+        sentence around its snippet. A check that fails or takes longer than
+        ``VERIFICATION_TIMEOUT_SECONDS`` yields ``None``.
+        """
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    self.verification_agent.run(None, deps=self._build_proposal_request(index, candidate, rule_lookup)),
+                    timeout=VERIFICATION_TIMEOUT_SECONDS,
+                )
+                for candidate in candidates
+            ),
+            return_exceptions=True,
+        )
+        verdicts: list[bool | None] = []
+        for candidate, result in zip(candidates, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.error(f"Verification failed for rule '{candidate.rule_name}': {result}. Dropping candidate.")
+                verdicts.append(None)
+            else:
+                verdicts.append(result.violated)
+        return verdicts
+
+    async def _propose_group(self, requests: list[ProposalRequest], stats: ProposalStats) -> list[str | BaseException]:
+        """Proposals for ``requests``, in order; failed items are returned as exceptions.
+
+        Each distinct request (see ``_proposal_cache_key``) is answered once: from
+        the proposal cache, by an identical call already in flight for another
+        group (of this or another request), or by a call of this group. If the
+        group owning a joined call is cancelled, the request is asked again.
+        """
+        keys = [self._proposal_cache_key(request) for request in requests]
+        answers: dict[str, str | BaseException] = {}
+        joined: dict[str, asyncio.Future[str | BaseException]] = {}
+        owned: dict[str, ProposalRequest] = {}
+        for key, request in zip(keys, requests, strict=True):
+            if key in answers or key in joined or key in owned:
+                stats.deduplicated += 1
+            elif (cached := self.proposal_cache.get(key)) is not None:
+                stats.cache_hits += 1
+                answers[key] = cached
+            elif (future := self._proposals_in_flight.get(key)) is not None:
+                stats.deduplicated += 1
+                joined[key] = future
+            else:
+                owned[key] = request
+
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in owned}
+        self._proposals_in_flight.update(futures)
+        try:
+            if owned:
+                proposals = await self._request_proposals(list(owned.values()), stats)
+                for key, proposal in zip(owned, proposals, strict=True):
+                    answers[key] = proposal
+                    futures[key].set_result(proposal)
+                    if isinstance(proposal, str):
+                        self.proposal_cache.put(key, proposal)
+        finally:
+            for key, future in futures.items():
+                # Removed first: a group that asks again must not join the cancelled call.
+                del self._proposals_in_flight[key]
+                if not future.done():
+                    future.set_result(ProposalCallCancelled())
+        retry: dict[str, ProposalRequest] = {}
+        for key, future in joined.items():
+            # Shielded: cancelling this group must not cancel the call shared with the others.
+            answer = await asyncio.shield(future)
+            if isinstance(answer, ProposalCallCancelled):
+                # The owning group was cancelled (disconnect, deadline, lost hedge), not this one: ask again.
+                retry[key] = requests[keys.index(key)]
+            else:
+                answers[key] = answer
+        if retry:
+            answers.update(zip(retry, await self._propose_group(list(retry.values()), stats), strict=True))
+        return [answers[key] for key in keys]
+
+    def _proposal_cache_key(self, request: ProposalRequest) -> str:
+        """Hash of what a proposal depends on: rule, snippet, context sentence, prompts and model.
+
+        The detection's ``reason`` is left out, so findings that differ only in
+        its wording share a proposal.
+        """
+        digest = hashlib.sha256()
+        for part in (
+            PROPOSAL_PROMPT_VERSION,
+            BATCH_PROPOSAL_PROMPT_VERSION,
+            self.config.llm_model,
+            request.rule.name,
+            request.rule.prompt_json,
+            request.source,
+            request.context_sentence,
+        ):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def _request_proposals(
+        self, requests: list[ProposalRequest], stats: ProposalStats
+    ) -> list[str | BaseException]:
+        """Proposals for ``requests`` from the proposal agents, in order; failed items are returned as exceptions.
+
+        Several requests go to the batched proposal agent in one call. Items the
+        batched call did not answer (missing, empty, or the whole call failed) fall
+        back to one single-proposal call each.
+        """
+        results: list[str | BaseException | None] = [None] * len(requests)
+        if len(requests) > 1:
+            rules = list({request.rule.name: request.rule for request in requests}.values())
+            batch_request = BatchProposalRequest(
+                rules=rules,
+                items=[
+                    BatchProposalItem(
+                        id=i,
+                        rule_name=request.rule.name,
+                        source=request.source,
+                        reason=request.reason,
+                        context_sentence=request.context_sentence,
+                    )
+                    for i, request in enumerate(requests)
+                ],
+            )
+            batch_tokens = estimate_tokens(render_batch_proposal_instruction(batch_request))
+            stats.batched_calls += 1
+            try:
+                batch_result = await asyncio.wait_for(
+                    self.batch_proposal_agent.run(None, deps=batch_request),
+                    timeout=PROPOSAL_TIMEOUT_SECONDS,
+                )
+                for item in batch_result.proposals:
+                    if 0 <= item.id < len(requests) and item.proposal.strip() and results[item.id] is None:
+                        results[item.id] = item.proposal
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Batched proposal call failed, falling back to single proposals: {e}")
+            covered = [request for request, result in zip(requests, results, strict=True) if result is not None]
+            if covered:
+                stats.calls_saved += len(covered) - 1
+                stats.prompt_tokens_saved += (
+                    sum(estimate_tokens(render_proposal_instruction(request)) for request in covered) - batch_tokens
+                )
+            else:
+                stats.calls_saved -= 1
+                stats.prompt_tokens_saved -= batch_tokens
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        stats.single_calls += len(missing)
+        fallbacks = await asyncio.gather(
+            *(
+                asyncio.wait_for(self.proposal_agent.run(None, deps=requests[i]), timeout=PROPOSAL_TIMEOUT_SECONDS)
+                for i in missing
+            ),
+            return_exceptions=True,
+        )
+        for i, fallback in zip(missing, fallbacks, strict=True):
+            results[i] = fallback
+        return [result for result in results if result is not None]
+
+    def _ensemble_plan(self, rule_batch: list[Rule]) -> tuple[int, dict[str, int]]:
+        """Detection samples to run for ``rule_batch`` and the votes a finding of each rule needs.
+
+        A batch runs the largest K among the kinds of its rules; each rule's
+        acceptance threshold is a fraction of the samples actually run.
+        """
+        config = self.config
+        samples_by_kind = {
+            "mechanical": config.advisor_ensemble_k_mechanical,
+            "lexical": config.advisor_ensemble_k_lexical,
+            "semantic": config.advisor_ensemble_k_semantic,
+        }
+        agreement_by_kind = {
+            "mechanical": config.advisor_accept_agreement_mechanical,
+            "lexical": config.advisor_accept_agreement_lexical,
+            "semantic": config.advisor_accept_agreement_semantic,
+        }
+        samples = max((samples_by_kind[rule.kind] for rule in rule_batch), default=1)
+        required_votes = {
+            # Rounded first so that e.g. 0.6 * 5 needs 3 votes, not 4.
+            rule.name: max(1, math.ceil(round(agreement_by_kind[rule.kind] * samples, 9)))
+            for rule in rule_batch
+        }
+        return samples, required_votes
+
+    async def _vote(
+        self,
+        voter: AgreementVoter,
+        sample: int,
+        violation: DetectionViolation,
+        index: TextIndex,
+        rule_lookup: dict[str, Rule],
+        survivors: list[ResolvedDetection],
+        seen: dict[str, IntervalIndex],
+        sample_consumed: dict[int, dict[str, IntervalIndex]],
+    ) -> ResolvedDetection | None:
+        """Ensemble counterpart of ``_resolve_next``.
+
+        The violation is resolved against its own sample's consumed offsets, so
+        every sample maps repeated snippets onto the same occurrences, and then
+        counted as a vote. Returns the cluster representative once it is
+        accepted and not a duplicate of an earlier survivor.
+        """
+        consumed_by_rule = sample_consumed.setdefault(sample, {})
+        candidate = await self._resolve_detection(
+            violation, index, rule_lookup, consumed_ranges=consumed_by_rule.get(violation.rule_name)
+        )
+        if candidate is None:
+            return None
+        consumed_by_rule.setdefault(violation.rule_name, IntervalIndex()).add(
+            candidate.range.start, candidate.range.end
+        )
+        accepted = voter.add(sample, candidate)
+        if accepted is None or self._is_duplicate(accepted, seen):
+            return None
+        self._keep(accepted, survivors, seen)
+        return accepted
+
+    async def _sampled_detections(
+        self, text: str, rule_batch: list[Rule], samples: int, failures: list[BaseException]
+    ) -> AsyncIterator[tuple[int, DetectionViolation]]:
+        """Yield ``(sample, violation)`` from ``samples`` concurrent detection runs as they complete.
+
+        A single sample is the plain detection call. With more, every sample
+        runs with its own rule order and a non-zero temperature; a failing
+        sample is logged and appended to ``failures`` while the others continue,
+        unless all of them fail.
+        """
+        if samples == 1:
+            async for violation in self._stream_detections(text, rule_batch):
+                yield 0, violation
+            return
+
+        queue: asyncio.Queue[tuple[int, DetectionViolation | None]] = asyncio.Queue()
+
+        async def run(sample: int) -> None:
+            try:
+                async for violation in self._stream_detections(text, rule_batch, sample=sample):
+                    queue.put_nowait((sample, violation))
+            except Exception as e:
+                logger.error(f"Detection sample {sample} failed: {e}")
+                failures.append(e)
+            finally:
+                queue.put_nowait((sample, None))
+
+        tasks = [asyncio.create_task(run(sample)) for sample in range(samples)]
+        try:
+            running = samples
+            while running:
+                sample, violation = await queue.get()
+                if violation is None:
+                    running -= 1
+                else:
+                    yield sample, violation
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if len(failures) == samples:
+            raise failures[0]
+
+    async def _stream_detections(
+        self, text: str, rule_batch: list[Rule], sample: int | None = None
+    ) -> AsyncIterator[DetectionViolation]:
+        """Yield each detected violation as soon as it is complete.
+
+        The agent streams partial ``DetectionResult`` snapshots; a list element is
+        final once a later element has started, and the last snapshot is the
+        complete result, which is then stored in the detection cache.
+
+        ``sample`` selects an ensemble sample: the rules are shuffled with the
+        sample number as seed and sent with ``advisor_detection_temperature``.
+        Each sample is cached on its own.
+        """
+        kwargs: dict[str, Any] = {}
+        variant = ""
+        if sample is not None:
+            rule_batch = list(rule_batch)
+            random.Random(sample).shuffle(rule_batch)
+            temperature = self.config.advisor_detection_temperature
+            kwargs["model_settings"] = {"temperature": temperature}
+            variant = f"sample={sample};temperature={temperature}"
+
+        cache_key = self._detection_cache_key(text, rule_batch, variant)
+        async for violation in self._stream_output(self.detection_agent, text, rule_batch, cache_key, **kwargs):
+            yield violation
+
+    async def _stream_combined(self, text: str, rule_batch: list[Rule]) -> AsyncIterator[CombinedViolation]:
+        """Yield each violation of the fast-path call, with its proposal, as soon as it is complete."""
+        cache_key = self._detection_cache_key(text, rule_batch, f"combined={COMBINED_PROMPT_VERSION}")
+        async for violation in self._stream_output(self.combined_agent, text, rule_batch, cache_key):
+            yield cast(CombinedViolation, violation)
+
+    async def _stream_output(
+        self,
+        agent: ViolationDetectionAgent | DetectAndProposeAgent,
+        text: str,
+        rule_batch: list[Rule],
+        cache_key: str,
+        **kwargs: Any,
+    ) -> AsyncIterator[DetectionViolation]:
+        """Yield each violation of ``agent``'s output for ``text`` as soon as it is complete.
+
+        Cached results under ``cache_key`` are replayed; otherwise the complete
+        result is stored there once the stream ends.
+        """
+        cached = self.detection_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Detection cache hit", rules=[rule.name for rule in rule_batch])
+            for violation in cached.violations:
+                yield violation
+            return
+
+        emitted = 0
+        final: DetectionResult | CombinedResult | None = None
+        async for snapshot in agent.run_stream_output(text, deps=RulesContainer(rules=rule_batch), **kwargs):
+            final = snapshot
+            complete_items = len(snapshot.violations) - 1
+            while emitted < complete_items:
+                yield snapshot.violations[emitted]
+                emitted += 1
+
+        if final is None:
+            return
+        for violation in final.violations[emitted:]:
+            yield violation
+        self.detection_cache.put(cache_key, final)
+
+    def _cached_paragraph_findings(
+        self, index: TextIndex, paragraphs: list[tuple[int, int]], rule_batch: list[Rule]
+    ) -> tuple[list[Finding], list[tuple[int, int]]]:
+        """Split paragraphs into those answered by the paragraph cache and those that are not.
+
+        Returns the cached findings re-anchored to the paragraphs' current offsets,
+        and the spans of the paragraphs that still need detection. Outside
+        incremental mode every paragraph needs detection.
+        """
+        if not self.config.advisor_incremental:
+            return [], list(paragraphs)
+        findings: list[Finding] = []
+        pending: list[tuple[int, int]] = []
+        for start, end in paragraphs:
+            cached = self.paragraph_cache.get(self._detection_cache_key(index.text[start:end], rule_batch))
+            if cached is None:
+                pending.append((start, end))
                 continue
-            results.append(self._build_violation_result(resolved, proposal, text))
+            findings.extend((self._shift(resolved, start), proposal) for resolved, proposal in cached)
+        return findings, pending
+
+    async def _process_paragraphs(
+        self,
+        index: TextIndex,
+        paragraphs: list[tuple[int, int]],
+        rule_batch: list[Rule],
+        rule_lookup: dict[str, Rule],
+        stats: ProposalStats | None = None,
+        emit: ViolationSink | None = None,
+    ) -> list[ViolationResult]:
+        """Check one window of paragraphs of ``index.text`` against a window-scoped batch.
+
+        The paragraphs are sent as one excerpt (joined by blank lines), between
+        the sentence before and the sentence after the window as context. Snippets
+        are not resolved into the context, which belongs to the neighbouring
+        windows. Findings are mapped back to full-text offsets and, in
+        incremental mode, cached per paragraph; ``emit`` receives each as soon as its proposal is ready.
+        """
+        separator = "\n\n"
+        before = index.sentence_before(paragraphs[0][0])
+        after = index.sentence_after(paragraphs[-1][1])
+        excerpt_starts: list[int] = []
+        offset = len(before) + len(separator) if before else 0
+        for start, end in paragraphs:
+            excerpt_starts.append(offset)
+            offset += end - start + len(separator)
+        body = separator.join(index.text[start:end] for start, end in paragraphs)
+        excerpt = separator.join(part for part in (before, body, after) if part)
+        excerpt_index = await asyncio.to_thread(TextIndex.from_text, excerpt)
+        body_end = excerpt_starts[0] + len(body)
+        context = [(0, excerpt_starts[0]), (body_end, len(excerpt))]
+
+        def locate(resolved: ResolvedDetection) -> tuple[int, ResolvedDetection | None] | None:
+            """Paragraph of a finding and its paragraph-relative position, if it has one."""
+            i = bisect_right(excerpt_starts, resolved.range.start) - 1
+            if i < 0 or resolved.range.start >= body_end:
+                # Only possible through the fuzzy fallbacks: the context is reserved.
+                return None
+            para_start, para_end = paragraphs[i]
+            relative = self._shift(resolved, -excerpt_starts[i])
+            if relative.range.end > para_end - para_start:
+                # Spans a paragraph break of the excerpt; there is no faithful
+                # position in the full text.
+                return i, None
+            return i, relative
+
+        on_finding = None
+        if emit is not None:
+
+            def on_finding(finding: Finding) -> None:
+                located = locate(finding[0])
+                if located is None:
+                    return
+                i, relative = located
+                if relative is not None:
+                    emit(self._build_violation_result(self._shift(relative, paragraphs[i][0]), finding[1], index))
+
+        findings, complete = await self._detect_and_propose(
+            excerpt_index,
+            rule_batch,
+            rule_lookup,
+            stats,
+            reserved=[(start, end) for start, end in context if end > start],
+            on_finding=on_finding,
+        )
+
+        per_paragraph: list[list[Finding]] = [[] for _ in paragraphs]
+        cacheable = [complete and self.config.advisor_incremental] * len(paragraphs)
+        for resolved, proposal in findings:
+            located = locate(resolved)
+            if located is None:
+                continue
+            i, relative = located
+            if relative is None:
+                # The paragraph must be re-checked.
+                logger.debug("Dropping finding that crosses a paragraph break", rule=resolved.rule_name)
+                cacheable[i] = False
+                continue
+            per_paragraph[i].append((relative, proposal))
+
+        results: list[ViolationResult] = []
+        for (start, end), paragraph_findings, cache_it in zip(paragraphs, per_paragraph, cacheable, strict=True):
+            if cache_it:
+                self.paragraph_cache.put(
+                    self._detection_cache_key(index.text[start:end], rule_batch), paragraph_findings
+                )
+            results.extend(
+                self._build_violation_result(self._shift(resolved, start), proposal, index)
+                for resolved, proposal in paragraph_findings
+            )
         return results
 
+    @staticmethod
+    def _shift(resolved: ResolvedDetection, delta: int) -> ResolvedDetection:
+        return resolved.model_copy(
+            update={"range": ViolationRange(start=resolved.range.start + delta, end=resolved.range.end + delta)}
+        )
+
+    def _detection_cache_key(self, text: str, rule_batch: list[Rule], variant: str = "") -> str:
+        """Hash of everything that determines the detection output for a batch.
+
+        ``variant`` distinguishes calls that differ beyond text and rules, such
+        as ensemble samples.
+        """
+        digest = hashlib.sha256()
+        for part in (DETECTION_PROMPT_VERSION, self.config.llm_model, text, variant):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        for rule in sorted(rule_batch, key=lambda rule: rule.name):
+            digest.update(rule.prompt_json.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _checker_violation(self, hit: CheckerHit, index: TextIndex) -> ViolationResult:
+        resolved = ResolvedDetection(
+            rule_name=hit.rule.name,
+            reason=self._to_swiss_german(hit.reason),
+            source=hit.source,
+            range=ViolationRange(start=hit.start, end=hit.end),
+            file_name=hit.rule.file_name,
+            page_number=hit.rule.page_number,
+            collection=hit.rule.collection,
+        )
+        return self._build_violation_result(resolved, hit.proposal, index)
+
     def _build_proposal_request(
-        self, text: str, resolved: ResolvedDetection, rule_lookup: dict[str, Rule]
+        self, index: TextIndex, resolved: ResolvedDetection, rule_lookup: dict[str, Rule]
     ) -> ProposalRequest:
         rule = rule_lookup.get(resolved.rule_name)
         if rule is None:
@@ -384,27 +1576,26 @@ class AdvisorService:
             rule=rule,
             source=resolved.source,
             reason=resolved.reason,
-            context_sentence=self._surrounding_sentence(text, resolved.range),
+            context_sentence=self._surrounding_sentence(index, resolved.range),
         )
 
-    def _surrounding_sentence(self, text: str, range_: ViolationRange) -> str:
+    def _surrounding_sentence(self, index: TextIndex, range_: ViolationRange) -> str:
         """Return the sentence/segment unit that contains the violating range."""
-        units = self._split_into_search_units(text)
-        for unit_text, unit_start in units:
-            unit_end = unit_start + len(unit_text)
-            if unit_start <= range_.start < unit_end:
-                return unit_text
+        unit = index.unit_at(range_.start)
+        if unit is not None:
+            return unit[0]
         # Fallback: widen around the range.
+        text = index.text
         start = max(0, range_.start - 80)
         end = min(len(text), range_.end + 80)
         return text[start:end]
 
-    def _resolve_detection(
+    async def _resolve_detection(
         self,
         violation: DetectionViolation,
-        text: str,
+        index: TextIndex,
         rule_lookup: dict[str, Rule],
-        consumed_ranges: list[tuple[int, int]] | None = None,
+        consumed_ranges: IntervalIndex | None = None,
     ) -> ResolvedDetection | None:
         """Resolve a detection's source snippet to character positions in the original text."""
         source = violation.source.strip()
@@ -412,12 +1603,13 @@ class AdvisorService:
             logger.warn(f"Empty source for violation: {violation.rule_name}")
             return None
 
-        found = self._find_source(source, text, consumed=consumed_ranges)
+        found = await self.span_resolver.find_source(source, index, consumed_ranges)
         if found is None:
             logger.warn(f"Could not locate source in text: '{source[:80]}' (rule: {violation.rule_name})")
             return None
         pos, match_len = found
 
+        text = index.text
         end = min(pos + match_len, len(text))
 
         rule = rule_lookup.get(violation.rule_name)
@@ -432,11 +1624,11 @@ class AdvisorService:
             collection=rule.collection if rule else "",
         )
 
-    def _build_violation_result(self, resolved: ResolvedDetection, proposal: str, text: str) -> ViolationResult:
+    def _build_violation_result(self, resolved: ResolvedDetection, proposal: str, index: TextIndex) -> ViolationResult:
         # API boundary: the frontend is JavaScript, which indexes strings by
         # UTF-16 code units. All internal work (resolution, dedup, slicing) runs
         # on Python code points, so we translate the range to UTF-16 here, on the
-        # way out. See ``_to_utf16_offset`` for the rationale.
+        # way out. See ``TextIndex.to_utf16`` for the rationale.
         return ViolationResult(
             rule_name=resolved.rule_name,
             reason=resolved.reason,
@@ -445,203 +1637,42 @@ class AdvisorService:
             file_name=resolved.file_name,
             page_number=resolved.page_number,
             range=ViolationRange(
-                start=self._to_utf16_offset(text, resolved.range.start),
-                end=self._to_utf16_offset(text, resolved.range.end),
+                start=index.to_utf16(resolved.range.start),
+                end=index.to_utf16(resolved.range.end),
             ),
             collection=resolved.collection,
         )
 
     @staticmethod
-    def _to_utf16_offset(text: str, codepoint_offset: int) -> int:
-        """Translate a Python code-point index into a JavaScript UTF-16 code-unit index.
-
-        Python ``str`` is a sequence of Unicode code points; ``str.find`` /
-        slicing / regex offsets are therefore code-point based. JavaScript, by
-        contrast, stores strings as UTF-16 and indexes them by **code unit**.
-        The two indexing schemes agree for every Basic Multilingual Plane (BMP)
-        character — that covers all of Latin, umlauts, ``ß``, accented letters,
-        Cyrillic, CJK, etc. They diverge only for code points >= U+10000
-        (supplementary plane: emoji, some symbols, historic scripts), which are
-        a single Python code point but two UTF-16 code units (a surrogate pair).
-
-        For each character before ``codepoint_offset`` we add 2 when it lies
-        outside the BMP and 1 otherwise, yielding the offset a JS consumer would
-        compute. This keeps UTF-16 translation at the API boundary only; all
-        internal resolution logic continues to operate on code points.
-        """
-        return sum(2 if ord(ch) >= 0x10000 else 1 for ch in text[:codepoint_offset])
-
-    def _find_source(
-        self, source: str, text: str, consumed: list[tuple[int, int]] | None = None
-    ) -> tuple[int, int] | None:
-        """Try to locate source in text. Returns (position, length) or None.
-
-        All offsets here are **Python code points** (the native ``str`` indexing
-        unit), not UTF-8 bytes and not UTF-16 code units. This is deliberate:
-        the result feeds back into Python slicing (``text[pos:end]``), regex
-        offsets, dedup and the ``consumed`` loop, which all operate on code
-        points. Translation to JavaScript UTF-16 code-unit indices happens once,
-        at the API boundary, in ``_build_violation_result``.
-
-        When ``consumed`` ranges are given, the first match that does not overlap
-        any consumed range is returned. This lets repeated identical snippets
-        resolve to distinct occurrences instead of all collapsing onto the first
-        (which would then be dropped as a duplicate by ``_is_duplicate``).
-        """
-        if not consumed:
-            return self._find_source_first(source, text, 0)
-
-        min_start = 0
-        last_pos = -1
-        while True:
-            found = self._find_source_first(source, text, min_start)
-            if found is None:
-                return None
-            pos, match_len = found
-            if not self._overlaps_any((pos, pos + match_len), consumed):
-                return found
-            # Match overlaps an already-consumed span: advance and look for the next.
-            if pos <= last_pos:
-                # No progress possible (normalized/fuzzy paths ignore ``start``);
-                # return the best we have rather than loop forever.
-                return found
-            last_pos = pos
-            min_start = pos + 1
-
-    def _find_source_first(self, source: str, text: str, start: int = 0) -> tuple[int, int] | None:
-        """Single-pass search cascade from a minimum start offset.
-
-        The exact and case-insensitive paths honour ``start``; the normalized and
-        fuzzy fallbacks do not (they are rare edge cases) and return the first
-        match instead.
-        """
-        pos = text.find(source, start)
-        if pos != -1:
-            return pos, len(source)
-
-        lower_text = text.lower()
-        lower_source = source.lower()
-        pos = lower_text.find(lower_source, start)
-        if pos != -1:
-            return pos, len(source)
-
-        normalized_text = self._normalize_whitespace(text)
-        normalized_source = self._normalize_whitespace(source)
-        pos = normalized_text.find(normalized_source)
-        if pos != -1:
-            orig_start = self._map_normalized_to_original(text, normalized_text, pos)
-            if orig_start is not None:
-                # Map the end of the normalized match back to original coords so
-                # collapsed-whitespace runs are reflected in the span length. Only
-                # apply the corrected length when it is at least as long as the
-                # (possibly whitespace-rich) source; otherwise fall back to be safe.
-                orig_end = self._map_normalized_to_original(text, normalized_text, pos + len(normalized_source))
-                if orig_end is not None and orig_end - orig_start >= len(source):
-                    return orig_start, orig_end - orig_start
-                return orig_start, len(source)
-
-        return self._fuzzy_find(source, text)
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        """Whether ``text[start:end]`` is not part of a longer word."""
+        joined_left = 0 < start < len(text) and text[start - 1].isalnum() and text[start].isalnum()
+        joined_right = 0 < end < len(text) and text[end - 1].isalnum() and text[end].isalnum()
+        return not joined_left and not joined_right
 
     @staticmethod
-    def _overlaps_any(rng: tuple[int, int], ranges: list[tuple[int, int]]) -> bool:
-        for r in ranges:
-            if min(rng[1], r[1]) > max(rng[0], r[0]):
-                return True
-        return False
-
-    def _normalize_whitespace(self, text: str) -> str:
-        return re.sub(r"\s+", " ", text)
-
-    def _map_normalized_to_original(self, original: str, normalized: str, norm_pos: int) -> int | None:
-        """Map a position in whitespace-normalized text back to the original text.
-
-        Whitespace normalization collapses each run of whitespace to a single
-        space, so one normalized space corresponds to a run of 1+ whitespace chars
-        in the original. This walks both in lockstep, consuming whole original
-        whitespace runs so the mapping is correct even across collapsed runs.
-        """
-        orig_pos = 0
-        norm_idx = 0
-        while norm_idx < norm_pos and orig_pos < len(original):
-            if normalized[norm_idx] == original[orig_pos] and not original[orig_pos].isspace():
-                norm_idx += 1
-                orig_pos += 1
-            elif normalized[norm_idx].isspace() and original[orig_pos].isspace():
-                norm_idx += 1
-                orig_pos += 1
-                # Consume the remainder of this original whitespace run.
-                while orig_pos < len(original) and original[orig_pos].isspace():
-                    orig_pos += 1
-            else:
-                return None
-        return orig_pos if norm_idx == norm_pos else None
-
-    def _fuzzy_find(self, needle: str, haystack: str) -> tuple[int, int] | None:
-        """Find the best fuzzy match for needle in haystack."""
-        if len(needle) < 2:
-            return None
-
-        best_ratio = 0.0
-        best_pos = -1
-        best_len = len(needle)
-
-        candidates = self._split_into_search_units(haystack)
-
-        for candidate_text, candidate_start in candidates:
-            if len(candidate_text) < 2:
-                continue
-
-            search_window = candidate_text
-            if len(needle) < len(candidate_text):
-                window_start = max(0, candidate_text.lower().find(needle[:5].lower()))
-                window = max(len(needle), 10)
-                search_window = candidate_text[max(0, window_start - 5) : window_start + window + 10]
-                offset = max(0, window_start - 5)
-            else:
-                offset = 0
-
-            ratio = SequenceMatcher(None, needle.lower(), search_window.lower()).find_longest_match(
-                0, len(needle), 0, len(search_window)
-            )
-            if ratio.size > 0:
-                matched_text = needle[ratio.a : ratio.a + ratio.size]
-                full_ratio = SequenceMatcher(None, needle.lower(), matched_text.lower()).ratio()
-                if full_ratio > best_ratio:
-                    best_ratio = full_ratio
-                    best_pos = candidate_start + offset + ratio.b
-                    best_len = max(ratio.size, len(needle) // 2)
-
-        if best_ratio >= FUZZY_MATCH_THRESHOLD and best_pos >= 0:
-            return best_pos, best_len
-
-        return None
-
-    def _split_into_search_units(self, text: str) -> list[tuple[str, int]]:
-        """Split text into sentences/segments with their character offsets."""
-        units: list[tuple[str, int]] = []
-        for match in re.finditer(r"[^.!?\n]+[.!?\n]?", text):
-            units.append((match.group(), match.start()))
-        if not units and text:
-            units.append((text, 0))
-        return units
-
-    def _is_duplicate(self, detection: ResolvedDetection, seen: list[ResolvedDetection]) -> bool:
-        """Check if a detection duplicates an already-seen one."""
-        for s in seen:
-            if s.rule_name != detection.rule_name:
-                continue
-            overlap = min(s.range.end, detection.range.end) - max(s.range.start, detection.range.start)
-            if overlap > 0:
-                return True
-            if s.range.start == detection.range.start:
-                return True
-        return False
+    def _keep(detection: ResolvedDetection, survivors: list[ResolvedDetection], seen: dict[str, IntervalIndex]) -> None:
+        """Append ``detection`` to ``survivors`` and its span to ``seen``, the survivors' spans per rule."""
+        survivors.append(detection)
+        seen.setdefault(detection.rule_name, IntervalIndex()).add(detection.range.start, detection.range.end)
+
+    def _is_duplicate(self, detection: ResolvedDetection, seen: dict[str, IntervalIndex]) -> bool:
+        """Check if a detection overlaps or starts at a span already ``seen`` for its rule."""
+        spans = seen.get(detection.rule_name)
+        if spans is None:
+            return False
+        return spans.has_start(detection.range.start) or spans.overlaps(detection.range.start, detection.range.end)
 
     def _to_swiss_german(self, text: str) -> str:
         """Replace ß with ss for Swiss German convention."""
         return text.replace("ß", "ss")
 
-    def _batched_rules(self, rules: list[Rule], batch_size: int, max_rules: int = MAX_RULES) -> Iterator[list[Rule]]:
-        sorted_rules = sorted(rules, key=lambda r: r.collection)
-        for i in range(0, min(len(sorted_rules), max_rules), batch_size):
-            yield sorted_rules[i : i + batch_size]
+    def _batched_rules(self, rules: list[Rule], text_tokens: int) -> list[list[Rule]]:
+        """Pack ``rules`` so instruction, rules and ``text_tokens`` of text fit the batch token budget.
+
+        A quarter of the budget is always left for rules, so a text that alone
+        exceeds the budget still gets multi-rule batches instead of one per rule.
+        """
+        budget = self.config.advisor_batch_token_budget
+        capacity = max(budget - DETECTION_BASE_TOKENS - text_tokens, budget // 4)
+        return self.rule_index.layout(rules, capacity)
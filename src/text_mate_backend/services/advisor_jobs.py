@@ -0,0 +1,253 @@
+"""Advisor jobs: validation runs that outlive the HTTP connection that started them.
+
+A job runs ``AdvisorService.check_text_events`` in a background task and
+appends every event to the job's log. ``events(job, after)`` replays the
+events after ``seq == after`` and then tails the log until the job ends, so a
+client that lost its connection resumes where it stopped and no LLM work is
+repeated. A job without listeners is cancelled after the grace period; the log
+of an ended job is kept for the TTL. With a SQLite path, logs are also written
+to SQLite, so ended jobs can still be replayed after a restart.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass, field
+from functools import partial
+
+from dcc_backend_common.logger import get_logger
+from pydantic import TypeAdapter
+
+from text_mate_backend.models.advisor_event_models import AdvisorEvent, ErrorEvent
+from text_mate_backend.models.error_codes import ADVISOR_JOB_ABANDONED, CHECK_TEXT_ERROR
+from text_mate_backend.models.error_response import ApiErrorException
+from text_mate_backend.services.advisor import AdvisorService
+from text_mate_backend.utils.configuration import Configuration
+
+logger = get_logger("advisor_jobs")
+
+_event_adapter: TypeAdapter[AdvisorEvent] = TypeAdapter(AdvisorEvent)
+
+
+@dataclass(slots=True, eq=False)
+class AdvisorJob:
+    """Event log of one advisor validation run; ``events[i].seq == i``."""
+
+    id: str
+    owner: str | None
+    events: list[AdvisorEvent] = field(default_factory=list)
+    ended: bool = False
+    listeners: int = 0
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    """Set and replaced whenever an event is appended or the job ends."""
+    task: asyncio.Task[None] | None = None
+    grace_timer: asyncio.TimerHandle | None = None
+
+    def append(self, event: AdvisorEvent) -> None:
+        self.events.append(event)
+        self._notify()
+
+    def end(self) -> None:
+        self.ended = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SqliteJobLog:
+    """Copy of the job logs in SQLite.
+
+    Rows are a few hundred bytes and written from the event loop; the journal
+    runs in WAL mode with ``synchronous=NORMAL`` so a write does not wait for
+    an fsync.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS advisor_jobs (
+                id TEXT PRIMARY KEY, owner TEXT, created_at REAL NOT NULL, ended_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS advisor_job_events (
+                job_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, PRIMARY KEY (job_id, seq)
+            );
+            """
+        )
+
+    def create(self, job: AdvisorJob, created_at: float) -> None:
+        self._connection.execute(
+            "INSERT INTO advisor_jobs (id, owner, created_at) VALUES (?, ?, ?)", (job.id, job.owner, created_at)
+        )
+
+    def append(self, job_id: str, event: AdvisorEvent) -> None:
+        self._connection.execute(
+            "INSERT INTO advisor_job_events (job_id, seq, event) VALUES (?, ?, ?)",
+            (job_id, event.seq, event.model_dump_json()),
+        )
+
+    def end(self, job_id: str, ended_at: float) -> None:
+        self._connection.execute("UPDATE advisor_jobs SET ended_at = ? WHERE id = ?", (ended_at, job_id))
+
+    def load(self, job_id: str) -> AdvisorJob | None:
+        """The stored log of ``job_id``; a job that never ended is closed with an abandoned error."""
+        row = self._connection.execute("SELECT owner, ended_at FROM advisor_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        owner, ended_at = row
+        job = AdvisorJob(id=job_id, owner=owner, ended=True)
+        for (event,) in self._connection.execute(
+            "SELECT event FROM advisor_job_events WHERE job_id = ? ORDER BY seq", (job_id,)
+        ):
+            job.events.append(_event_adapter.validate_python(json.loads(event)))
+        if ended_at is None:
+            # Its process stopped while the job was running.
+            job.events.append(
+                ErrorEvent(seq=len(job.events), error_id=ADVISOR_JOB_ABANDONED, debug_message="Job is not running")
+            )
+        return job
+
+    def delete(self, job_id: str) -> None:
+        self._connection.execute("DELETE FROM advisor_job_events WHERE job_id = ?", (job_id,))
+        self._connection.execute("DELETE FROM advisor_jobs WHERE id = ?", (job_id,))
+
+    def delete_older_than(self, created_at: float) -> None:
+        self._connection.execute(
+            "DELETE FROM advisor_job_events WHERE job_id IN (SELECT id FROM advisor_jobs WHERE created_at < ?)",
+            (created_at,),
+        )
+        self._connection.execute("DELETE FROM advisor_jobs WHERE created_at < ?", (created_at,))
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class AdvisorJobService:
+    """Starts advisor jobs and serves their event logs.
+
+    Must be used from the event loop. Jobs are visible to their owner only.
+    """
+
+    def __init__(
+        self,
+        config: Configuration,
+        advisor_service: AdvisorService,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.advisor_service = advisor_service
+        self.grace_seconds = config.advisor_job_grace_seconds
+        self.ttl_seconds = config.advisor_job_ttl_seconds
+        self._clock = clock
+        self._jobs: dict[str, AdvisorJob] = {}
+        self._log = SqliteJobLog(config.advisor_job_sqlite_path) if config.advisor_job_sqlite_path else None
+        if self._log is not None:
+            self._log.delete_older_than(clock() - self.ttl_seconds)
+
+    def start(self, text: str, docs: set[str], owner: str | None) -> AdvisorJob:
+        """Start checking ``text`` in the background and return its job."""
+        job = AdvisorJob(id=uuid.uuid4().hex, owner=owner)
+        self._jobs[job.id] = job
+        if self._log is not None:
+            self._log.create(job, self._clock())
+        job.task = asyncio.create_task(self._run(job, text, docs))
+        job.task.add_done_callback(partial(self._on_done, job))
+        # The client is expected to connect to the events soon.
+        self._arm_grace_timer(job)
+        logger.info("Advisor job started", job_id=job.id, text_length=len(text))
+        return job
+
+    def get(self, job_id: str, owner: str | None) -> AdvisorJob | None:
+        """The job ``job_id`` if it exists and belongs to ``owner``."""
+        job = self._jobs.get(job_id)
+        if job is None and self._log is not None:
+            job = self._log.load(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    async def events(self, job: AdvisorJob, after: int = -1) -> AsyncIterator[AdvisorEvent]:
+        """Replay the events of ``job`` with ``seq > after``, then tail them until the job ends."""
+        job.listeners += 1
+        if job.grace_timer is not None:
+            job.grace_timer.cancel()
+            job.grace_timer = None
+        try:
+            position = max(after + 1, 0)
+            while True:
+                while position < len(job.events):
+                    yield job.events[position]
+                    position += 1
+                if job.ended:
+                    return
+                await job.changed.wait()
+        finally:
+            job.listeners -= 1
+            if job.listeners == 0 and not job.ended:
+                self._arm_grace_timer(job)
+
+    async def close(self) -> None:
+        """Cancel the running jobs; called on shutdown."""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._log is not None:
+            self._log.close()
+
+    async def _run(self, job: AdvisorJob, text: str, docs: set[str]) -> None:
+        try:
+            async for event in self.advisor_service.check_text_events(text, docs):
+                self._append(job, event)
+        except ApiErrorException as e:
+            self._append(
+                job,
+                ErrorEvent(
+                    seq=len(job.events),
+                    error_id=e.error_response.get("errorId", CHECK_TEXT_ERROR),
+                    debug_message=e.error_response.get("debugMessage"),
+                ),
+            )
+        except Exception as e:
+            # A resumed client must always see a terminal event.
+            logger.exception("Advisor job failed", job_id=job.id)
+            self._append(job, ErrorEvent(seq=len(job.events), error_id=CHECK_TEXT_ERROR, debug_message=str(e)))
+
+    def _on_done(self, job: AdvisorJob, task: asyncio.Task[None]) -> None:
+        # A done callback rather than a finally: a task cancelled before its
+        # first step never runs its coroutine.
+        if task.cancelled():
+            self._append(
+                job,
+                ErrorEvent(seq=len(job.events), error_id=ADVISOR_JOB_ABANDONED, debug_message="Job was cancelled"),
+            )
+        job.end()
+        if self._log is not None:
+            self._log.end(job.id, self._clock())
+        asyncio.get_running_loop().call_later(self.ttl_seconds, self._evict, job.id)
+        logger.info("Advisor job ended", job_id=job.id, events=len(job.events), cancelled=task.cancelled())
+
+    def _append(self, job: AdvisorJob, event: AdvisorEvent) -> None:
+        job.append(event)
+        if self._log is not None:
+            self._log.append(job.id, event)
+
+    def _arm_grace_timer(self, job: AdvisorJob) -> None:
+        job.grace_timer = asyncio.get_running_loop().call_later(self.grace_seconds, self._abandon_if_unwatched, job)
+
+    def _abandon_if_unwatched(self, job: AdvisorJob) -> None:
+        job.grace_timer = None
+        if job.listeners == 0 and not job.ended and job.task is not None:
+            logger.info("Advisor job abandoned: no listener within the grace period", job_id=job.id)
+            job.task.cancel()
+
+    def _evict(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        if self._log is not None:
+            self._log.delete(job_id)
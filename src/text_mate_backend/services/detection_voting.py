@@ -0,0 +1,59 @@
+"""Agreement voting over the samples of an ensemble detection run."""
+
+from dataclasses import dataclass, field
+
+from text_mate_backend.models.rule_models import ResolvedDetection
+
+
+@dataclass(slots=True)
+class VoteCluster:
+    """Candidates of one rule with overlapping spans, collected across samples."""
+
+    detection: ResolvedDetection
+    """The first candidate; it represents the cluster."""
+    samples: set[int] = field(default_factory=set)
+    accepted: bool = False
+
+
+class AgreementVoter:
+    """Clusters ensemble candidates by (rule, overlapping span) and accepts them by agreement.
+
+    A cluster is accepted as soon as ``required_votes[rule_name]`` distinct
+    samples have reported it (1 for rules not listed), so accepted findings can
+    be streamed before the slower samples finish. A candidate overlapping
+    several clusters of its rule joins the oldest one.
+    """
+
+    def __init__(self, samples: int, required_votes: dict[str, int]) -> None:
+        self.samples = samples
+        self.required_votes = required_votes
+        self._clusters: dict[str, list[VoteCluster]] = {}
+
+    def add(self, sample: int, detection: ResolvedDetection) -> ResolvedDetection | None:
+        """Record ``detection`` as reported by ``sample``.
+
+        Returns the cluster's representative when this vote gets the cluster
+        accepted, otherwise ``None``.
+        """
+        clusters = self._clusters.setdefault(detection.rule_name, [])
+        cluster = next((c for c in clusters if _overlaps(c.detection, detection)), None)
+        if cluster is None:
+            cluster = VoteCluster(detection=detection)
+            clusters.append(cluster)
+        cluster.samples.add(sample)
+        if not cluster.accepted and len(cluster.samples) >= self.required_votes.get(detection.rule_name, 1):
+            cluster.accepted = True
+            return cluster.detection
+        return None
+
+    def agreement(self, cluster: VoteCluster) -> float:
+        """Fraction of the samples that reported ``cluster``."""
+        return len(cluster.samples) / self.samples
+
+    def rejected(self) -> list[VoteCluster]:
+        """Clusters that did not reach their required votes, in order of first report."""
+        return [cluster for clusters in self._clusters.values() for cluster in clusters if not cluster.accepted]
+
+
+def _overlaps(a: ResolvedDetection, b: ResolvedDetection) -> bool:
+    return min(a.range.end, b.range.end) > max(a.range.start, b.range.start) or a.range.start == b.range.start
@@ -0,0 +1,122 @@
+"""Deterministic checker stage of the advisor.
+
+Rules carrying a ``CheckerSpec`` are compiled once per collection selection and
+scanned together, before any LLM batch starts. Per rule the result is identical
+to ``pattern.finditer(text)`` (leftmost, non-overlapping matches), while matches
+of different rules may overlap freely. The patterns are deliberately not fused
+into one alternation of lookaheads: CPython's ``re`` then tries every branch at
+every offset and loses each pattern's prefix and charset fast paths, which
+measured several times slower (see ``bench_advisor.py checkers``).
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from text_mate_backend.models.rule_models import CheckerSpec, Rule
+
+
+@dataclass(frozen=True, slots=True)
+class CheckerHit:
+    """One deterministic match of a rule's checker pattern."""
+
+    rule: Rule
+    start: int
+    end: int
+    source: str
+    reason: str
+    proposal: str
+
+
+@dataclass(frozen=True, slots=True)
+class _CompiledChecker:
+    rule: Rule
+    spec: CheckerSpec
+    pattern: re.Pattern[str]
+    exceptions: tuple[re.Pattern[str], ...]
+
+
+class RuleCheckerEngine:
+    """Scanner over all checker patterns of a rule selection, compiled once."""
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        checkers: list[_CompiledChecker] = []
+        for rule in rules:
+            spec = rule.checker
+            if spec is None:
+                continue
+            checkers.append(
+                _CompiledChecker(
+                    rule=rule,
+                    spec=spec,
+                    pattern=re.compile(spec.pattern, re.IGNORECASE if spec.ignore_case else 0),
+                    exceptions=tuple(re.compile(exception) for exception in spec.exceptions),
+                )
+            )
+        self._checkers: tuple[_CompiledChecker, ...] = tuple(checkers)
+
+    @property
+    def rules(self) -> list[Rule]:
+        """All rules with a checker, trigger-only ones included."""
+        return [checker.rule for checker in self._checkers]
+
+    @property
+    def deciding_rules(self) -> list[Rule]:
+        """Rules answered entirely by this engine; they are skipped by the LLM stage."""
+        return [checker.rule for checker in self._checkers if checker.spec.decides]
+
+    @property
+    def trigger_rules(self) -> list[Rule]:
+        """Rules whose checker only triggers: each violation contains a match, not vice versa."""
+        return [checker.rule for checker in self._checkers if not checker.spec.decides]
+
+    def triggered_rules(self, text: str) -> set[str]:
+        """Names of trigger-only rules whose pattern occurs in ``text``.
+
+        A trigger-only rule missing from the result cannot be violated by ``text``.
+        """
+        return {
+            checker.rule.name
+            for checker in self._checkers
+            if not checker.spec.decides and next(self._matches(checker, text), None) is not None
+        }
+
+    def scan(self, text: str, deciding_only: bool = True) -> list[CheckerHit]:
+        """Return the checker hits in ``text``, ordered by start offset.
+
+        With ``deciding_only`` (the default) trigger-only checkers are skipped,
+        since their matches are not violations by themselves.
+        """
+        hits: list[CheckerHit] = []
+        for checker in self._checkers:
+            if deciding_only and not checker.spec.decides:
+                continue
+            for match in self._matches(checker, text):
+                hits.append(
+                    CheckerHit(
+                        rule=checker.rule,
+                        start=match.start(),
+                        end=match.end(),
+                        source=match.group(),
+                        reason=checker.spec.reason,
+                        proposal=self._proposal(checker.spec, match),
+                    )
+                )
+        # Stable sort: hits at the same offset keep rule order.
+        hits.sort(key=lambda hit: hit.start)
+        return hits
+
+    @staticmethod
+    def _matches(checker: _CompiledChecker, text: str) -> Iterator[re.Match[str]]:
+        """Non-empty matches of ``checker`` in ``text`` that are not exceptions."""
+        for match in checker.pattern.finditer(text):
+            source = match.group()
+            if source and not any(exception.fullmatch(source) for exception in checker.exceptions):
+                yield match
+
+    @staticmethod
+    def _proposal(spec: CheckerSpec, match: re.Match[str]) -> str:
+        proposal = match.expand(spec.replacement) if spec.replacement is not None else match.group()
+        for old, new in spec.translate.items():
+            proposal = proposal.replace(old, new)
+        return proposal
@@ -0,0 +1,113 @@
+"""Rule store of the advisor: loaded rules indexed by collection and by relevance."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from text_mate_backend.models.rule_models import Rule
+from text_mate_backend.services.rule_packer import pack_rules
+from text_mate_backend.utils.text_index import split_into_paragraphs
+
+# Batch layouts kept; one per rule selection and text size seen recently.
+LAYOUTS = 256
+
+
+class RuleIndex:
+    """All loaded rules, built once at startup.
+
+    Everything a request derives from the rules alone is computed here once:
+    the rules and name lookup of each collection selection (memoized per
+    selection), each rule's prompt rendering and token estimate, and the batch
+    layouts of recently packed rule lists. Returned lookups and batches are
+    shared between requests and must not be modified.
+
+    Relevance is the cosine similarity between a text paragraph and a rule's
+    description and example in a character n-gram TF-IDF space fitted on the
+    loaded rules; a rule's score for a text is its best paragraph score, so a
+    long text does not dilute a rule that matches one paragraph well.
+    """
+
+    def __init__(self, rules: list[Rule]) -> None:
+        started = time.perf_counter()
+        self.rules = rules
+        by_collection: dict[str, list[Rule]] = {}
+        for rule in rules:
+            by_collection.setdefault(rule.collection, []).append(rule)
+        # Rendered now rather than by the first request that needs them.
+        self._prompt_tokens = sum(rule.prompt_tokens for rule in rules)
+        self._prompt_json_bytes = sum(len(rule.prompt_json.encode()) for rule in rules)
+        self._by_collection = {collection: tuple(members) for collection, members in by_collection.items()}
+        self._selections: dict[frozenset[str], tuple[tuple[Rule, ...], dict[str, Rule]]] = {}
+        self._layouts: OrderedDict[tuple[int, ...], list[list[Rule]]] = OrderedDict()
+        # Keyed by collection as well: rule names only need to be unique per selection.
+        self._rows = {(rule.collection, rule.name): row for row, rule in enumerate(rules)}
+        self._vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True)
+        try:
+            self._matrix = self._vectorizer.fit_transform([f"{rule.description}\n{rule.example}" for rule in rules])
+        except ValueError:
+            # No rules, or none with any text: every score is 0.
+            self._matrix = None
+        self.build_seconds = time.perf_counter() - started
+
+    @property
+    def collections(self) -> set[str]:
+        return set(self._by_collection)
+
+    def select(self, collections: Iterable[str]) -> list[Rule]:
+        """Rules of ``collections``, grouped by collection in sorted collection order."""
+        return list(self._selection(collections)[0])
+
+    def lookup(self, collections: Iterable[str]) -> dict[str, Rule]:
+        """The rules of ``collections`` by name; shared, read-only."""
+        return self._selection(collections)[1]
+
+    def layout(self, rules: list[Rule], capacity: int) -> list[list[Rule]]:
+        """``pack_rules(rules, capacity)``, memoized for the last ``LAYOUTS`` inputs.
+
+        Keyed by the identity of the rules: a layout holds every rule it was
+        packed from, so the key cannot be reused by other rules while it is
+        cached. The batches are shared, read-only.
+        """
+        key = (capacity, *map(id, rules))
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = self._layouts[key] = pack_rules(rules, capacity)
+            if len(self._layouts) > LAYOUTS:
+                self._layouts.popitem(last=False)
+        else:
+            self._layouts.move_to_end(key)
+        return list(layout)
+
+    def report(self) -> dict[str, int]:
+        """Size of the loaded rules and the time to build the index, for the startup log."""
+        return {
+            "rules": len(self.rules),
+            "collections": len(self._by_collection),
+            "prompt_tokens": self._prompt_tokens,
+            "prompt_json_bytes": self._prompt_json_bytes,
+            "build_ms": round(self.build_seconds * 1000),
+        }
+
+    def _selection(self, collections: Iterable[str]) -> tuple[tuple[Rule, ...], dict[str, Rule]]:
+        # Unknown collections select nothing, so at most one entry per subset of the known ones.
+        key = frozenset(collection for collection in collections if collection in self._by_collection)
+        selection = self._selections.get(key)
+        if selection is None:
+            rules = tuple(rule for collection in sorted(key) for rule in self._by_collection[collection])
+            selection = self._selections[key] = (rules, {rule.name: rule for rule in rules})
+        return selection
+
+    def scores(self, text: str, rules: list[Rule]) -> dict[str, float]:
+        """Relevance of each rule for ``text``, between 0 and 1 (0 for rules not in the index)."""
+        result = dict.fromkeys((rule.name for rule in rules), 0.0)
+        known = [rule for rule in rules if (rule.collection, rule.name) in self._rows]
+        paragraphs = [text[start:end] for start, end in split_into_paragraphs(text)]
+        if self._matrix is None or not known or not paragraphs:
+            return result
+        vectors = self._vectorizer.transform(paragraphs)
+        rows = [self._rows[(rule.collection, rule.name)] for rule in known]
+        similarities = (self._matrix[rows] @ vectors.T).max(axis=1).toarray().ravel()
+        result.update(zip((rule.name for rule in known), (float(s) for s in similarities), strict=True))
+        return result
@@ -0,0 +1,49 @@
+"""Packing of advisor rules into detection batches under a token budget."""
+
+from text_mate_backend.models.rule_models import Rule
+
+
+def pack_rules(rules: list[Rule], capacity: int) -> list[list[Rule]]:
+    """Split ``rules`` into batches whose summed ``Rule.prompt_tokens`` fit ``capacity``.
+
+    Rules of different collections never share a batch. Each collection gets the
+    fewest batches its token total allows, and rules are placed largest first
+    onto the least loaded batch that still has room (worst-fit decreasing), so
+    the batches of a collection end up with similar prompt sizes. A rule larger
+    than ``capacity`` gets a batch of its own. Inside a batch the rules keep their
+    input order; batches are ordered by collection.
+    """
+    if capacity < 1:
+        raise ValueError("capacity must be positive")
+    by_collection: dict[str, list[Rule]] = {}
+    for rule in rules:
+        by_collection.setdefault(rule.collection, []).append(rule)
+    batches: list[list[Rule]] = []
+    for collection in sorted(by_collection):
+        batches.extend(_pack_collection(by_collection[collection], capacity))
+    return batches
+
+
+def _pack_collection(rules: list[Rule], capacity: int) -> list[list[Rule]]:
+    # An oversized rule fills exactly one batch.
+    total = sum(min(rule.prompt_tokens, capacity) for rule in rules)
+    bin_count = max(1, -(-total // capacity))
+    loads = [0] * bin_count
+    members: list[list[int]] = [[] for _ in range(bin_count)]
+
+    for i in sorted(range(len(rules)), key=lambda i: -rules[i].prompt_tokens):
+        size = rules[i].prompt_tokens
+        fitting = [b for b, load in enumerate(loads) if load + size <= capacity]
+        if fitting:
+            target = min(fitting, key=loads.__getitem__)
+        elif 0 in loads:
+            # Only an oversized rule fits nowhere; it takes an empty batch.
+            target = loads.index(0)
+        else:
+            loads.append(0)
+            members.append([])
+            target = len(loads) - 1
+        loads[target] += size
+        members[target].append(i)
+
+    return [[rules[i] for i in sorted(indices)] for indices in members if indices]
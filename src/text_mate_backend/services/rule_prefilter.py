@@ -0,0 +1,84 @@
+"""Relevance prefilter and ranking stage of the advisor: which rules go to the LLM for a text.
+
+Two kinds of evidence are used. A trigger-only checker (see ``CheckerSpec``)
+is a keyword set or character class that every violation of its rule contains;
+when it does not occur in the text, the rule provably cannot fire. All other
+rules get a relevance score from the ``RuleIndex``. Scores are only a
+heuristic and never prove anything.
+"""
+
+from dataclasses import dataclass, field
+
+from text_mate_backend.models.rule_models import Rule
+from text_mate_backend.services.rule_checker import RuleCheckerEngine
+from text_mate_backend.services.rule_index import RuleIndex
+
+PREFILTER_MODES = ("off", "conservative", "aggressive")
+
+
+@dataclass(frozen=True, slots=True)
+class PrefilterDecision:
+    kept: list[Rule]
+    """Rules still sent to the LLM, in input order."""
+    skipped: list[Rule] = field(default_factory=list)
+    """Proven irrelevant: the rule's trigger does not occur in the text."""
+    dropped: list[Rule] = field(default_factory=list)
+    """Scored below the threshold (``aggressive`` mode only)."""
+    ranked_out: list[Rule] = field(default_factory=list)
+    """Ranked below the ``max_rules`` cut-off."""
+    scores: dict[str, float] = field(default_factory=dict)
+    """Relevance score of every rule that was not skipped, by name."""
+
+
+class RulePrefilter:
+    """Decides per text which rules are sent to the LLM.
+
+    ``off`` keeps every rule. ``conservative`` skips only rules proven
+    irrelevant by their trigger. ``aggressive`` additionally drops rules whose
+    relevance score is below ``min_score``, unless their trigger occurs. In
+    every mode, when more than ``max_rules`` rules remain (0 = no limit), only
+    the ``max_rules`` most relevant are kept.
+    """
+
+    def __init__(
+        self, index: RuleIndex, mode: str = "conservative", min_score: float = 0.0, max_rules: int = 0
+    ) -> None:
+        if mode not in PREFILTER_MODES:
+            raise ValueError(f"unknown prefilter mode {mode!r}")
+        self.index = index
+        self.mode = mode
+        self.min_score = min_score
+        self.max_rules = max_rules
+
+    def apply(self, text: str, rules: list[Rule], engine: RuleCheckerEngine) -> PrefilterDecision:
+        """Split ``rules`` into kept, skipped, dropped and ranked-out rules for ``text``.
+
+        ``engine`` must cover ``rules``; its trigger-only checkers supply the proofs.
+        """
+        trigger_names = {rule.name for rule in engine.trigger_rules} if self.mode != "off" else set()
+        triggered = engine.triggered_rules(text) if trigger_names else set()
+        candidates: list[Rule] = []
+        skipped: list[Rule] = []
+        for rule in rules:
+            if rule.name in trigger_names and rule.name not in triggered:
+                skipped.append(rule)
+            else:
+                candidates.append(rule)
+
+        scores = self.index.scores(text, candidates)
+        kept: list[Rule] = []
+        dropped: list[Rule] = []
+        for rule in candidates:
+            if self.mode == "aggressive" and rule.name not in triggered and scores[rule.name] < self.min_score:
+                dropped.append(rule)
+            else:
+                kept.append(rule)
+
+        ranked_out: list[Rule] = []
+        if self.max_rules and len(kept) > self.max_rules:
+            # Stable: ties keep input order.
+            ranked = sorted(kept, key=lambda rule: -scores[rule.name])
+            cut = {rule.name for rule in ranked[self.max_rules :]}
+            ranked_out = [rule for rule in kept if rule.name in cut]
+            kept = [rule for rule in kept if rule.name not in cut]
+        return PrefilterDecision(kept=kept, skipped=skipped, dropped=dropped, ranked_out=ranked_out, scores=scores)
@@ -0,0 +1,241 @@
+"""Resolution of detected source snippets to spans of the input text.
+
+``find_source`` locates a snippet exactly, then ignoring case, then ignoring
+whitespace and finally by edit distance. The first three are ``str.find``
+calls; the edit-distance search runs in Python and takes tens of milliseconds
+on long texts, enough to stall every other stream on the event loop. The
+``SpanResolver`` therefore answers snippets found by ``str.find`` inline and
+sends the others to a bounded worker pool: threads when the interpreter runs
+without the GIL, processes otherwise.
+
+A worker process gets the text of a request once: it is written to a
+shared-memory segment that lives as long as the request's ``TextIndex``, and
+each worker keeps the indices of the last few texts it resolved against.
+"""
+
+import asyncio
+import multiprocessing
+import sys
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from dcc_backend_common.logger import get_logger
+
+from text_mate_backend.utils.approximate_match import find_approximate
+from text_mate_backend.utils.interval_index import IntervalIndex
+from text_mate_backend.utils.text_index import TextIndex, normalize_whitespace
+
+logger = get_logger("span_resolver")
+
+# Smallest similarity (1 - edit distance / snippet length) of a fuzzy source match.
+FUZZY_MATCH_THRESHOLD = 0.85
+# Text indices a worker process keeps; about one per concurrent request.
+WORKER_INDICES = 8
+
+type Span = tuple[int, int]
+"""(position, length) in code points."""
+
+
+def find_source(
+    source: str, index: TextIndex, consumed: IntervalIndex | None = None, fuzzy: bool = True
+) -> Span | None:
+    """Try to locate source in text. Returns (position, length) or None.
+
+    All offsets here are **Python code points** (the native ``str`` indexing
+    unit), not UTF-8 bytes and not UTF-16 code units. This is deliberate:
+    the result feeds back into Python slicing (``text[pos:end]``), regex
+    offsets, dedup and the ``consumed`` loop, which all operate on code
+    points. Translation to JavaScript UTF-16 code-unit indices happens once,
+    at the API boundary, in ``AdvisorService._build_violation_result``.
+
+    The lowered, whitespace-normalized and sentence-split views come from the
+    per-request ``index`` and are never recomputed here.
+
+    When ``consumed`` ranges are given, the first match that does
+    not overlap any consumed range is returned. This lets repeated identical
+    snippets resolve to distinct occurrences instead of all collapsing onto the
+    first (which would then be dropped as a duplicate by ``_is_duplicate``).
+    The edit-distance search only runs if the snippet has no exact, lowercase or
+    whitespace-normalized match at all: a repeated report of a consumed snippet
+    is a duplicate, not a similar-looking sentence elsewhere. Without ``fuzzy``,
+    the edit-distance search is skipped.
+    """
+    if not consumed:
+        return find_source_first(source, index, 0, fuzzy)
+    found = _find_unconsumed(source, index, consumed, fuzzy=False)
+    if found is not None or not fuzzy:
+        return found
+    return _find_unconsumed(source, index, consumed, fuzzy=True)
+
+
+def _find_unconsumed(source: str, index: TextIndex, consumed: IntervalIndex, fuzzy: bool) -> Span | None:
+    """First match not overlapping ``consumed``, else the first match (left to dedup), else None."""
+    first_found: Span | None = None
+    min_start = 0
+    while True:
+        found = find_source_first(source, index, min_start, fuzzy)
+        if found is None:
+            # Every match overlaps a consumed span: return the first and let dedup drop it.
+            return first_found
+        pos, match_len = found
+        if not consumed.overlaps(pos, pos + match_len):
+            return found
+        # Matches starting inside a consumed span overlap it too: skip past it.
+        first_found = first_found or found
+        min_start = max(pos + 1, consumed.reach(pos) or 0)
+
+
+def find_source_first(source: str, index: TextIndex, start: int = 0, fuzzy: bool = True) -> Span | None:
+    """Single-pass search cascade from a minimum start offset; every path honours ``start``."""
+    pos = index.text.find(source, start)
+    if pos != -1:
+        return pos, len(source)
+
+    lower_source = source.lower()
+    pos = index.lower.find(lower_source, start)
+    if pos != -1:
+        return pos, len(source)
+
+    normalized_source = normalize_whitespace(source)
+    pos = index.normalized.find(normalized_source, index.original_to_normalized(start))
+    if pos != -1:
+        orig_start = index.normalized_to_original(pos)
+        if orig_start is not None:
+            # Map the end of the normalized match back to original coords so
+            # collapsed-whitespace runs are reflected in the span length. Only
+            # apply the corrected length when it is at least as long as the
+            # (possibly whitespace-rich) source; otherwise fall back to be safe.
+            orig_end = index.normalized_to_original(pos + len(normalized_source))
+            if orig_end is not None and orig_end - orig_start >= len(source):
+                return orig_start, orig_end - orig_start
+            return orig_start, len(source)
+
+    return fuzzy_find(source, index, start) if fuzzy else None
+
+
+def fuzzy_find(needle: str, index: TextIndex, start: int = 0) -> Span | None:
+    """Find the span from ``start`` closest to needle by edit distance, ignoring case."""
+    if len(needle) < 2:
+        return None
+    match = find_approximate(needle.lower(), index.lower, FUZZY_MATCH_THRESHOLD, start)
+    if match is None:
+        return None
+    return match.start, match.end - match.start
+
+
+class SpanResolver:
+    """``find_source`` with the edit-distance search off the event loop.
+
+    Results are identical to ``find_source``. With ``workers == 0`` everything
+    runs inline. Counters are cumulative; ``offloaded_seconds`` is the worker
+    time of offloaded searches, i.e. event-loop blocking avoided.
+    """
+
+    def __init__(self, workers: int, threads: bool | None = None) -> None:
+        """``threads`` picks the pool kind; by default threads exactly when the GIL is disabled."""
+        if threads is None:
+            threads = not sys._is_gil_enabled()
+        self._executor: Executor | None = None
+        self.mode = "inline"
+        if workers > 0 and threads:
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix="span-resolver")
+            self.mode = "threads"
+        elif workers > 0:
+            # Not fork: the server process runs threads (to_thread, the LLM clients).
+            self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("forkserver"))
+            self.mode = "processes"
+        self._segments: dict[int, tuple[SharedMemory, int]] = {}
+        logger.info("Span resolver ready", mode=self.mode, workers=workers)
+        self.inline = 0
+        self.offloaded = 0
+        self.offloaded_seconds = 0.0
+
+    async def find_source(self, source: str, index: TextIndex, consumed: IntervalIndex | None = None) -> Span | None:
+        found = find_source(source, index, consumed, fuzzy=False)
+        if found is not None:
+            # Unconsumed, or a consumed one ``find_source`` returns for dedup either way.
+            self.inline += 1
+            return found
+        if self._executor is None:
+            self.inline += 1
+            return find_source(source, index, consumed)
+
+        loop = asyncio.get_running_loop()
+        # A snapshot: the caller extends its consumed ranges as it goes.
+        consumed = consumed.copy() if consumed else None
+        if isinstance(self._executor, ThreadPoolExecutor):
+            found, seconds = await loop.run_in_executor(self._executor, _timed_find_source, source, index, consumed)
+        else:
+            segment, size = self._segment(index)
+            found, seconds = await loop.run_in_executor(
+                self._executor, _find_source_in_worker, segment, size, source, consumed
+            )
+        self.offloaded += 1
+        self.offloaded_seconds += seconds
+        return found
+
+    def stats(self) -> dict[str, int | str]:
+        return {
+            "mode": self.mode,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "offloaded_ms": round(self.offloaded_seconds * 1000),
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        for key in list(self._segments):
+            self._release(key)
+
+    def _segment(self, index: TextIndex) -> tuple[str, int]:
+        """Name and size of the shared-memory copy of ``index.text``, written on first use."""
+        key = id(index)
+        shipped = self._segments.get(key)
+        if shipped is None:
+            data = index.text.encode(errors="surrogatepass")
+            memory = SharedMemory(create=True, size=max(len(data), 1))
+            buf = memory.buf
+            assert buf is not None
+            buf[: len(data)] = data
+            shipped = self._segments[key] = (memory, len(data))
+            weakref.finalize(index, self._release, key)
+        return shipped[0].name, shipped[1]
+
+    def _release(self, key: int) -> None:
+        shipped = self._segments.pop(key, None)
+        if shipped is not None:
+            shipped[0].close()
+            shipped[0].unlink()
+
+
+def _timed_find_source(source: str, index: TextIndex, consumed: IntervalIndex | None) -> tuple[Span | None, float]:
+    started = time.perf_counter()
+    return find_source(source, index, consumed), time.perf_counter() - started
+
+
+_worker_indices: OrderedDict[str, TextIndex] = OrderedDict()
+
+
+def _find_source_in_worker(
+    segment: str, size: int, source: str, consumed: IntervalIndex | None
+) -> tuple[Span | None, float]:
+    started = time.perf_counter()
+    index = _worker_indices.get(segment)
+    if index is None:
+        memory = SharedMemory(segment, track=False)
+        buf = memory.buf
+        assert buf is not None
+        try:
+            text = bytes(buf[:size]).decode(errors="surrogatepass")
+        finally:
+            memory.close()
+        index = _worker_indices[segment] = TextIndex.from_text(text)
+        if len(_worker_indices) > WORKER_INDICES:
+            _worker_indices.popitem(last=False)
+    else:
+        _worker_indices.move_to_end(segment)
+    return find_source(source, index, consumed), time.perf_counter() - started
@@ -0,0 +1,121 @@
+"""Approximate substring search by bounded edit distance.
+
+Finds the span of a text with the smallest Levenshtein distance to a needle,
+using Myers' bit-vector algorithm (one column of the edit-distance matrix per
+text character, the needle's rows packed into an int). Candidate regions are
+found first by the pigeonhole filter: a span within ``k`` edits of the needle
+contains at least one of ``k + 1`` disjoint needle pieces unchanged, so only
+the surroundings of their exact occurrences (found by ``str.find``) are
+scanned. When the pieces are too frequent, the whole text is scanned, which is
+still linear in its length.
+
+All offsets are Python code points. The search is case-sensitive; callers
+pass lowered strings for a case-insensitive search.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class ApproximateMatch:
+    start: int
+    end: int
+    distance: int
+    """Edit distance between the needle and ``text[start:end]``."""
+
+    def similarity(self, needle_length: int) -> float:
+        return 1 - self.distance / needle_length
+
+
+def find_approximate(needle: str, text: str, min_similarity: float, start: int = 0) -> ApproximateMatch | None:
+    """The span of ``text[start:]`` closest to ``needle``, if within ``min_similarity``.
+
+    Similarity is ``1 - distance / len(needle)``. Of the spans with the
+    smallest distance, the one ending first is returned; its start is the one
+    giving a length closest to the needle's.
+    """
+    m = len(needle)
+    if m == 0 or start >= len(text):
+        return None
+    k = int(m * (1 - min_similarity))
+    peq = _pattern_masks(needle)
+
+    best_distance = k + 1
+    best_end = -1
+    for lo, hi in _candidate_regions(needle, text, k, start):
+        scores = _scores(peq, m, text[lo:hi])
+        distance = min(scores)
+        if distance < best_distance:
+            best_distance = distance
+            best_end = lo + scores.index(distance) + 1
+    if best_end < 0:
+        return None
+
+    # Run the needle reversed backwards from the end to find where the span starts.
+    lo = max(start, best_end - m - best_distance)
+    scores = _scores(_pattern_masks(needle[::-1]), m, text[lo:best_end][::-1], anchored=True)
+    candidates = [i for i, score in enumerate(scores) if score == best_distance]
+    length = min((i + 1 for i in candidates), key=lambda n: abs(n - m), default=m)
+    return ApproximateMatch(start=best_end - length, end=best_end, distance=best_distance)
+
+
+def _pattern_masks(needle: str) -> dict[str, int]:
+    peq: dict[str, int] = {}
+    for i, ch in enumerate(needle):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    return peq
+
+
+def _scores(peq: dict[str, int], m: int, text: str, anchored: bool = False) -> list[int]:
+    """``scores[j]``: smallest edit distance of the needle to a span of ``text`` ending at ``j + 1``.
+
+    With ``anchored``, the span is ``text[: j + 1]``.
+    """
+    carry = 1 if anchored else 0
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    scores: list[int] = []
+    for ch in text:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # Without a carry into row 0, a match may start anywhere in the text.
+        ph = ((ph << 1) | carry) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        scores.append(score)
+    return scores
+
+
+def _candidate_regions(needle: str, text: str, k: int, start: int) -> list[tuple[int, int]]:
+    """Sorted, disjoint regions of ``text[start:]`` that may contain a span within ``k`` edits of ``needle``."""
+    m = len(needle)
+    size = m // (k + 1)
+    pieces = [(i * size, needle[i * size : (i + 1) * size if i < k else m]) for i in range(k + 1)]
+    if size == 0 or sum(text.count(piece, start) for _, piece in pieces) * (m + 2 * k) >= len(text) - start:
+        return [(start, len(text))]
+
+    regions: list[tuple[int, int]] = []
+    for offset, piece in pieces:
+        pos = text.find(piece, start)
+        while pos != -1:
+            regions.append((max(start, pos - offset - k), min(len(text), pos - offset + m + k)))
+            pos = text.find(piece, pos + 1)
+    regions.sort()
+    merged: list[tuple[int, int]] = []
+    for lo, hi in regions:
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
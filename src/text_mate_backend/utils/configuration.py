@@ -17,6 +17,170 @@ class Configuration(LlmConfig):
     llm_health_check_url: str = Field(
         description="The URL for LLM health check API", default="http://localhost:8001/health"
     )
+    llm_verification_model: str = Field(
+        description="Model of the advisor verification agent; empty uses llm_model",
+        default="",
+    )
+    llm_max_in_flight: int = Field(
+        description="Maximum number of concurrent LLM calls admitted by the process-wide scheduler",
+        default=4,
+        ge=1,
+    )
+    advisor_detection_cache_max_bytes: int = Field(
+        description="Memory cap in bytes for cached advisor detection results (0 disables the cache)",
+        default=32 * 1024 * 1024,
+        ge=0,
+    )
+    advisor_detection_cache_ttl_seconds: float = Field(
+        description="Time-to-live in seconds of a cached advisor detection result (0 disables the cache)",
+        default=3600,
+        ge=0,
+    )
+    advisor_proposal_cache_max_bytes: int = Field(
+        description="Memory cap in bytes for cached advisor proposals (0 disables the cache)",
+        default=8 * 1024 * 1024,
+        ge=0,
+    )
+    advisor_proposal_cache_ttl_seconds: float = Field(
+        description="Time-to-live in seconds of a cached advisor proposal (0 disables the cache)",
+        default=86400,
+        ge=0,
+    )
+    advisor_fast_path_max_chars: int = Field(
+        description=(
+            "Longest text (in characters) an advisor batch answers with one detect-and-propose call "
+            "instead of detection followed by proposal calls (0 disables the fast path)"
+        ),
+        default=1000,
+        ge=0,
+    )
+    advisor_fast_path_max_rules: int = Field(
+        description="Largest rule batch answered by the advisor's detect-and-propose fast path",
+        default=10,
+        ge=1,
+    )
+    advisor_incremental: bool = Field(
+        description="Reuse cached findings of paragraphs unchanged since an earlier request for window-scoped advisor rules",
+        default=True,
+    )
+    advisor_window_chars: int = Field(
+        description="Maximum characters of a paragraph window checked against window-scoped advisor rules",
+        default=800,
+        ge=1,
+    )
+    advisor_proposal_batch_size: int = Field(
+        description="Advisor violations per proposal call; 1 disables batched proposals",
+        default=8,
+        ge=1,
+    )
+    advisor_batch_token_budget: int = Field(
+        description="Estimated prompt tokens (instruction, rules and text) per advisor detection call",
+        default=3000,
+        ge=1,
+    )
+    advisor_cell_deadline_factor: float = Field(
+        description=(
+            "Advisor detection cell deadline as a multiple of the observed p95 cell latency, "
+            "capped by the static batch timeout (0 keeps the static timeout)"
+        ),
+        default=3.0,
+        ge=0,
+    )
+    advisor_cell_min_deadline_seconds: float = Field(
+        description="Lower bound in seconds of the latency-derived advisor cell deadline",
+        default=30,
+        ge=0,
+    )
+    advisor_hedge: bool = Field(
+        description="Fire a duplicate advisor detection cell once it runs longer than the observed p95; first wins",
+        default=False,
+    )
+    advisor_ensemble_k_mechanical: int = Field(
+        description="Concurrent advisor detection samples per batch for mechanical rules (1 disables the ensemble)",
+        default=1,
+        ge=1,
+    )
+    advisor_ensemble_k_lexical: int = Field(
+        description="Concurrent advisor detection samples per batch for lexical rules (1 disables the ensemble)",
+        default=1,
+        ge=1,
+    )
+    advisor_ensemble_k_semantic: int = Field(
+        description="Concurrent advisor detection samples per batch for semantic rules (1 disables the ensemble)",
+        default=1,
+        ge=1,
+    )
+    advisor_accept_agreement_mechanical: float = Field(
+        description="Fraction of ensemble samples that must report a mechanical-rule finding for it to be accepted",
+        default=0.6,
+        gt=0,
+        le=1,
+    )
+    advisor_accept_agreement_lexical: float = Field(
+        description="Fraction of ensemble samples that must report a lexical-rule finding for it to be accepted",
+        default=0.6,
+        gt=0,
+        le=1,
+    )
+    advisor_accept_agreement_semantic: float = Field(
+        description="Fraction of ensemble samples that must report a semantic-rule finding for it to be accepted",
+        default=0.6,
+        gt=0,
+        le=1,
+    )
+    advisor_detection_temperature: float = Field(
+        description="Sampling temperature of advisor detection calls when the ensemble is enabled",
+        default=0.8,
+        ge=0,
+    )
+    advisor_verify_low_agreement: bool = Field(
+        description=(
+            "Ask a yes/no verification agent about ensemble findings below the agreement threshold "
+            "instead of dropping them"
+        ),
+        default=False,
+    )
+    advisor_job_grace_seconds: float = Field(
+        description="Seconds an advisor job keeps running without a client reading its events",
+        default=60,
+        ge=0,
+    )
+    advisor_job_ttl_seconds: float = Field(
+        description="Seconds the event log of an ended advisor job is kept for replay",
+        default=900,
+        ge=0,
+    )
+    advisor_job_sqlite_path: str = Field(
+        description="SQLite file that also stores advisor job event logs (empty = in memory only)",
+        default="",
+    )
+    advisor_resolver_workers: int = Field(
+        description=(
+            "Workers resolving snippets by fuzzy search off the event loop "
+            "(threads without the GIL, processes otherwise; 0 = on the event loop)"
+        ),
+        default=2,
+        ge=0,
+    )
+    advisor_prefilter: str = Field(
+        description=(
+            "Advisor rule prefilter: 'conservative' skips rules whose trigger does not occur in the text, "
+            "'aggressive' also drops rules below advisor_prefilter_min_score"
+        ),
+        default="conservative",
+        pattern="^(off|conservative|aggressive)$",
+    )
+    advisor_max_llm_rules: int = Field(
+        description="Maximum number of rules sent to the LLM per advisor request, most relevant first (0 = unlimited)",
+        default=100,
+        ge=0,
+    )
+    advisor_prefilter_min_score: float = Field(
+        description="Minimum TF-IDF relevance of a rule for the text in 'aggressive' prefilter mode",
+        default=0.03,
+        ge=0,
+        le=1,
+    )
 
     azure_client_id: str = Field(description="The client ID for Azure AD application")
     azure_tenant_id: str = Field(description="The tenant ID for Azure AD application")
@@ -58,6 +222,36 @@ class Configuration(LlmConfig):
             docling_url=get_env_or_throw("DOCLING_URL"),
             docling_api_key=get_env_or_throw("DOCLING_API_KEY"),
             llm_health_check_url=get_env_or_throw("LLM_HEALTH_CHECK_URL"),
+            llm_verification_model=os.getenv("LLM_VERIFICATION_MODEL", "").strip(),
+            llm_max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")),
+            advisor_detection_cache_max_bytes=int(os.getenv("ADVISOR_DETECTION_CACHE_MAX_BYTES", "33554432")),
+            advisor_detection_cache_ttl_seconds=float(os.getenv("ADVISOR_DETECTION_CACHE_TTL_SECONDS", "3600")),
+            advisor_proposal_cache_max_bytes=int(os.getenv("ADVISOR_PROPOSAL_CACHE_MAX_BYTES", "8388608")),
+            advisor_proposal_cache_ttl_seconds=float(os.getenv("ADVISOR_PROPOSAL_CACHE_TTL_SECONDS", "86400")),
+            advisor_fast_path_max_chars=int(os.getenv("ADVISOR_FAST_PATH_MAX_CHARS", "1000")),
+            advisor_fast_path_max_rules=int(os.getenv("ADVISOR_FAST_PATH_MAX_RULES", "10")),
+            advisor_incremental=os.getenv("ADVISOR_INCREMENTAL", "true").lower().strip() == "true",
+            advisor_window_chars=int(os.getenv("ADVISOR_WINDOW_CHARS", "800")),
+            advisor_proposal_batch_size=int(os.getenv("ADVISOR_PROPOSAL_BATCH_SIZE", "8")),
+            advisor_batch_token_budget=int(os.getenv("ADVISOR_BATCH_TOKEN_BUDGET", "3000")),
+            advisor_cell_deadline_factor=float(os.getenv("ADVISOR_CELL_DEADLINE_FACTOR", "3")),
+            advisor_cell_min_deadline_seconds=float(os.getenv("ADVISOR_CELL_MIN_DEADLINE_SECONDS", "30")),
+            advisor_hedge=os.getenv("ADVISOR_HEDGE", "false").lower().strip() == "true",
+            advisor_ensemble_k_mechanical=int(os.getenv("ADVISOR_ENSEMBLE_K_MECHANICAL", "1")),
+            advisor_ensemble_k_lexical=int(os.getenv("ADVISOR_ENSEMBLE_K_LEXICAL", "1")),
+            advisor_ensemble_k_semantic=int(os.getenv("ADVISOR_ENSEMBLE_K_SEMANTIC", "1")),
+            advisor_accept_agreement_mechanical=float(os.getenv("ADVISOR_ACCEPT_AGREEMENT_MECHANICAL", "0.6")),
+            advisor_accept_agreement_lexical=float(os.getenv("ADVISOR_ACCEPT_AGREEMENT_LEXICAL", "0.6")),
+            advisor_accept_agreement_semantic=float(os.getenv("ADVISOR_ACCEPT_AGREEMENT_SEMANTIC", "0.6")),
+            advisor_detection_temperature=float(os.getenv("ADVISOR_DETECTION_TEMPERATURE", "0.8")),
+            advisor_verify_low_agreement=os.getenv("ADVISOR_VERIFY_LOW_AGREEMENT", "false").lower().strip() == "true",
+            advisor_job_grace_seconds=float(os.getenv("ADVISOR_JOB_GRACE_SECONDS", "60")),
+            advisor_job_ttl_seconds=float(os.getenv("ADVISOR_JOB_TTL_SECONDS", "900")),
+            advisor_job_sqlite_path=os.getenv("ADVISOR_JOB_SQLITE_PATH", ""),
+            advisor_resolver_workers=int(os.getenv("ADVISOR_RESOLVER_WORKERS", "2")),
+            advisor_prefilter=os.getenv("ADVISOR_PREFILTER", "conservative").lower().strip(),
+            advisor_prefilter_min_score=float(os.getenv("ADVISOR_PREFILTER_MIN_SCORE", "0.03")),
+            advisor_max_llm_rules=int(os.getenv("ADVISOR_MAX_LLM_RULES", "100")),
             azure_client_id="" if disable_auth else get_env_or_throw("AZURE_CLIENT_ID"),
             azure_tenant_id="" if disable_auth else get_env_or_throw("AZURE_TENANT_ID"),
             azure_frontend_client_id="" if disable_auth else get_env_or_throw("AZURE_FRONTEND_CLIENT_ID"),
@@ -78,6 +272,36 @@ class Configuration(LlmConfig):
             docling_url={self.docling_url},
             docling_api_key={log_secret(self.docling_api_key)},
             llm_health_check_url={self.llm_health_check_url},
+            llm_verification_model={self.llm_verification_model},
+            llm_max_in_flight={self.llm_max_in_flight},
+            advisor_detection_cache_max_bytes={self.advisor_detection_cache_max_bytes},
+            advisor_detection_cache_ttl_seconds={self.advisor_detection_cache_ttl_seconds},
+            advisor_proposal_cache_max_bytes={self.advisor_proposal_cache_max_bytes},
+            advisor_proposal_cache_ttl_seconds={self.advisor_proposal_cache_ttl_seconds},
+            advisor_fast_path_max_chars={self.advisor_fast_path_max_chars},
+            advisor_fast_path_max_rules={self.advisor_fast_path_max_rules},
+            advisor_incremental={self.advisor_incremental},
+            advisor_window_chars={self.advisor_window_chars},
+            advisor_proposal_batch_size={self.advisor_proposal_batch_size},
+            advisor_batch_token_budget={self.advisor_batch_token_budget},
+            advisor_cell_deadline_factor={self.advisor_cell_deadline_factor},
+            advisor_cell_min_deadline_seconds={self.advisor_cell_min_deadline_seconds},
+            advisor_hedge={self.advisor_hedge},
+            advisor_ensemble_k_mechanical={self.advisor_ensemble_k_mechanical},
+            advisor_ensemble_k_lexical={self.advisor_ensemble_k_lexical},
+            advisor_ensemble_k_semantic={self.advisor_ensemble_k_semantic},
+            advisor_accept_agreement_mechanical={self.advisor_accept_agreement_mechanical},
+            advisor_accept_agreement_lexical={self.advisor_accept_agreement_lexical},
+            advisor_accept_agreement_semantic={self.advisor_accept_agreement_semantic},
+            advisor_detection_temperature={self.advisor_detection_temperature},
+            advisor_verify_low_agreement={self.advisor_verify_low_agreement},
+            advisor_job_grace_seconds={self.advisor_job_grace_seconds},
+            advisor_job_ttl_seconds={self.advisor_job_ttl_seconds},
+            advisor_job_sqlite_path={self.advisor_job_sqlite_path},
+            advisor_resolver_workers={self.advisor_resolver_workers},
+            advisor_prefilter={self.advisor_prefilter},
+            advisor_prefilter_min_score={self.advisor_prefilter_min_score},
+            advisor_max_llm_rules={self.advisor_max_llm_rules},
             azure_client_id={log_secret(self.azure_client_id)},
             azure_tenant_id={log_secret(self.azure_tenant_id)},
             azure_frontend_client_id={log_secret(self.azure_frontend_client_id)},
@@ -0,0 +1,70 @@
+"""Sorted half-open intervals with logarithmic overlap queries.
+
+The advisor tracks, per rule, the spans already resolved (to resolve repeated
+snippets to successive occurrences) and the spans of its survivors (to drop
+duplicates). Both only grow, and both are asked whether a new span overlaps any
+of them — a scan of all spans per query, quadratic for documents with hundreds
+of findings of one rule (``ß``, quotes). ``IntervalIndex`` answers these
+queries with a binary search instead.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+
+
+class IntervalIndex:
+    """Half-open ``[start, end)`` intervals; intervals can be added, not removed.
+
+    Intervals are kept sorted by start together with the running maximum of
+    their ends, so the intervals starting before a position are one prefix and
+    the furthest any of them reaches is one lookup. Inserting is a binary
+    search plus a list insert; spans found in text order are appended.
+    """
+
+    __slots__ = ("_starts", "_reach")
+
+    def __init__(self, intervals: Iterable[tuple[int, int]] = ()) -> None:
+        self._starts: list[int] = []
+        self._reach: list[int] = []
+        """``_reach[i]``: largest end of the non-empty intervals among the first ``i + 1`` (-1 if none)."""
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def copy(self) -> "IntervalIndex":
+        clone = IntervalIndex()
+        clone._starts = self._starts.copy()
+        clone._reach = self._reach.copy()
+        return clone
+
+    def add(self, start: int, end: int) -> None:
+        i = bisect_right(self._starts, start)
+        reach = self._reach[i - 1] if i else -1
+        if end > start:
+            # An empty interval overlaps nothing: it does not extend the reach.
+            reach = max(reach, end)
+        self._starts.insert(i, start)
+        self._reach.insert(i, reach)
+        for j in range(i + 1, len(self._reach)):
+            if self._reach[j] >= reach:
+                break
+            self._reach[j] = reach
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Whether ``min(end, e) > max(start, s)`` for some interval ``[s, e)``; never for an empty query."""
+        i = bisect_left(self._starts, end)
+        return start < end and i > 0 and self._reach[i - 1] > start
+
+    def reach(self, pos: int) -> int | None:
+        """The largest end of the intervals containing ``pos``, or ``None`` if there are none."""
+        i = bisect_right(self._starts, pos)
+        if i and self._reach[i - 1] > pos:
+            return self._reach[i - 1]
+        return None
+
+    def has_start(self, pos: int) -> bool:
+        """Whether an interval starts at ``pos``."""
+        i = bisect_left(self._starts, pos)
+        return i < len(self._starts) and self._starts[i] == pos
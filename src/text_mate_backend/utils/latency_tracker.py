@@ -0,0 +1,34 @@
+"""Rolling latency percentiles for deriving deadlines from observed durations."""
+
+import math
+from collections import deque
+
+
+class LatencyTracker:
+    """Keeps the last ``window`` durations and answers percentile queries over them.
+
+    Percentiles are ``None`` until ``min_samples`` durations were recorded, so
+    callers fall back to their static limits while there is no evidence yet.
+    Not thread-safe: meant to be used from the event loop only.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        if window < 1 or not 1 <= min_samples <= window:
+            raise ValueError("window must be positive and min_samples between 1 and window")
+        self.min_samples = min_samples
+        self._durations: deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._durations)
+
+    def record(self, seconds: float) -> None:
+        self._durations.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """Nearest-rank ``q``-th percentile (0 < q <= 100) of the recorded durations."""
+        if not 0 < q <= 100:
+            raise ValueError("q must be in (0, 100]")
+        if len(self._durations) < self.min_samples:
+            return None
+        ordered = sorted(self._durations)
+        return ordered[math.ceil(q / 100 * len(ordered)) - 1]
@@ -0,0 +1,194 @@
+"""Process-wide admission control for LLM calls.
+
+The self-hosted vLLM serves a small number of sequences at once, so every agent
+run in ``text_mate_backend.agents`` acquires a slot here before talking to the
+model. Slots are handed out by priority class (lower value first, FIFO within a
+class), so an interactive synonym lookup does not queue behind the dozens of
+detection and proposal calls of a running advisor validation.
+
+Waiters that are cancelled (client disconnect, batch timeout) are removed from
+the queue without ever touching the model.
+
+Callers that time their work can set ``slot_granted``: it is called, in the
+acquiring task's context, with the priority of each granted slot, so deadlines
+can start when the work reaches the model rather than when it was queued.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncGenerator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+from dcc_backend_common.logger import get_logger
+
+logger = get_logger("llm_scheduler")
+
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+class LlmPriority(IntEnum):
+    """Priority classes for LLM calls; lower values are served first."""
+
+    INTERACTIVE = 0
+    """Synonym lookups and sentence rewrites — a user is waiting on a popup."""
+    QUICK_ACTION = 1
+    """Streaming text transformations (quick actions, advisor fix)."""
+    ADVISOR_DETECTION = 2
+    """Advisor rule-batch detection calls."""
+    ADVISOR_PROPOSAL = 3
+    """Advisor per-violation proposal calls."""
+
+
+slot_granted: ContextVar[Callable[["LlmPriority"], None] | None] = ContextVar("slot_granted", default=None)
+"""Called with the priority whenever a task running in this context is granted a slot."""
+
+
+@dataclass
+class PriorityStats:
+    """Cumulative counters for one priority class."""
+
+    granted: int = 0
+    cancelled: int = 0
+    queued: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.granted if self.granted else 0.0
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future[None] = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+class LlmScheduler:
+    """Priority-ordered counting semaphore with queue and wait-time metrics."""
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats: dict[LlmPriority, PriorityStats] = {priority: PriorityStats() for priority in LlmPriority}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def queue_depth(self, priority: LlmPriority | None = None) -> int:
+        """Number of waiters still queued, optionally for one priority class only."""
+        return sum(
+            1
+            for waiter in self._waiters
+            if not waiter.future.done() and (priority is None or waiter.priority == priority)
+        )
+
+    def stats(self) -> dict[str, dict[str, float | int]]:
+        """Snapshot of the per-priority counters, keyed by priority name."""
+        return {
+            priority.name.lower(): {
+                "queue_depth": self.queue_depth(priority),
+                "granted": stats.granted,
+                "cancelled": stats.cancelled,
+                "queued": stats.queued,
+                "mean_wait_ms": round(stats.mean_wait_seconds * 1000, 1),
+                "max_wait_ms": round(stats.max_wait_seconds * 1000, 1),
+            }
+            for priority, stats in self._stats.items()
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: LlmPriority) -> AsyncGenerator[None]:
+        """Hold one in-flight slot for the duration of the block."""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: LlmPriority) -> None:
+        stats = self._stats[priority]
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            stats.granted += 1
+            self._notify_granted(priority)
+            return
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(int(priority), next(self._seq), loop.create_future(), time.monotonic())
+        heapq.heappush(self._waiters, waiter)
+        stats.queued += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over in the same tick the caller was cancelled:
+                # pass it on instead of leaking it.
+                self._release()
+            else:
+                stats.cancelled += 1
+                self._discard(waiter)
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        stats.granted += 1
+        stats.total_wait_seconds += waited
+        stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+        logger.debug(
+            "LLM slot granted after queueing",
+            priority=priority.name,
+            wait_ms=round(waited * 1000),
+            in_flight=self._in_flight,
+            queue_depth=self.queue_depth(),
+        )
+        self._notify_granted(priority)
+
+    @staticmethod
+    def _notify_granted(priority: LlmPriority) -> None:
+        callback = slot_granted.get()
+        if callback is not None:
+            callback(priority)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            if not waiter.future.done():
+                # Hand the slot over directly; ``_in_flight`` stays unchanged.
+                waiter.future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _discard(self, waiter: _Waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
+
+
+_scheduler: LlmScheduler | None = None
+
+
+def get_llm_scheduler(max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> LlmScheduler:
+    """Return the process-wide scheduler, creating it on first use.
+
+    ``max_in_flight`` only takes effect on the first call; every agent shares the
+    same instance afterwards.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LlmScheduler(max_in_flight)
+        logger.info("LLM scheduler initialised", max_in_flight=max_in_flight)
+    return _scheduler
@@ -0,0 +1,130 @@
+"""Single-flight coalescing: concurrent identical requests share one computation."""
+
+import asyncio
+import hashlib
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from dcc_backend_common.logger import get_logger
+
+logger = get_logger("single_flight")
+
+
+def single_flight_key(*parts: str) -> str:
+    """Hash of ``parts``; callers pass their input in a canonical form."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass(slots=True, eq=False)
+class _Flight:
+    task: asyncio.Future[Any] = field(init=False)
+    subscribers: int = 0
+    # Stream flights only.
+    items: list[Any] = field(default_factory=list)
+    ended: bool = False
+    error: Exception | None = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    """Set and replaced whenever an item is produced or the stream ends."""
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time and shares it with every concurrent caller.
+
+    A caller arriving while the computation of its key is running subscribes
+    to it instead of starting another one; for streams it first gets the items
+    produced so far, then the rest as they come. The computation is cancelled
+    when its last subscriber is cancelled (e.g. on client disconnect). Only
+    running computations are shared: nothing is cached once they ended.
+    Not thread-safe: meant to be used from the event loop only.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._flights: dict[str, _Flight] = {}
+        self.leaders = 0
+        """Computations started."""
+        self.coalesced = 0
+        """Requests served by another request's computation."""
+
+    async def run[T](self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """The result of ``call()``, shared with concurrent callers of the same ``key``."""
+        flight = self._join(key, lambda _: asyncio.ensure_future(call()))
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(key, flight)
+
+    async def stream[T](self, key: str, produce: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """The items of ``produce()``, shared with concurrent callers of the same ``key``.
+
+        An error of the producer is raised to every subscriber after the items
+        produced before it.
+        """
+        flight = self._join(key, lambda flight: asyncio.ensure_future(self._produce(flight, produce)))
+        try:
+            position = 0
+            while True:
+                while position < len(flight.items):
+                    yield flight.items[position]
+                    position += 1
+                if flight.ended:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            self._leave(key, flight)
+
+    def stats(self) -> dict[str, int | float]:
+        requests = self.leaders + self.coalesced
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / requests if requests else 0.0,
+        }
+
+    def _join(self, key: str, start: Callable[[_Flight], asyncio.Future[Any]]) -> _Flight:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = start(flight)
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self._flights[key] = flight
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.info("Request coalesced", flight=self.name, **self.stats())
+        flight.subscribers += 1
+        return flight
+
+    def _leave(self, key: str, flight: _Flight) -> None:
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.task.done():
+            # Forget it right away: a request arriving now must not join a cancelled flight.
+            self._forget(key, flight)
+            flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    @staticmethod
+    async def _produce(flight: _Flight, produce: Callable[[], AsyncIterator[Any]]) -> None:
+        try:
+            async for item in produce():
+                flight.items.append(item)
+                flight.notify()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.ended = True
+            flight.notify()
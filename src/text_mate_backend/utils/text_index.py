@@ -0,0 +1,213 @@
+"""Immutable per-request views of an input text for advisor span resolution.
+
+The advisor resolves every detected ``source`` snippet against the same input
+text. Lowering, whitespace normalization, sentence splitting and UTF-16 offset
+translation only depend on the text, so they are computed once per request in
+``TextIndex.from_text`` and shared by all rule batches instead of being redone
+for every violation.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+_WHITESPACE_RUN = re.compile(r"\s+")
+_SEARCH_UNIT = re.compile(r"[^.!?\n]+[.!?\n]?")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*")
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse every run of whitespace to a single space."""
+    return _WHITESPACE_RUN.sub(" ", text)
+
+
+def split_into_search_units(text: str) -> list[tuple[str, int]]:
+    """Split text into sentences/segments with their character offsets."""
+    units: list[tuple[str, int]] = [(match.group(), match.start()) for match in _SEARCH_UNIT.finditer(text)]
+    if not units and text:
+        units.append((text, 0))
+    return units
+
+
+def split_into_paragraphs(text: str, max_chars: int | None = None) -> list[tuple[int, int]]:
+    """Return the half-open spans of the paragraphs in ``text``.
+
+    Paragraphs are separated by line breaks; leading and trailing whitespace is
+    excluded from each span and whitespace-only paragraphs are skipped. With
+    ``max_chars``, a longer paragraph is broken at sentence boundaries into
+    pieces of at most ``max_chars`` (a single longer sentence stays whole).
+    """
+    spans: list[tuple[int, int]] = []
+    start = 0
+    for separator in (*_PARAGRAPH_BREAK.finditer(text), None):
+        end = separator.start() if separator else len(text)
+        chunk = text[start:end]
+        stripped = chunk.strip()
+        if stripped:
+            offset = start + len(chunk) - len(chunk.lstrip())
+            if max_chars is not None and len(stripped) > max_chars:
+                spans.extend(_split_at_sentences(text, offset, offset + len(stripped), max_chars))
+            else:
+                spans.append((offset, offset + len(stripped)))
+        if separator:
+            start = separator.end()
+    return spans
+
+
+def _split_at_sentences(text: str, start: int, end: int, max_chars: int) -> list[tuple[int, int]]:
+    """Break the span ``start:end`` of ``text`` into runs of whole sentences of at most ``max_chars``."""
+    pieces: list[tuple[int, int]] = []
+    for unit, unit_start in split_into_search_units(text[start:end]):
+        stripped = unit.strip()
+        if not stripped:
+            continue
+        unit_start += start + len(unit) - len(unit.lstrip())
+        unit_end = unit_start + len(stripped)
+        if pieces and unit_end - pieces[-1][0] <= max_chars:
+            pieces[-1] = (pieces[-1][0], unit_end)
+        else:
+            pieces.append((unit_start, unit_end))
+    return pieces
+
+
+def group_into_windows(text: str, spans: list[tuple[int, int]], max_chars: int) -> list[list[tuple[int, int]]]:
+    """Group paragraph ``spans`` of ``text`` into windows of at most ``max_chars``.
+
+    A window is a run of adjacent spans (only whitespace between them) from the
+    start of its first span to the end of its last. A span longer than
+    ``max_chars`` forms a window of its own.
+    """
+    windows: list[list[tuple[int, int]]] = []
+    for start, end in spans:
+        if windows:
+            window = windows[-1]
+            if not text[window[-1][1] : start].strip() and end - window[0][0] <= max_chars:
+                window.append((start, end))
+                continue
+        windows.append([(start, end)])
+    return windows
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
+class TextIndex:
+    """Precomputed, read-only views of one input text.
+
+    All offsets are Python code points unless stated otherwise.
+    """
+
+    text: str
+    lower: str
+    normalized: str
+    normalized_offsets: array
+    """``normalized_offsets[i]`` is the original offset of normalized character ``i``;
+    the final entry maps the end of the normalized text to ``len(text)``."""
+    units: tuple[tuple[str, int], ...]
+    unit_starts: tuple[int, ...]
+    lower_units: tuple[str, ...]
+    utf16_offsets: array | None
+    """Prefix table of UTF-16 code-unit offsets, or ``None`` when the text is BMP-only
+    and both indexing schemes agree."""
+
+    @classmethod
+    def from_text(cls, text: str) -> "TextIndex":
+        units = tuple(split_into_search_units(text))
+        return cls(
+            text=text,
+            lower=text.lower(),
+            normalized=normalize_whitespace(text),
+            normalized_offsets=cls._build_normalized_offsets(text),
+            units=units,
+            unit_starts=tuple(start for _, start in units),
+            lower_units=tuple(unit_text.lower() for unit_text, _ in units),
+            utf16_offsets=cls._build_utf16_offsets(text),
+        )
+
+    @staticmethod
+    def _build_normalized_offsets(text: str) -> array:
+        # Every non-whitespace character maps 1:1; every whitespace run collapses
+        # into one normalized space that maps to the start of the run.
+        offsets = array("q")
+        pos = 0
+        for match in _WHITESPACE_RUN.finditer(text):
+            offsets.extend(range(pos, match.start()))
+            offsets.append(match.start())
+            pos = match.end()
+        offsets.extend(range(pos, len(text)))
+        offsets.append(len(text))
+        return offsets
+
+    @staticmethod
+    def _build_utf16_offsets(text: str) -> array | None:
+        if not text or max(text) < "\U00010000":
+            return None
+        offsets = array("q", [0]) * (len(text) + 1)
+        units = 0
+        for i, ch in enumerate(text):
+            units += 2 if ord(ch) >= 0x10000 else 1
+            offsets[i + 1] = units
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def normalized_to_original(self, norm_pos: int) -> int | None:
+        """Map a position in the whitespace-normalized text back to the original text.
+
+        One normalized space corresponds to a run of 1+ whitespace characters in
+        the original, so positions after a collapsed run shift accordingly.
+        """
+        if not 0 <= norm_pos < len(self.normalized_offsets):
+            return None
+        return self.normalized_offsets[norm_pos]
+
+    def original_to_normalized(self, pos: int) -> int:
+        """Position of the first normalized character at or after original position ``pos``."""
+        return bisect_left(self.normalized_offsets, pos)
+
+    def unit_at(self, pos: int) -> tuple[str, int] | None:
+        """Return the sentence/segment unit containing ``pos``, if any."""
+        i = bisect_right(self.unit_starts, pos) - 1
+        if i < 0:
+            return None
+        unit_text, unit_start = self.units[i]
+        if pos < unit_start + len(unit_text):
+            return self.units[i]
+        return None
+
+    def sentence_before(self, pos: int) -> str:
+        """Return the last non-blank unit ending at or before ``pos``, stripped ("" if none)."""
+        for i in range(bisect_right(self.unit_starts, pos) - 1, -1, -1):
+            unit_text, unit_start = self.units[i]
+            if unit_start + len(unit_text) <= pos and unit_text.strip():
+                return unit_text.strip()
+        return ""
+
+    def sentence_after(self, pos: int) -> str:
+        """Return the first non-blank unit starting at or after ``pos``, stripped ("" if none)."""
+        for unit_text, _ in self.units[bisect_left(self.unit_starts, pos) :]:
+            if unit_text.strip():
+                return unit_text.strip()
+        return ""
+
+    def to_utf16(self, codepoint_offset: int) -> int:
+        """Translate a Python code-point index into a JavaScript UTF-16 code-unit index.
+
+        Python ``str`` is a sequence of Unicode code points; ``str.find`` /
+        slicing / regex offsets are therefore code-point based. JavaScript, by
+        contrast, stores strings as UTF-16 and indexes them by **code unit**.
+        The two indexing schemes agree for every Basic Multilingual Plane (BMP)
+        character — that covers all of Latin, umlauts, ``ß``, accented letters,
+        Cyrillic, CJK, etc. They diverge only for code points >= U+10000
+        (supplementary plane: emoji, some symbols, historic scripts), which are
+        a single Python code point but two UTF-16 code units (a surrogate pair).
+
+        The prefix table counts 2 for each character outside the BMP and 1
+        otherwise, so the lookup yields the offset a JS consumer would compute.
+        This keeps UTF-16 translation at the API boundary only; all internal
+        resolution logic continues to operate on code points.
+        """
+        clamped = min(max(codepoint_offset, 0), len(self.text))
+        if self.utf16_offsets is None:
+            return clamped
+        return self.utf16_offsets[clamped]
@@ -0,0 +1,16 @@
+"""Cheap prompt-size estimates for budgeting and reporting.
+
+No tokenizer is loaded: the served model is only reachable over HTTP and its
+vocabulary is not available to the backend. For German prose and JSON, BPE
+tokenizers average close to four UTF-8 bytes per token, which is accurate enough
+to compare prompts and pack batches, but not for billing.
+"""
+
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens of ``text`` (at least 1 for non-empty text)."""
+    if not text:
+        return 0
+    return max(1, len(text.encode("utf-8")) // BYTES_PER_TOKEN)
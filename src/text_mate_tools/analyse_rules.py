@@ -4,13 +4,17 @@ from difflib import SequenceMatcher
 from pathlib import Path
 
 from text_mate_backend.models.rule_models import Rule, RulesContainer
-from text_mate_backend.services.advisor import MAX_RULES_PER_REQUEST
+from text_mate_backend.services.advisor import DETECTION_BASE_TOKENS
+from text_mate_backend.services.rule_packer import pack_rules
+from text_mate_backend.utils.configuration import Configuration
 
 RULES_DIR = Path("assets/docs/rules")
 
 SHORT_DESC_THRESHOLD = 50
 LONG_DESC_THRESHOLD = 500
 SIMILAR_NAME_THRESHOLD = 0.8
+# Rule capacity of a detection batch for an empty text at the default budget.
+BATCH_CAPACITY = Configuration.model_fields["advisor_batch_token_budget"].default - DETECTION_BASE_TOKENS
 
 
 def load_rules() -> list[Rule]:
@@ -18,10 +22,6 @@ def load_rules() -> list[Rule]:
     return [rule for container in containers for rule in container.rules]
 
 
-def approximate_tokens(text: str) -> int:
-    return len(text) // 4
-
-
 def check_duplicate_names(rules: list[Rule]) -> list[tuple[str, list[str]]]:
     name_to_collections: dict[str, list[str]] = defaultdict(list)
     for rule in rules:
@@ -66,11 +66,7 @@ def check_collection_files(rules: list[Rule]) -> list[tuple[str, set[str]]]:
 
 
 def simulate_batches(rules: list[Rule]) -> list[list[Rule]]:
-    sorted_rules = sorted(rules, key=lambda r: r.collection)
-    batches: list[list[Rule]] = []
-    for i in range(0, len(sorted_rules), MAX_RULES_PER_REQUEST):
-        batches.append(sorted_rules[i : i + MAX_RULES_PER_REQUEST])
-    return batches
+    return pack_rules(rules, BATCH_CAPACITY)
 
 
 def print_summary(rules: list[Rule]) -> None:
@@ -80,9 +76,9 @@ def print_summary(rules: list[Rule]) -> None:
     print("=" * 80)
     print(f"  Total rules:       {len(rules)}")
     print(f"  Collections:       {len(collections)}")
-    print(f"  Batch size:        {MAX_RULES_PER_REQUEST}")
-    print(f"  Total batches:     {(len(rules) + MAX_RULES_PER_REQUEST - 1) // MAX_RULES_PER_REQUEST}")
-    print(f"  Approx. tokens:    {sum(approximate_tokens(r.model_dump_json()) for r in rules)}")
+    print(f"  Rule tokens/batch: {BATCH_CAPACITY}")
+    print(f"  Total batches:     {len(simulate_batches(rules))}")
+    print(f"  Approx. tokens:    {sum(r.prompt_tokens for r in rules)}")
     print()
 
 
@@ -104,11 +100,11 @@ def print_collection_table(rules: list[Rule]) -> None:
 
 def print_batches(batches: list[list[Rule]]) -> None:
     print("-" * 80)
-    print(" BATCH SIMULATION (sorted by collection)")
+    print(" BATCH SIMULATION (packed per collection, empty text)")
     print("-" * 80)
     for i, batch in enumerate(batches, 1):
         cols = sorted({r.collection for r in batch})
-        tokens = sum(approximate_tokens(r.model_dump_json()) for r in batch)
+        tokens = sum(r.prompt_tokens for r in batch)
         print(f"  Batch {i}: collections={', '.join(cols)}  ~{tokens} tokens  ({len(batch)} rules)")
         for r in batch:
             print(f"    - {r.name}")
@@ -0,0 +1,401 @@
+"""
+Offline micro-benchmarks for the CPU-bound stages of the advisor.
+
+No LLM is called; the benchmarks run against a synthetic document assembled by
+repeating the eval case texts until it reaches the requested size.
+
+Usage (from the repository root, so assets/docs/rules resolves):
+    uv run src/text_mate_tools/bench_advisor.py checkers [--chars N] [--repeat N]
+    uv run --env-file .env src/text_mate_tools/bench_advisor.py prompts [--repeat N] [--live N]
+    uv run src/text_mate_tools/bench_advisor.py fuzzy [--chars N] [--needles N] [--repeat N]
+    uv run src/text_mate_tools/bench_advisor.py setup [--chars N] [--cells N] [--proposals N] [--repeat N]
+
+Subcommands:
+    checkers    RuleCheckerEngine.scan vs. all patterns fused into one lookahead regex
+    prompts     Detection prompt per batch: compact rule blocks and cached schema vs. the
+                previous full-JSON rendering (estimated tokens, render time); with --live N,
+                also the detection latency of the first N batches with either prompt (calls the LLM)
+    fuzzy       Fuzzy source resolution: bit-parallel edit-distance search vs. the previous
+                per-sentence SequenceMatcher cascade, on snippets of the document with one to
+                three edits (found, found at the snippet's place, time per snippet)
+    setup       Per-request work derived from the rules alone (rule selection, name lookup,
+                batch layouts, rule JSON of the detection and proposal cache keys): served by
+                the RuleIndex built at startup vs. derived anew for every request
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from difflib import SequenceMatcher
+from functools import partial
+from pathlib import Path
+
+from pydantic_ai import Agent, RunContext
+from pydantic_ai.models import Model
+
+from text_mate_backend.agents.agent_types.violation_detection_agent import (
+    INSTRUCTION as DETECTION_INSTRUCTION,
+    ViolationDetectionAgent,
+    render_instruction,
+)
+from text_mate_backend.models.rule_models import DetectionResult, Rule, RulesContainer
+from text_mate_backend.services.advisor import DETECTION_BASE_TOKENS
+from text_mate_backend.services.rule_checker import RuleCheckerEngine
+from text_mate_backend.services.rule_index import RuleIndex
+from text_mate_backend.services.rule_packer import pack_rules
+from text_mate_backend.services.span_resolver import FUZZY_MATCH_THRESHOLD
+from text_mate_backend.utils.approximate_match import find_approximate
+from text_mate_backend.utils.configuration import Configuration
+from text_mate_backend.utils.text_index import TextIndex
+from text_mate_backend.utils.token_estimate import estimate_tokens
+from text_mate_tools.advisor_eval.models import EvalCase
+
+RULES_DIR = Path("assets/docs/rules")
+CASES_DIR = Path("evals/advisor/cases")
+
+
+def load_rules(directory: Path = RULES_DIR) -> list[Rule]:
+    rules: list[Rule] = []
+    for path in sorted(directory.glob("*.json")):
+        rules.extend(RulesContainer.model_validate_json(path.read_text()).rules)
+    return rules
+
+
+def build_document(chars: int, directory: Path = CASES_DIR) -> str:
+    """Concatenate eval case texts (as paragraphs) until ``chars`` is reached."""
+    texts = [EvalCase.model_validate_json(f.read_text()).text for f in sorted(directory.glob("*.json"))]
+    if not texts:
+        raise SystemExit(f"No eval case files found in {directory}")
+    paragraphs: list[str] = []
+    size = 0
+    while size < chars:
+        text = texts[len(paragraphs) % len(texts)]
+        paragraphs.append(text)
+        size += len(text) + 2
+    return "\n\n".join(paragraphs)[:chars]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> tuple[float, float]:
+    """Return (min, median) wall time in milliseconds over ``repeat`` runs."""
+    timings: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+def bench_checkers(args: argparse.Namespace) -> None:
+    rules = [rule for rule in load_rules() if rule.checker is not None]
+    text = build_document(args.chars)
+    engine = RuleCheckerEngine(rules)
+    # Reference: every pattern fused into one alternation of capturing lookaheads,
+    # so a single finditer reports each offset where any rule matches.
+    fused = re.compile(
+        "|".join(
+            f"(?=((?{'i' if rule.checker.ignore_case else ''}:{rule.checker.pattern})))"
+            for rule in rules
+            if rule.checker is not None
+        )
+    )
+
+    print(f"Document: {len(text):,} chars, {len(rules)} checker rules ({len(engine.deciding_rules)} deciding)")
+    print(f"{'variant':<36} {'hits':>8} {'min ms':>10} {'median ms':>10} {'MB/s':>8}")
+
+    def report(label: str, hits: int, fn: Callable[[], object]) -> None:
+        best, median = measure(fn, args.repeat)
+        print(f"{label:<36} {hits:>8} {best:>10.2f} {median:>10.2f} {len(text) / 1000 / median:>8.1f}")
+
+    report("engine.scan (deciding)", len(engine.scan(text)), lambda: engine.scan(text))
+    report(
+        "engine.scan (all)",
+        len(engine.scan(text, deciding_only=False)),
+        lambda: engine.scan(text, deciding_only=False),
+    )
+    report(
+        "fused lookahead finditer (positions)", sum(1 for _ in fused.finditer(text)), lambda: list(fused.finditer(text))
+    )
+
+
+def render_legacy_instruction(deps: RulesContainer) -> str:
+    """The detection instruction as rendered before compaction: full rule JSON and schemas built per call."""
+    return DETECTION_INSTRUCTION.format(
+        rules=deps.model_dump_json(),
+        input_model_description=RulesContainer.model_json_schema(),
+        output_model_description=DetectionResult.model_json_schema(),
+    )
+
+
+class LegacyPromptDetectionAgent(ViolationDetectionAgent):
+    """The detection agent with the legacy prompt rendering, for latency comparisons."""
+
+    def create_agent(self, model: Model):
+        agent = Agent(model=model, deps_type=RulesContainer, output_type=DetectionResult)
+
+        @agent.instructions
+        def get_instruction(ctx: RunContext[RulesContainer]):
+            return render_legacy_instruction(ctx.deps)
+
+        return agent
+
+
+def detection_batches() -> list[list[Rule]]:
+    """All loaded rules packed into detection batches as the advisor does for an empty text."""
+    capacity = Configuration.model_fields["advisor_batch_token_budget"].default - DETECTION_BASE_TOKENS
+    return pack_rules(load_rules(), capacity)
+
+
+def bench_prompts(args: argparse.Namespace) -> None:
+    batches = detection_batches()
+    print(f"{len(batches)} detection batches of {sum(len(batch) for batch in batches)} rules")
+    print(
+        f"{'batch':>5} {'rules':>5} {'legacy tok':>10} {'compact tok':>11} {'saved':>6} "
+        f"{'legacy ms':>9} {'compact ms':>10}"
+    )
+    totals = [0, 0, 0.0, 0.0]
+    for number, batch in enumerate(batches):
+        deps = RulesContainer(rules=batch)
+        legacy = estimate_tokens(render_legacy_instruction(deps))
+        compact = estimate_tokens(render_instruction(deps))
+        _, legacy_ms = measure(partial(render_legacy_instruction, deps), args.repeat)
+        _, compact_ms = measure(partial(render_instruction, deps), args.repeat)
+        totals = [totals[0] + legacy, totals[1] + compact, totals[2] + legacy_ms, totals[3] + compact_ms]
+        print(
+            f"{number:>5} {len(batch):>5} {legacy:>10} {compact:>11} {1 - compact / legacy:>6.0%} "
+            f"{legacy_ms:>9.3f} {compact_ms:>10.3f}"
+        )
+    print(
+        f"{'all':>5} {'':>5} {totals[0]:>10} {totals[1]:>11} {1 - totals[1] / totals[0]:>6.0%} "
+        f"{totals[2]:>9.3f} {totals[3]:>10.3f}"
+    )
+    if args.live:
+        asyncio.run(live_latency(batches[: args.live], build_document(args.chars)))
+
+
+async def live_latency(batches: list[list[Rule]], text: str) -> None:
+    """Detection latency per batch with the legacy and the compact prompt, sequentially."""
+    config = Configuration.from_env()
+    agents = {"legacy": LegacyPromptDetectionAgent(config), "compact": ViolationDetectionAgent(config)}
+    print(f"\nLive detection over {len(text):,} chars ({config.llm_model})")
+    print(f"{'batch':>5} {'legacy s':>9} {'compact s':>10} {'change':>7}")
+    for number, batch in enumerate(batches):
+        seconds: dict[str, float] = {}
+        for label, agent in agents.items():
+            started = time.perf_counter()
+            await agent.run(text, deps=RulesContainer(rules=batch))
+            seconds[label] = time.perf_counter() - started
+        change = seconds["compact"] / seconds["legacy"] - 1
+        print(f"{number:>5} {seconds['legacy']:>9.2f} {seconds['compact']:>10.2f} {change:>+7.0%}")
+
+
+def legacy_fuzzy_find(needle: str, index: TextIndex) -> tuple[int, int] | None:
+    """The fuzzy fallback as it was before the edit-distance search: two SequenceMatcher passes per sentence."""
+    if len(needle) < 2:
+        return None
+    best_ratio = 0.0
+    best_pos = -1
+    best_len = len(needle)
+    lower_needle = needle.lower()
+    lower_prefix = needle[:5].lower()
+    for (candidate_text, candidate_start), lower_candidate in zip(index.units, index.lower_units, strict=True):
+        if len(candidate_text) < 2:
+            continue
+        search_window = candidate_text
+        offset = 0
+        if len(needle) < len(candidate_text):
+            window_start = max(0, lower_candidate.find(lower_prefix))
+            window = max(len(needle), 10)
+            offset = max(0, window_start - 5)
+            search_window = candidate_text[offset : window_start + window + 10]
+        block = SequenceMatcher(None, lower_needle, search_window.lower()).find_longest_match(
+            0, len(needle), 0, len(search_window)
+        )
+        if block.size > 0:
+            matched_text = needle[block.a : block.a + block.size]
+            ratio = SequenceMatcher(None, lower_needle, matched_text.lower()).ratio()
+            if ratio > best_ratio:
+                best_ratio = ratio
+                best_pos = candidate_start + offset + block.b
+                best_len = max(block.size, len(needle) // 2)
+    if best_ratio >= FUZZY_MATCH_THRESHOLD and best_pos >= 0:
+        return best_pos, best_len
+    return None
+
+
+def approximate_find(needle: str, index: TextIndex) -> tuple[int, int] | None:
+    match = find_approximate(needle.lower(), index.lower, FUZZY_MATCH_THRESHOLD)
+    return None if match is None else (match.start, match.end - match.start)
+
+
+def fuzzy_needles(text: str, count: int, rng: random.Random) -> list[tuple[str, int, int]]:
+    """``count`` snippets of ``text`` (20-80 chars) with 1-3 edits, one in three at the first character."""
+    alphabet = "abcdefghijklmnopqrstuvwxyzäöü"
+    needles: list[tuple[str, int, int]] = []
+    while len(needles) < count:
+        start = rng.randrange(len(text) - 80)
+        end = start + rng.randint(20, 80)
+        chars = list(text[start:end])
+        edits = rng.randint(1, 3)
+        for edit in range(edits):
+            at = 0 if edit == 0 and len(needles) % 3 == 0 else rng.randrange(len(chars))
+            kind = rng.choice(("substitute", "delete", "insert"))
+            if kind == "substitute":
+                chars[at] = rng.choice(alphabet)
+            elif kind == "delete":
+                del chars[at]
+            else:
+                chars.insert(at, rng.choice(alphabet))
+        needles.append(("".join(chars), start, end))
+    return needles
+
+
+def covers_original(text: str, found: tuple[int, int], start: int, end: int) -> bool:
+    """Whether ``found`` overlaps an occurrence of ``text[start:end]`` by 90 % of its length.
+
+    Any occurrence counts, as the eval texts repeat in the document; an edit at
+    the snippet's first character may shift the span by a character.
+    """
+    original = text[start:end]
+    pos = text.find(original)
+    while pos != -1:
+        if min(found[0] + found[1], pos + len(original)) - max(found[0], pos) >= 0.9 * len(original):
+            return True
+        pos = text.find(original, pos + 1)
+    return False
+
+
+def bench_fuzzy(args: argparse.Namespace) -> None:
+    text = build_document(args.chars)
+    index = TextIndex.from_text(text)
+    needles = fuzzy_needles(text, args.needles, random.Random(args.seed))
+    print(f"Document: {len(text):,} chars, {len(index.units):,} sentences, {len(needles)} snippets with 1-3 edits")
+    print(f"{'variant':<28} {'found':>6} {'located':>8} {'min ms':>10} {'median ms':>10} {'ms/snippet':>10}")
+    variants = {"SequenceMatcher cascade": legacy_fuzzy_find, "bit-parallel edit distance": approximate_find}
+    for label, find in variants.items():
+        results = [find(needle, index) for needle, _, _ in needles]
+        found = sum(result is not None for result in results)
+        located = sum(
+            result is not None and covers_original(text, result, start, end)
+            for result, (_, start, end) in zip(results, needles, strict=True)
+        )
+        best, median = measure(lambda find=find: [find(needle, index) for needle, _, _ in needles], args.repeat)
+        print(f"{label:<28} {found:>6} {located:>8} {best:>10.1f} {median:>10.1f} {median / len(needles):>10.2f}")
+
+
+def rules_digest(rules: list[Rule], rule_json: Callable[[Rule], str]) -> str:
+    """The rule part of a detection or proposal cache key."""
+    digest = hashlib.sha256()
+    for rule in sorted(rules, key=lambda rule: rule.name):
+        digest.update(rule_json(rule).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def request_setup(
+    select: Callable[[set[str]], list[Rule]],
+    lookup: Callable[[set[str], list[Rule]], dict[str, Rule]],
+    layout: Callable[[list[Rule], int], list[list[Rule]]],
+    rule_json: Callable[[Rule], str],
+    text: str,
+    cells: int,
+    proposals: int,
+) -> int:
+    """The rule-derived setup of one request: select, plan, key every cell and proposal; returns the cell count."""
+    collections = {"bundeskanzlei", "merkblatt_behoerdenbriefe"}
+    rules = select(collections)
+    rule_lookup = lookup(collections, rules)
+    budget = Configuration.model_fields["advisor_batch_token_budget"].default
+    window_rules = [rule for rule in rules if rule.scope == "window"]
+    document_rules = [rule for rule in rules if rule.scope != "window"]
+    document_batches = layout(document_rules, max(budget - DETECTION_BASE_TOKENS - estimate_tokens(text), budget // 4))
+    window_batches = layout(window_rules, max(budget - DETECTION_BASE_TOKENS - budget // 4, budget // 4))
+    for batch in document_batches:
+        rules_digest(batch, rule_json)
+    for batch in window_batches:
+        for _ in range(cells):
+            rules_digest(batch, rule_json)
+    proposed = list(rule_lookup.values())
+    for i in range(proposals):
+        rules_digest([proposed[i % len(proposed)]], rule_json)
+    return len(document_batches) + len(window_batches) * cells
+
+
+def bench_setup(args: argparse.Namespace) -> None:
+    rules = load_rules()
+    text = build_document(args.chars)
+    started = time.perf_counter()
+    index = RuleIndex(rules)
+    print(f"RuleIndex built in {(time.perf_counter() - started) * 1000:.0f} ms: {index.report()}")
+    by_collection: dict[str, list[Rule]] = {}
+    for rule in rules:
+        by_collection.setdefault(rule.collection, []).append(rule)
+
+    variants = {
+        "derived per request": partial(
+            request_setup,
+            lambda docs: [rule for collection in sorted(docs) for rule in by_collection.get(collection, [])],
+            lambda docs, selected: {rule.name: rule for rule in selected},
+            pack_rules,
+            lambda rule: rule.model_dump_json(),
+        ),
+        "RuleIndex": partial(
+            request_setup,
+            index.select,
+            lambda docs, selected: index.lookup(docs),
+            index.layout,
+            lambda rule: rule.prompt_json,
+        ),
+    }
+    print(f"Text: {len(text):,} chars, {args.cells} windows per window batch, {args.proposals} proposals")
+    print(f"{'variant':<22} {'cells':>6} {'min ms':>10} {'median ms':>10}")
+    for label, setup in variants.items():
+        run = partial(setup, text, args.cells, args.proposals)
+        cells = run()
+        best, median = measure(run, args.repeat)
+        print(f"{label:<22} {cells:>6} {best:>10.3f} {median:>10.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline advisor micro-benchmarks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    checkers = subparsers.add_parser("checkers", help="Deterministic checker stage")
+    checkers.add_argument("--chars", type=int, default=100_000)
+    checkers.add_argument("--repeat", type=int, default=20)
+    checkers.set_defaults(func=bench_checkers)
+
+    prompts = subparsers.add_parser("prompts", help="Detection prompt rendering")
+    prompts.add_argument("--repeat", type=int, default=50)
+    prompts.add_argument("--live", type=int, default=0, help="Also time N batches against the LLM")
+    prompts.add_argument("--chars", type=int, default=1500, help="Text length for --live")
+    prompts.set_defaults(func=bench_prompts)
+
+    fuzzy = subparsers.add_parser("fuzzy", help="Fuzzy source resolution")
+    fuzzy.add_argument("--chars", type=int, default=200_000)
+    fuzzy.add_argument("--needles", type=int, default=60)
+    fuzzy.add_argument("--repeat", type=int, default=3)
+    fuzzy.add_argument("--seed", type=int, default=0)
+    fuzzy.set_defaults(func=bench_fuzzy)
+
+    setup = subparsers.add_parser("setup", help="Per-request setup derived from the rules")
+    setup.add_argument("--chars", type=int, default=20_000)
+    setup.add_argument("--cells", type=int, default=20, help="Paragraph windows per window batch")
+    setup.add_argument("--proposals", type=int, default=50)
+    setup.add_argument("--repeat", type=int, default=200)
+    setup.set_defaults(func=bench_setup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,217 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from unittest.mock import Mock
+
+from text_mate_backend.models.advisor_event_models import AdvisorEvent, DoneEvent, ErrorEvent, ProgressEvent
+from text_mate_backend.models.error_codes import ADVISOR_JOB_ABANDONED, CHECK_TEXT_ERROR
+from text_mate_backend.models.error_response import ApiErrorException
+from text_mate_backend.services.advisor_jobs import AdvisorJob, AdvisorJobService, SqliteJobLog
+from text_mate_backend.utils.configuration import Configuration
+
+
+def progress(seq: int) -> ProgressEvent:
+    return ProgressEvent(seq=seq, stage="detection", checked=seq, total=3)
+
+
+def done(seq: int) -> DoneEvent:
+    return DoneEvent(seq=seq, checked=3, total=3, cells_total=3, skipped=0, violations=0, timings_ms={"total": 1})
+
+
+class FakeAdvisorService:
+    """Yields the events put on ``queue``; an exception on the queue is raised."""
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[AdvisorEvent | Exception] = asyncio.Queue()
+        self.calls = 0
+
+    async def check_text_events(self, text: str, docs: set[str]) -> AsyncIterator[AdvisorEvent]:
+        self.calls += 1
+        while True:
+            item = await self.queue.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            if isinstance(item, DoneEvent):
+                return
+
+
+def make_service(
+    advisor: FakeAdvisorService, grace: float = 60, ttl: float = 900, sqlite_path: str = ""
+) -> AdvisorJobService:
+    config = Mock(spec=Configuration)
+    config.advisor_job_grace_seconds = grace
+    config.advisor_job_ttl_seconds = ttl
+    config.advisor_job_sqlite_path = sqlite_path
+    return AdvisorJobService(config, advisor)  # type: ignore[arg-type]
+
+
+async def take(events: AsyncIterator[AdvisorEvent], count: int) -> list[AdvisorEvent]:
+    return [await anext(events) for _ in range(count)]
+
+
+def test_reconnect_resumes_after_last_seq() -> None:
+    async def scenario() -> tuple[list[int], list[int], int]:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor)
+        job = service.start("Text", {"doc"}, owner="alice")
+        for seq in range(2):
+            advisor.queue.put_nowait(progress(seq))
+
+        first = service.events(job)
+        received = await take(first, 2)
+        await first.aclose()  # the connection drops
+
+        advisor.queue.put_nowait(progress(2))
+        advisor.queue.put_nowait(done(3))
+        resumed = [event async for event in service.events(job, after=received[-1].seq)]
+        await service.close()
+        return [e.seq for e in received], [e.seq for e in resumed], advisor.calls
+
+    received, resumed, calls = asyncio.run(scenario())
+    assert received == [0, 1]
+    assert resumed == [2, 3]
+    assert calls == 1
+
+
+def test_replays_ended_job_from_start() -> None:
+    async def scenario() -> list[str]:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor)
+        job = service.start("Text", set(), owner=None)
+        advisor.queue.put_nowait(progress(0))
+        advisor.queue.put_nowait(done(1))
+        await job.task
+        events = [event.type async for event in service.events(job)]
+        await service.close()
+        return events
+
+    assert asyncio.run(scenario()) == ["progress", "done"]
+
+
+def test_job_without_listener_is_abandoned_after_grace() -> None:
+    async def scenario() -> list[AdvisorEvent]:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor, grace=0.01)
+        job = service.start("Text", set(), owner=None)
+        advisor.queue.put_nowait(progress(0))
+        await asyncio.wait_for(asyncio.gather(job.task, return_exceptions=True), timeout=1)
+        events = [event async for event in service.events(job)]
+        await service.close()
+        return events
+
+    events = asyncio.run(scenario())
+    assert events[-1] == ErrorEvent(seq=1, error_id=ADVISOR_JOB_ABANDONED, debug_message="Job was cancelled")
+
+
+def test_listener_keeps_job_alive() -> None:
+    async def scenario() -> list[str]:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor, grace=0.01)
+        job = service.start("Text", set(), owner=None)
+        events = service.events(job)
+        advisor.queue.put_nowait(progress(0))
+        received = await take(events, 1)
+        await asyncio.sleep(0.05)
+        advisor.queue.put_nowait(done(1))
+        received += [event async for event in events]
+        await service.close()
+        return [event.type for event in received]
+
+    assert asyncio.run(scenario()) == ["progress", "done"]
+
+
+def test_failed_check_ends_with_error_event() -> None:
+    async def scenario() -> AdvisorEvent:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor)
+        job = service.start("Text", set(), owner=None)
+        advisor.queue.put_nowait(
+            ApiErrorException({"status": 500, "errorId": CHECK_TEXT_ERROR, "debugMessage": "boom"})
+        )
+        events = [event async for event in service.events(job)]
+        await service.close()
+        return events[-1]
+
+    assert asyncio.run(scenario()) == ErrorEvent(seq=0, error_id=CHECK_TEXT_ERROR, debug_message="boom")
+
+
+def test_unexpected_error_ends_with_error_event() -> None:
+    async def scenario() -> AdvisorEvent:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor)
+        job = service.start("Text", set(), owner=None)
+        advisor.queue.put_nowait(RuntimeError("boom"))
+        events = [event async for event in service.events(job)]
+        await service.close()
+        return events[-1]
+
+    assert asyncio.run(scenario()) == ErrorEvent(seq=0, error_id=CHECK_TEXT_ERROR, debug_message="boom")
+
+
+def test_jobs_are_visible_to_their_owner_only() -> None:
+    async def scenario() -> tuple[bool, bool, bool]:
+        service = make_service(FakeAdvisorService())
+        job = service.start("Text", set(), owner="alice")
+        result = (
+            service.get(job.id, "alice") is job,
+            service.get(job.id, "bob") is None,
+            service.get("unknown", "alice") is None,
+        )
+        await service.close()
+        return result
+
+    assert asyncio.run(scenario()) == (True, True, True)
+
+
+def test_ended_job_is_evicted_after_ttl() -> None:
+    async def scenario() -> bool:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor, ttl=0)
+        job = service.start("Text", set(), owner=None)
+        advisor.queue.put_nowait(done(0))
+        await job.task
+        await asyncio.sleep(0.01)
+        return service.get(job.id, None) is None
+
+    assert asyncio.run(scenario())
+
+
+def test_sqlite_log_replays_ended_job_after_restart(tmp_path: Path) -> None:
+    path = str(tmp_path / "jobs.sqlite")
+
+    async def run_job() -> str:
+        advisor = FakeAdvisorService()
+        service = make_service(advisor, sqlite_path=path)
+        job = service.start("Text", set(), owner="alice")
+        advisor.queue.put_nowait(progress(0))
+        advisor.queue.put_nowait(done(1))
+        await job.task
+        await service.close()
+        return job.id
+
+    async def replay(job_id: str, owner: str) -> list[str] | None:
+        service = make_service(FakeAdvisorService(), sqlite_path=path)
+        job = service.get(job_id, owner)
+        return None if job is None else [event.type async for event in service.events(job)]
+
+    job_id = asyncio.run(run_job())
+    assert asyncio.run(replay(job_id, "alice")) == ["progress", "done"]
+    assert asyncio.run(replay(job_id, "bob")) is None
+
+
+def test_sqlite_job_of_stopped_process_ends_abandoned(tmp_path: Path) -> None:
+    path = str(tmp_path / "jobs.sqlite")
+    log = SqliteJobLog(path)
+    log.create(AdvisorJob(id="stopped", owner=None), time.time())
+    log.append("stopped", progress(0))
+    log.close()
+
+    job = make_service(FakeAdvisorService(), sqlite_path=path).get("stopped", None)
+
+    assert job is not None and job.ended
+    assert job.events == [
+        progress(0),
+        ErrorEvent(seq=1, error_id=ADVISOR_JOB_ABANDONED, debug_message="Job is not running"),
+    ]
@@ -0,0 +1,1019 @@
+"""Tests for the AdvisorService batch pipeline with stubbed agents (no LLM, no I/O)."""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from text_mate_backend.models.advisor_event_models import DoneEvent, ProgressEvent, ViolationEvent
+from text_mate_backend.models.rule_models import (
+    BatchProposal,
+    BatchProposalRequest,
+    BatchProposalResult,
+    CheckerSpec,
+    CombinedResult,
+    CombinedViolation,
+    DetectionResult,
+    DetectionViolation,
+    ProposalRequest,
+    Rule,
+    RulesContainer,
+    RulesValidationContainer,
+    VerificationResult,
+)
+from text_mate_backend.services.advisor import BATCH_TIMEOUT_SECONDS, AdvisorService, CellStats, ProposalStats
+from text_mate_backend.services.rule_index import RuleIndex
+from text_mate_backend.services.rule_prefilter import RulePrefilter
+from text_mate_backend.services.span_resolver import SpanResolver
+from text_mate_backend.utils.latency_tracker import LatencyTracker
+from text_mate_backend.utils.llm_scheduler import LlmPriority, LlmScheduler
+from text_mate_backend.utils.single_flight import SingleFlight
+from text_mate_backend.utils.text_index import TextIndex
+from text_mate_backend.utils.ttl_cache import TtlLruCache
+
+
+def make_rule(name: str, description: str = "", scope: str = "document", all_occurrences: bool = False) -> Rule:
+    return Rule(
+        name=name,
+        description=description,
+        file_name="doc.pdf",
+        page_number=1,
+        example="",
+        collection="bundeskanzlei",
+        scope=scope,
+        all_occurrences=all_occurrences,
+    )
+
+
+class FakeDetectionAgent:
+    """Streams partial DetectionResult snapshots like the structured-output stream does.
+
+    Each intermediate snapshot ends with a truncated copy of the element being
+    generated; the last snapshot is the complete result.
+    """
+
+    def __init__(self, detect: Callable[[str, RulesContainer], DetectionResult]) -> None:
+        self.detect = detect
+        self.calls: list[str] = []
+        self.kwargs: list[dict[str, Any]] = []
+
+    async def run_stream_output(self, text: str, deps: RulesContainer, **kwargs: Any) -> AsyncIterator[DetectionResult]:
+        self.calls.append(text)
+        self.kwargs.append(kwargs)
+        violations = self.detect(text, deps).violations
+        for i, violation in enumerate(violations):
+            partial = violation.model_copy(update={"source": violation.source[:-1], "reason": ""})
+            yield DetectionResult(violations=[*violations[:i], partial])
+            await asyncio.sleep(0)
+        yield DetectionResult(violations=violations)
+
+
+def make_service(
+    detections: list[DetectionViolation], rules: list[Rule] | None = None, **config: Any
+) -> AdvisorService:
+    svc = AdvisorService.__new__(AdvisorService)
+    svc.config = Mock(
+        llm_model="test-model",
+        **{
+            "advisor_incremental": True,
+            "advisor_proposal_batch_size": 1,
+            "advisor_window_chars": 800,
+            "advisor_cell_deadline_factor": 3.0,
+            "advisor_cell_min_deadline_seconds": 30,
+            "advisor_hedge": False,
+            "advisor_batch_token_budget": 3000,
+            "advisor_prefilter": "conservative",
+            "advisor_max_llm_rules": 0,
+            "advisor_ensemble_k_mechanical": 1,
+            "advisor_ensemble_k_lexical": 1,
+            "advisor_ensemble_k_semantic": 1,
+            "advisor_accept_agreement_mechanical": 0.6,
+            "advisor_accept_agreement_lexical": 0.6,
+            "advisor_accept_agreement_semantic": 0.6,
+            "advisor_detection_temperature": 0.8,
+            "advisor_verify_low_agreement": False,
+            "advisor_fast_path_max_chars": 0,
+            "advisor_fast_path_max_rules": 10,
+            **config,
+        },
+    )
+    svc.detection_agent = FakeDetectionAgent(lambda text, deps: DetectionResult(violations=detections))
+    svc.proposal_agent = Mock(run=AsyncMock(return_value="Vorschlag"))
+    svc.batch_proposal_agent = Mock(run=AsyncMock(side_effect=propose_all))
+    svc.combined_agent = FakeDetectionAgent(lambda text, deps: CombinedResult(violations=[]))
+    svc.verification_agent = Mock(run=AsyncMock(return_value=VerificationResult(violated=True)))
+    svc.detection_cache = TtlLruCache(max_bytes=1 << 20, ttl_seconds=60, sizeof=lambda r: len(r.model_dump_json()))
+    svc.paragraph_cache = TtlLruCache(max_bytes=1 << 20, ttl_seconds=60, sizeof=len)
+    svc.proposal_cache = TtlLruCache(max_bytes=1 << 20, ttl_seconds=60, sizeof=len)
+    svc._proposals_in_flight = {}
+    svc.rule_index = RuleIndex(rules or [])
+    svc._checker_engines = {}
+    svc.cell_latency = {"document": LatencyTracker(), "window": LatencyTracker()}
+    svc.flights = SingleFlight("advisor")
+    svc.span_resolver = SpanResolver(workers=0)
+    svc.prefilter = RulePrefilter(
+        svc.rule_index, mode=svc.config.advisor_prefilter, max_rules=svc.config.advisor_max_llm_rules
+    )
+    return svc
+
+
+def propose_all(prompt: None, deps: BatchProposalRequest) -> BatchProposalResult:
+    return BatchProposalResult(proposals=[BatchProposal(id=item.id, proposal=f"B{item.id}") for item in deps.items])
+
+
+def detect_digits(text: str, deps: RulesContainer) -> DetectionResult:
+    """Detection stub: every single digit in the text violates every rule of the batch."""
+    return DetectionResult(
+        violations=[
+            DetectionViolation(rule_name=rule.name, reason="Zahl ausschreiben", source=char)
+            for rule in deps.rules
+            for char in dict.fromkeys(c for c in text if c.isdigit())
+        ]
+    )
+
+
+async def collect_stream(svc: AdvisorService, text: str) -> list[RulesValidationContainer]:
+    return [container async for container in svc.check_text_stream(text, {"bundeskanzlei"})]
+
+
+def stream(svc: AdvisorService, text: str) -> list[RulesValidationContainer]:
+    return asyncio.run(collect_stream(svc, text))
+
+
+TEXT = "Die Zeitung berichtete über 3 neue Gesetze."
+RULE = make_rule("Kurze Zahlen")
+DETECTION = DetectionViolation(rule_name=RULE.name, reason="Zahl ausschreiben", source="3")
+
+
+def process(svc: AdvisorService, text: str = TEXT, rules: list[Rule] | None = None) -> list[Any]:
+    rules = rules or [RULE]
+    lookup = {rule.name: rule for rule in rules}
+    return asyncio.run(svc._process_batch(TextIndex.from_text(text), rules, lookup))
+
+
+class TestDetectionCache:
+    def test_unchanged_batch_served_from_cache(self) -> None:
+        svc = make_service([DETECTION])
+        first = process(svc)
+        second = process(svc)
+        assert first == second
+        assert len(first) == 1
+        assert len(svc.detection_agent.calls) == 1
+        assert svc.detection_cache.hits == 1
+
+    def test_changed_text_misses(self) -> None:
+        svc = make_service([DETECTION])
+        process(svc)
+        process(svc, text=TEXT + " Und 3 weitere.")
+        assert len(svc.detection_agent.calls) == 2
+
+    def test_changed_rule_content_misses(self) -> None:
+        svc = make_service([DETECTION])
+        process(svc)
+        process(svc, rules=[make_rule(RULE.name, description="geändert")])
+        assert len(svc.detection_agent.calls) == 2
+
+    def test_model_is_part_of_key(self) -> None:
+        svc = make_service([DETECTION])
+        key = svc._detection_cache_key(TEXT, [RULE])
+        svc.config.llm_model = "other-model"
+        assert svc._detection_cache_key(TEXT, [RULE]) != key
+
+    def test_rule_order_does_not_matter(self) -> None:
+        svc = make_service([])
+        other = make_rule("Guillemets")
+        assert svc._detection_cache_key(TEXT, [RULE, other]) == svc._detection_cache_key(TEXT, [other, RULE])
+
+
+class TestIncrementalRevalidation:
+    WINDOW_RULE = make_rule("Kurze Zahlen", scope="window")
+
+    def make(self, rules: list[Rule] | None = None, **config: Any) -> AdvisorService:
+        svc = make_service([], rules=rules or [self.WINDOW_RULE], **config)
+        svc.detection_agent.detect = detect_digits
+        return svc
+
+    def test_only_changed_paragraph_is_sent(self) -> None:
+        svc = self.make()
+        first = "Es gibt 3 Gesetze.\n\nDer Text bleibt.\n\nNoch 5 Fälle."
+        stream(svc, first)
+        assert len(svc.detection_agent.calls) == 1
+
+        second = "Es gibt 3 Gesetze.\n\nDer Text wurde um 7 Punkte ergänzt.\n\nNoch 5 Fälle."
+        containers = stream(svc, second)
+        assert len(svc.detection_agent.calls) == 2
+        # Sent with one sentence of context on either side; digits detected in
+        # the context are not reported again.
+        assert svc.detection_agent.calls[-1] == second
+
+        violations = [v for c in containers for v in c.violations]
+        assert sorted((v.source, v.range.start) for v in violations) == [
+            ("3", second.index("3")),
+            ("5", second.index("5")),
+            ("7", second.index("7")),
+        ]
+        # Cached findings are streamed before the changed paragraph completes.
+        assert {v.source for v in containers[0].violations} == {"3", "5"}
+        assert containers[-1].checked == containers[-1].total == 1
+
+    def test_moved_paragraph_is_reanchored(self) -> None:
+        svc = self.make()
+        stream(svc, "Absatz mit 4 Zeichen.")
+        text = "Neuer Einstieg ohne Zahl.\n\nAbsatz mit 4 Zeichen."
+        violations = [v for c in stream(svc, text) for v in c.violations]
+        assert [(v.source, v.range.start) for v in violations] == [("4", text.index("4"))]
+
+    def test_unchanged_text_needs_no_llm_call(self) -> None:
+        svc = self.make()
+        text = "Eins 1.\n\nZwei 2."
+        stream(svc, text)
+        containers = stream(svc, text)
+        assert len(svc.detection_agent.calls) == 1
+        assert len(containers) == 1
+        assert containers[0].checked == 1
+
+    def test_changed_paragraphs_checked_in_parallel_windows(self) -> None:
+        svc = self.make(advisor_window_chars=40)
+        text = "Eins 1.\n\nZwei 2.\n\nDrei 3 ist ein längerer Absatz mit Text.\n\nVier 4."
+        containers = stream(svc, text)
+        assert sorted(svc.detection_agent.calls) == sorted(
+            [
+                "Eins 1.\n\nZwei 2.\n\nDrei 3 ist ein längerer Absatz mit Text.",
+                "Zwei 2.\n\nDrei 3 ist ein längerer Absatz mit Text.\n\nVier 4.",
+                "Drei 3 ist ein längerer Absatz mit Text.\n\nVier 4.",
+            ]
+        )
+        violations = [v for c in containers for v in c.violations]
+        assert sorted((v.source, v.range.start) for v in violations) == [(d, text.index(d)) for d in "1234"]
+        assert [(c.cells_checked, c.cells_total) for c in containers] == [(1, 3), (2, 3), (3, 3)]
+        # The batch's rule is checked once its last window completes.
+        assert [c.checked for c in containers] == [0, 0, 1]
+
+    def test_document_rules_see_whole_text(self) -> None:
+        svc = self.make(rules=[make_rule("Konsistenz")])
+        text = "Eins 1.\n\nZwei 2."
+        stream(svc, text)
+        stream(svc, text.replace("Zwei", "Drei"))
+        assert svc.detection_agent.calls == [
+            text,
+            text.replace("Zwei", "Drei"),
+        ]
+
+    def test_incremental_mode_can_be_disabled(self) -> None:
+        svc = self.make(advisor_incremental=False)
+        text = "Eins 1.\n\nZwei 2."
+        stream(svc, text)
+        stream(svc, text.replace("Zwei", "Drei"))
+        assert svc.detection_agent.calls[-1] == text.replace("Zwei", "Drei")
+        assert len(svc.paragraph_cache) == 0
+
+    def test_windows_do_not_depend_on_incremental_mode(self) -> None:
+        svc = self.make(advisor_incremental=False, advisor_window_chars=10)
+        text = "Eins 1.\n\nZwei 2."
+        containers = stream(svc, text)
+        assert containers[-1].cells_total == 2
+        assert len(svc.detection_agent.calls) == 2
+
+    def test_failed_proposal_is_not_cached(self) -> None:
+        svc = self.make()
+        svc.proposal_agent.run.side_effect = RuntimeError("boom")
+        stream(svc, "Eins 1.")
+        assert len(svc.paragraph_cache) == 0
+
+
+class TestPipelinedProposals:
+    def test_proposal_dispatched_before_detection_finishes(self) -> None:
+        first_proposal_started = asyncio.Event()
+
+        class BlockingDetectionAgent(FakeDetectionAgent):
+            async def run_stream_output(self, text: str, deps: RulesContainer) -> AsyncIterator[DetectionResult]:
+                self.calls.append(text)
+                yield DetectionResult(violations=[DETECTION])
+                yield DetectionResult(violations=[DETECTION, DETECTION.model_copy(update={"source": "neue"})])
+                # The first violation is complete now; its proposal must run
+                # while detection is still streaming.
+                await asyncio.wait_for(first_proposal_started.wait(), timeout=1)
+                yield DetectionResult(violations=[DETECTION, DETECTION.model_copy(update={"source": "neue"})])
+
+        async def propose(prompt: None, deps: Any) -> str:
+            first_proposal_started.set()
+            return "Vorschlag"
+
+        svc = make_service([])
+        svc.detection_agent = BlockingDetectionAgent(detect_digits)
+        svc.proposal_agent.run.side_effect = propose
+        results = process(svc)
+        assert [r.source for r in results] == ["3", "neue"]
+
+    def test_truncated_trailing_element_is_never_resolved(self) -> None:
+        svc = make_service([DETECTION, DETECTION.model_copy(update={"source": "Gesetze"})])
+        results = process(svc)
+        assert [r.source for r in results] == ["3", "Gesetze"]
+        assert svc.proposal_agent.run.await_count == 2
+
+    def test_detection_failure_cancels_dispatched_proposals(self) -> None:
+        proposal_started = asyncio.Event()
+        proposal_cancelled = asyncio.Event()
+
+        class FailingDetectionAgent(FakeDetectionAgent):
+            async def run_stream_output(self, text: str, deps: RulesContainer) -> AsyncIterator[DetectionResult]:
+                yield DetectionResult(violations=[DETECTION, DETECTION])
+                await asyncio.wait_for(proposal_started.wait(), timeout=1)
+                raise RuntimeError("stream broke")
+
+        async def propose(prompt: None, deps: Any) -> str:
+            proposal_started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                proposal_cancelled.set()
+                raise
+            return "Vorschlag"
+
+        svc = make_service([])
+        svc.detection_agent = FailingDetectionAgent(detect_digits)
+        svc.proposal_agent.run.side_effect = propose
+
+        async def scenario() -> None:
+            lookup = {RULE.name: RULE}
+            with pytest.raises(RuntimeError):
+                await svc._process_batch(TextIndex.from_text(TEXT), [RULE], lookup)
+            assert proposal_cancelled.is_set()
+
+        asyncio.run(scenario())
+
+
+class TestBatchedProposals:
+    DETECTIONS = [
+        DETECTION,
+        DetectionViolation(rule_name=RULE.name, reason="r", source="neue"),
+        DetectionViolation(rule_name=RULE.name, reason="r", source="Gesetze"),
+    ]
+
+    def test_one_call_for_the_whole_batch(self) -> None:
+        svc = make_service(self.DETECTIONS, advisor_proposal_batch_size=8)
+        stats = ProposalStats()
+        results = asyncio.run(svc._process_batch(TextIndex.from_text(TEXT), [RULE], {RULE.name: RULE}, stats))
+        assert [(r.source, r.proposal) for r in results] == [("3", "B0"), ("neue", "B1"), ("Gesetze", "B2")]
+        assert svc.batch_proposal_agent.run.await_count == 1
+        assert svc.proposal_agent.run.await_count == 0
+        assert (stats.batched_calls, stats.single_calls, stats.calls_saved) == (1, 0, 2)
+        assert stats.prompt_tokens_saved > 0
+
+    def test_batch_size_splits_groups(self) -> None:
+        svc = make_service(self.DETECTIONS, advisor_proposal_batch_size=2)
+        stats = ProposalStats()
+        asyncio.run(svc._process_batch(TextIndex.from_text(TEXT), [RULE], {RULE.name: RULE}, stats))
+        # Two violations fill the first group; the last one is sent alone.
+        assert svc.batch_proposal_agent.run.await_count == 1
+        assert svc.proposal_agent.run.await_count == 1
+        assert (stats.batched_calls, stats.single_calls, stats.calls_saved) == (1, 1, 1)
+
+    def test_uncovered_items_fall_back_to_single_calls(self) -> None:
+        svc = make_service(self.DETECTIONS, advisor_proposal_batch_size=8)
+        svc.batch_proposal_agent.run.side_effect = None
+        svc.batch_proposal_agent.run.return_value = BatchProposalResult(
+            proposals=[
+                BatchProposal(id=2, proposal="B2"),
+                BatchProposal(id=0, proposal="  "),
+                BatchProposal(id=9, proposal="x"),
+            ]
+        )
+        stats = ProposalStats()
+        results = asyncio.run(svc._process_batch(TextIndex.from_text(TEXT), [RULE], {RULE.name: RULE}, stats))
+        assert [(r.source, r.proposal) for r in results] == [
+            ("3", "Vorschlag"),
+            ("neue", "Vorschlag"),
+            ("Gesetze", "B2"),
+        ]
+        assert [call.kwargs["deps"].source for call in svc.proposal_agent.run.await_args_list] == ["3", "neue"]
+        assert (stats.single_calls, stats.calls_saved) == (2, 0)
+
+    def test_failed_batch_call_falls_back_for_every_item(self) -> None:
+        svc = make_service(self.DETECTIONS, advisor_proposal_batch_size=8)
+        svc.batch_proposal_agent.run.side_effect = RuntimeError("invalid output")
+        stats = ProposalStats()
+        results = asyncio.run(svc._process_batch(TextIndex.from_text(TEXT), [RULE], {RULE.name: RULE}, stats))
+        assert len(results) == 3
+        assert svc.proposal_agent.run.await_count == 3
+        assert stats.calls_saved == -1
+        assert stats.prompt_tokens_saved < 0
+
+    def test_rules_sent_once_per_batch(self) -> None:
+        svc = make_service(self.DETECTIONS, advisor_proposal_batch_size=8)
+        asyncio.run(svc._process_batch(TextIndex.from_text(TEXT), [RULE], {RULE.name: RULE}))
+        deps = svc.batch_proposal_agent.run.await_args.kwargs["deps"]
+        assert [rule.name for rule in deps.rules] == [RULE.name]
+        assert [item.id for item in deps.items] == [0, 1, 2]
+
+
+class TestProposalCache:
+    REPEATED = "Es gibt 3 Hunde und 3 Katzen."
+
+    def run(self, svc: AdvisorService, text: str, rules: list[Rule] | None = None) -> tuple[list[Any], ProposalStats]:
+        rules = rules or [RULE]
+        stats = ProposalStats()
+        lookup = {rule.name: rule for rule in rules}
+        results = asyncio.run(svc._process_batch(TextIndex.from_text(text), rules, lookup, stats))
+        return results, stats
+
+    def test_identical_snippets_in_one_group_share_a_call(self) -> None:
+        svc = make_service([DETECTION, DETECTION], advisor_proposal_batch_size=8)
+        results, stats = self.run(svc, self.REPEATED)
+        assert [(r.range.start, r.proposal) for r in results] == [(8, "Vorschlag"), (20, "Vorschlag")]
+        assert svc.proposal_agent.run.await_count == 1
+        assert svc.batch_proposal_agent.run.await_count == 0
+        assert stats.deduplicated == 1
+
+    def test_identical_snippet_in_flight_is_joined(self) -> None:
+        svc = make_service([DETECTION, DETECTION], advisor_proposal_batch_size=1)
+        results, stats = self.run(svc, self.REPEATED)
+        assert [r.proposal for r in results] == ["Vorschlag", "Vorschlag"]
+        assert svc.proposal_agent.run.await_count == 1
+        assert (stats.deduplicated, stats.single_calls) == (1, 1)
+        assert svc._proposals_in_flight == {}
+
+    def test_cancelled_owner_does_not_fail_the_joined_group(self) -> None:
+        svc = make_service([])
+        request = ProposalRequest(rule=RULE, source="3", reason="r", context_sentence=TEXT)
+        calls: list[int] = []
+
+        async def propose(prompt: None, deps: ProposalRequest) -> str:
+            calls.append(len(calls))
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+            return "Vorschlag"
+
+        svc.proposal_agent.run.side_effect = propose
+
+        async def scenario() -> list[str | BaseException]:
+            owner = asyncio.ensure_future(svc._propose_group([request], ProposalStats()))
+            await asyncio.sleep(0)
+            joined = asyncio.ensure_future(svc._propose_group([request, request], ProposalStats()))
+            await asyncio.sleep(0.01)
+            owner.cancel()
+            return await joined
+
+        assert asyncio.run(scenario()) == ["Vorschlag", "Vorschlag"]
+        assert calls == [0, 1]
+        assert svc._proposals_in_flight == {}
+
+    def test_served_across_requests(self) -> None:
+        svc = make_service([DETECTION])
+        self.run(svc, TEXT)
+        results, stats = self.run(svc, "Neuer Absatz davor.\n\n" + TEXT)
+        assert [r.proposal for r in results] == ["Vorschlag"]
+        assert svc.proposal_agent.run.await_count == 1
+        assert stats.cache_hits == 1
+        assert svc.proposal_cache.stats()["hit_rate"] == 0.5
+
+    def test_other_context_sentence_misses(self) -> None:
+        svc = make_service([DETECTION])
+        self.run(svc, TEXT)
+        self.run(svc, "Die Zeitung berichtete über 3 alte Gesetze.")
+        assert svc.proposal_agent.run.await_count == 2
+
+    def test_changed_rule_content_misses(self) -> None:
+        svc = make_service([DETECTION])
+        self.run(svc, TEXT)
+        self.run(svc, TEXT + " ", rules=[make_rule(RULE.name, description="geändert")])
+        assert svc.proposal_agent.run.await_count == 2
+
+    def test_failed_proposal_is_not_cached(self) -> None:
+        svc = make_service([DETECTION])
+        svc.proposal_agent.run.side_effect = [RuntimeError("down"), "Vorschlag"]
+        assert self.run(svc, TEXT)[0] == []
+        assert [r.proposal for r in self.run(svc, TEXT + " ")[0]] == ["Vorschlag"]
+        assert svc.proposal_agent.run.await_count == 2
+
+
+class TestAllOccurrences:
+    TEXT = "Das Meeting beginnt um neun. Nach dem Meeting gibt es Kaffee. Viele Meetings dauern zu lange."
+    RULE = make_rule("Anglizismen", all_occurrences=True)
+    MEETING = DetectionViolation(rule_name="Anglizismen", reason="Anglizismus", source="Meeting")
+
+    def run(
+        self, svc: AdvisorService, text: str = TEXT, rule: Rule = RULE
+    ) -> tuple[list[tuple[int, str, str]], ProposalStats]:
+        stats = ProposalStats()
+        results = asyncio.run(svc._process_batch(TextIndex.from_text(text), [rule], {rule.name: rule}, stats))
+        return [(r.range.start, r.source, r.proposal) for r in results], stats
+
+    def test_snippet_expanded_to_every_whole_word(self) -> None:
+        svc = make_service([self.MEETING], advisor_proposal_batch_size=8)
+        results, _ = self.run(svc)
+        assert [(start, source) for start, source, _ in results] == [(4, "Meeting"), (38, "Meeting")]
+
+    def test_each_occurrence_is_asked_with_its_own_sentence(self) -> None:
+        svc = make_service([self.MEETING], advisor_proposal_batch_size=8)
+        self.run(svc)
+        items = svc.batch_proposal_agent.run.await_args.kwargs["deps"].items
+        assert [item.context_sentence for item in items] == [
+            "Das Meeting beginnt um neun.",
+            " Nach dem Meeting gibt es Kaffee.",
+        ]
+
+    def test_occurrences_in_one_sentence_share_the_call(self) -> None:
+        svc = make_service([self.MEETING], advisor_proposal_batch_size=1)
+        results, stats = self.run(svc, text="Das Meeting vor dem Meeting.")
+        assert [start for start, _, _ in results] == [4, 20]
+        assert svc.proposal_agent.run.await_count == 1
+        assert stats.deduplicated == 1
+
+    def test_off_by_default(self) -> None:
+        svc = make_service([self.MEETING])
+        results, _ = self.run(svc, rule=make_rule("Anglizismen"))
+        assert [start for start, _, _ in results] == [4]
+
+    def test_reported_occurrences_are_not_duplicated(self) -> None:
+        plural = self.MEETING.model_copy(update={"source": "Meetings"})
+        svc = make_service([self.MEETING, self.MEETING, plural], advisor_proposal_batch_size=8)
+        results, _ = self.run(svc)
+        assert [(start, source) for start, source, _ in results] == [(4, "Meeting"), (38, "Meeting"), (68, "Meetings")]
+
+    def test_only_verbatim_snippets_are_expanded(self) -> None:
+        lowered = self.MEETING.model_copy(update={"source": "meeting"})
+        svc = make_service([lowered])
+        results, _ = self.run(svc)
+        assert [start for start, _, _ in results] == [4]
+
+    def test_word_fragment_expanded_inside_words(self) -> None:
+        eszett = DetectionViolation(rule_name="Anglizismen", reason="r", source="ß")
+        svc = make_service([eszett])
+        results, _ = self.run(svc, text="Die Straße ist groß. Der Fuß tut weh.")
+        assert [(start, source) for start, source, _ in results] == [(8, "ß"), (18, "ß"), (27, "ß")]
+
+    def test_reserved_context_is_not_expanded_into(self) -> None:
+        svc = make_service([self.MEETING])
+        index = TextIndex.from_text(self.TEXT)
+        findings, _ = asyncio.run(
+            svc._detect_and_propose(index, [self.RULE], {self.RULE.name: self.RULE}, reserved=[(29, 62)])
+        )
+        assert [resolved.range.start for resolved, _ in findings] == [4]
+
+    def test_fast_path_copies_ask_with_their_own_sentence(self) -> None:
+        combined = CombinedViolation(rule_name="Anglizismen", reason="r", source="Meeting", proposal="Sitzung")
+        svc = make_service([], advisor_fast_path_max_chars=200, advisor_fast_path_max_rules=2)
+        svc.combined_agent = FakeDetectionAgent(lambda text, deps: CombinedResult(violations=[combined]))
+        results, _ = self.run(svc)
+        assert results == [(4, "Meeting", "Sitzung"), (38, "Meeting", "Vorschlag")]
+        assert [call.kwargs["deps"].context_sentence for call in svc.proposal_agent.run.await_args_list] == [
+            " Nach dem Meeting gibt es Kaffee."
+        ]
+
+
+class TestFastPath:
+    COMBINED = CombinedViolation(rule_name=RULE.name, reason="Zahl ausschreiben", source="3", proposal="drei")
+
+    def make(self, violations: list[CombinedViolation], **config: Any) -> AdvisorService:
+        svc = make_service([DETECTION], advisor_fast_path_max_chars=200, advisor_fast_path_max_rules=2, **config)
+        svc.combined_agent = FakeDetectionAgent(lambda text, deps: CombinedResult(violations=violations))
+        return svc
+
+    def run(
+        self, svc: AdvisorService, text: str = TEXT, rules: list[Rule] | None = None
+    ) -> tuple[list[Any], ProposalStats]:
+        rules = rules or [RULE]
+        stats = ProposalStats()
+        lookup = {rule.name: rule for rule in rules}
+        return asyncio.run(svc._process_batch(TextIndex.from_text(text), rules, lookup, stats)), stats
+
+    def test_short_text_answered_by_one_call(self) -> None:
+        svc = self.make([self.COMBINED])
+        results, stats = self.run(svc)
+        assert [(r.source, r.proposal, r.range.start) for r in results] == [("3", "drei", 28)]
+        assert len(svc.combined_agent.calls) == 1
+        assert svc.detection_agent.calls == []
+        assert svc.proposal_agent.run.await_count == 0
+        assert stats.combined_calls == 1
+
+    def test_long_text_takes_two_stages(self) -> None:
+        svc = self.make([self.COMBINED])
+        results, stats = self.run(svc, text=TEXT + " " + "x" * 200)
+        assert [r.proposal for r in results] == ["Vorschlag"]
+        assert svc.combined_agent.calls == []
+        assert stats.combined_calls == 0
+
+    def test_large_batch_takes_two_stages(self) -> None:
+        svc = self.make([self.COMBINED])
+        self.run(svc, rules=[RULE, make_rule("Guillemets"), make_rule("Eszett")])
+        assert svc.combined_agent.calls == []
+        assert len(svc.detection_agent.calls) == 1
+
+    def test_ensemble_takes_two_stages(self) -> None:
+        svc = self.make([self.COMBINED], advisor_ensemble_k_semantic=3)
+        self.run(svc)
+        assert svc.combined_agent.calls == []
+
+    def test_missing_proposal_falls_back_to_proposal_call(self) -> None:
+        blank = CombinedViolation(rule_name=RULE.name, reason="r", source="neue", proposal=" ")
+        svc = self.make([self.COMBINED, blank])
+        results, _ = self.run(svc)
+        assert [(r.source, r.proposal) for r in results] == [("3", "drei"), ("neue", "Vorschlag")]
+        assert [call.kwargs["deps"].source for call in svc.proposal_agent.run.await_args_list] == ["neue"]
+
+    def test_result_cached_apart_from_detection(self) -> None:
+        svc = self.make([self.COMBINED])
+        self.run(svc)
+        results, _ = self.run(svc)
+        assert [r.proposal for r in results] == ["drei"]
+        assert len(svc.combined_agent.calls) == 1
+        assert svc._detection_cache_key(TEXT, [RULE]) not in svc.detection_cache._entries
+
+
+class TestPrefilter:
+    DIGIT_RULE = make_rule("Kurze Zahlen").model_copy(update={"checker": CheckerSpec(pattern=r"\d")})
+    OTHER_RULE = make_rule("Floskeln")
+
+    @staticmethod
+    def sent_rules(text: str, **config: Any) -> tuple[list[str], list[RulesValidationContainer]]:
+        sent: list[str] = []
+
+        def detect(text: str, deps: RulesContainer) -> DetectionResult:
+            sent.extend(rule.name for rule in deps.rules)
+            return DetectionResult(violations=[])
+
+        svc = make_service([], rules=[TestPrefilter.DIGIT_RULE, TestPrefilter.OTHER_RULE], **config)
+        svc.detection_agent = FakeDetectionAgent(detect)
+        return sent, stream(svc, text)
+
+    def test_rule_without_trigger_in_text_is_not_sent(self) -> None:
+        sent, containers = self.sent_rules("Die Zeitung berichtete über neue Gesetze.")
+        assert sent == ["Floskeln"]
+        assert containers[0].checked == 1
+        assert containers[-1].checked == containers[-1].total == 2
+
+    def test_rule_with_trigger_in_text_is_sent(self) -> None:
+        sent, _ = self.sent_rules(TEXT)
+        assert sorted(sent) == ["Floskeln", "Kurze Zahlen"]
+
+    def test_prefilter_can_be_disabled(self) -> None:
+        sent, _ = self.sent_rules("Keine Zahlen hier.", advisor_prefilter="off")
+        assert sorted(sent) == ["Floskeln", "Kurze Zahlen"]
+
+    def test_rules_below_cut_off_are_reported_not_sent(self) -> None:
+        sent, containers = self.sent_rules(TEXT, advisor_max_llm_rules=1)
+        assert len(sent) == 1
+        assert all(c.ranked_out == 1 and c.rule_limit == 1 and c.total == 1 for c in containers)
+        assert containers[-1].checked == 1
+
+
+class TestEnsembleDetection:
+    NUMBER = DetectionViolation(rule_name=RULE.name, reason="r", source="3")
+    LAWS = DetectionViolation(rule_name=RULE.name, reason="r", source="Gesetze")
+
+    @staticmethod
+    def make(per_sample: list[list[DetectionViolation]], **config: Any) -> tuple[AdvisorService, list[list[str]]]:
+        """Service whose n-th detection call returns ``per_sample[n]``; also returns the rule order of each call."""
+        orders: list[list[str]] = []
+
+        def detect(text: str, deps: RulesContainer) -> DetectionResult:
+            orders.append([rule.name for rule in deps.rules])
+            return DetectionResult(violations=per_sample[len(orders) - 1])
+
+        svc = make_service([], **{"advisor_ensemble_k_semantic": len(per_sample), **config})
+        svc.detection_agent = FakeDetectionAgent(detect)
+        return svc, orders
+
+    def test_single_sample_is_the_plain_call(self) -> None:
+        svc, _ = self.make([[self.NUMBER]])
+        assert [r.source for r in process(svc)] == ["3"]
+        assert svc.detection_agent.kwargs == [{}]
+
+    def test_samples_run_shuffled_with_temperature(self) -> None:
+        rules = [make_rule(name) for name in "abcdefgh"]
+        svc, orders = self.make([[], [], []], advisor_detection_temperature=0.5)
+        process(svc, rules=rules)
+        assert len(orders) == 3
+        assert all(sorted(order) == list("abcdefgh") for order in orders)
+        assert len({tuple(order) for order in orders}) > 1
+        assert svc.detection_agent.kwargs == [{"model_settings": {"temperature": 0.5}}] * 3
+
+    def test_findings_below_agreement_are_rejected(self) -> None:
+        # 0.6 of 3 samples needs 2 votes: "3" gets 3, "Gesetze" only 1.
+        svc, _ = self.make([[self.NUMBER, self.LAWS], [self.NUMBER], [self.NUMBER]])
+        results = process(svc)
+        assert [r.source for r in results] == ["3"]
+        assert svc.proposal_agent.run.await_count == 1
+
+    def test_agreement_threshold_is_per_kind(self) -> None:
+        svc, _ = self.make(
+            [[self.NUMBER, self.LAWS], [self.NUMBER], [self.NUMBER]], advisor_accept_agreement_semantic=0.3
+        )
+        assert sorted(r.source for r in process(svc)) == ["3", "Gesetze"]
+
+    def test_samples_are_cached_separately(self) -> None:
+        svc, orders = self.make([[self.NUMBER], [self.NUMBER]])
+        process(svc)
+        assert [r.source for r in process(svc)] == ["3"]
+        assert len(orders) == 2
+
+    def test_failed_sample_does_not_stop_the_others(self) -> None:
+        calls: list[str] = []
+
+        def detect(text: str, deps: RulesContainer) -> DetectionResult:
+            calls.append(text)
+            if len(calls) == 1:
+                raise RuntimeError("sample broke")
+            return DetectionResult(violations=[self.NUMBER])
+
+        svc = make_service([], advisor_ensemble_k_semantic=3, advisor_accept_agreement_semantic=0.5)
+        svc.detection_agent = FakeDetectionAgent(detect)
+        results, complete = asyncio.run(svc._detect_and_propose(TextIndex.from_text(TEXT), [RULE], {RULE.name: RULE}))
+        assert [detection.source for detection, _ in results] == ["3"]
+        assert not complete
+
+
+class TestVerification:
+    NUMBER = DetectionViolation(rule_name=RULE.name, reason="r", source="3")
+    LAWS = DetectionViolation(rule_name=RULE.name, reason="r", source="Gesetze")
+    NEWS = DetectionViolation(rule_name=RULE.name, reason="r", source="neue")
+
+    def make(self, verdicts: dict[str, bool | Exception | None]) -> AdvisorService:
+        # 0.6 of 3 samples needs 2 votes: "3" is accepted, "Gesetze" and "neue" have one vote each.
+        svc, _ = TestEnsembleDetection.make(
+            [[self.NUMBER, self.LAWS], [self.NUMBER, self.NEWS], [self.NUMBER]], advisor_verify_low_agreement=True
+        )
+
+        async def verify(prompt: None, deps: ProposalRequest) -> VerificationResult:
+            verdict = verdicts[deps.source]
+            if verdict is None:
+                await asyncio.Event().wait()
+            if isinstance(verdict, Exception):
+                raise verdict
+            return VerificationResult(violated=verdict)
+
+        svc.verification_agent.run.side_effect = verify
+        return svc
+
+    def run(self, svc: AdvisorService) -> tuple[list[str], bool]:
+        findings, complete = asyncio.run(svc._detect_and_propose(TextIndex.from_text(TEXT), [RULE], {RULE.name: RULE}))
+        return [detection.source for detection, _ in findings], complete
+
+    def test_only_confirmed_candidates_get_proposals(self) -> None:
+        svc = self.make({"Gesetze": True, "neue": False})
+        sources, complete = self.run(svc)
+        assert sources == ["3", "Gesetze"]
+        assert complete
+        assert svc.proposal_agent.run.await_count == 2
+
+    def test_candidates_checked_with_rule_and_sentence(self) -> None:
+        svc = self.make({"Gesetze": False, "neue": False})
+        self.run(svc)
+        requests = [call.kwargs["deps"] for call in svc.verification_agent.run.await_args_list]
+        assert sorted(request.source for request in requests) == ["Gesetze", "neue"]
+        assert all(request.rule == RULE and request.context_sentence == TEXT for request in requests)
+
+    def test_failed_check_drops_candidate_and_marks_incomplete(self) -> None:
+        svc = self.make({"Gesetze": RuntimeError("down"), "neue": True})
+        sources, complete = self.run(svc)
+        assert sources == ["3", "neue"]
+        assert not complete
+
+    def test_slow_check_drops_candidate_and_marks_incomplete(self) -> None:
+        svc = self.make({"Gesetze": None, "neue": True})
+        with patch("text_mate_backend.services.advisor.VERIFICATION_TIMEOUT_SECONDS", 0.01):
+            sources, complete = self.run(svc)
+        assert sources == ["3", "neue"]
+        assert not complete
+
+    def test_disabled_without_ensemble(self) -> None:
+        svc = make_service([self.LAWS], advisor_verify_low_agreement=True)
+        process(svc)
+        assert svc.verification_agent.run.await_count == 0
+
+
+class TestCellDeadlines:
+    @staticmethod
+    def trained(svc: AdvisorService, seconds: float) -> AdvisorService:
+        for _ in range(svc.cell_latency["document"].min_samples):
+            svc.cell_latency["document"].record(seconds)
+        return svc
+
+    def test_static_timeout_until_latencies_are_known(self) -> None:
+        svc = make_service([], advisor_hedge=True)
+        assert svc._cell_timing("document") == (BATCH_TIMEOUT_SECONDS, None)
+
+    def test_deadline_follows_p95_within_bounds(self) -> None:
+        svc = self.trained(make_service([]), 20.0)
+        assert svc._cell_timing("document") == (60.0, None)
+        svc.config.advisor_cell_min_deadline_seconds = 90
+        assert svc._cell_timing("document")[0] == 90
+        svc.config.advisor_cell_deadline_factor = 100
+        assert svc._cell_timing("document")[0] == BATCH_TIMEOUT_SECONDS
+        assert svc._cell_timing("window") == (BATCH_TIMEOUT_SECONDS, None)
+
+    def test_hedge_after_p95(self) -> None:
+        svc = self.trained(make_service([], advisor_hedge=True), 20.0)
+        assert svc._cell_timing("document") == (60.0, 20.0)
+
+    @staticmethod
+    def scheduled(scheduler: LlmScheduler, seconds: float = 0) -> Callable[..., AsyncIterator[DetectionResult]]:
+        """Detection stub holding a detection slot of ``scheduler`` for ``seconds``; reports DETECTION."""
+
+        async def detect(text: str, deps: RulesContainer, **kwargs: Any) -> AsyncIterator[DetectionResult]:
+            async with scheduler.slot(LlmPriority.ADVISOR_DETECTION):
+                await asyncio.sleep(seconds)
+                yield DetectionResult(violations=[DETECTION])
+
+        return detect
+
+    def test_timed_out_cell_is_reported_as_skipped(self) -> None:
+        svc = self.trained(make_service([DETECTION], rules=[RULE], advisor_cell_min_deadline_seconds=0), 0.01)
+        svc.detection_agent.run_stream_output = self.scheduled(LlmScheduler(1), seconds=10)
+        [container] = stream(svc, TEXT)
+        assert container.skipped == 1
+        assert (container.cells_checked, container.cells_total) == (1, 1)
+        assert (container.checked, container.total) == (0, 1)
+        assert container.violations == []
+
+    def test_queue_wait_does_not_count_against_the_deadline(self) -> None:
+        svc = self.trained(make_service([DETECTION], rules=[RULE], advisor_cell_min_deadline_seconds=0), 0.01)
+        scheduler = LlmScheduler(1)
+        svc.detection_agent.run_stream_output = self.scheduled(scheduler)
+
+        async def scenario() -> list[RulesValidationContainer]:
+            async with scheduler.slot(LlmPriority.INTERACTIVE):
+                check = asyncio.ensure_future(
+                    asyncio.wait_for(collect_stream(svc, TEXT), timeout=5),
+                )
+                # Queued far beyond the 30 ms deadline.
+                await asyncio.sleep(0.2)
+            return await check
+
+        [container] = asyncio.run(scenario())
+        assert (container.skipped, len(container.violations)) == (0, 1)
+        latencies = svc.cell_latency["document"]
+        assert len(latencies) == latencies.min_samples + 1
+        assert latencies._durations[-1] < 0.2
+
+    def test_cells_answered_from_cache_are_not_recorded(self) -> None:
+        svc = make_service([DETECTION], rules=[RULE])
+        svc.detection_agent.run_stream_output = self.scheduled(LlmScheduler(1))
+        stream(svc, TEXT)
+        [container] = stream(svc, TEXT)
+        assert len(container.violations) == 1
+        assert len(svc.cell_latency["document"]) == 1
+
+
+class TestHedging:
+    @staticmethod
+    def run(work: Callable[[], Any], hedge_after: float | None) -> tuple[Any, CellStats]:
+        stats = CellStats()
+        result = asyncio.run(AdvisorService._hedged(work, hedge_after, stats))
+        return result, stats
+
+    def test_fast_call_is_not_hedged(self) -> None:
+        async def work() -> list[str]:
+            return ["fertig"]
+
+        assert self.run(work, 1.0) == (["fertig"], CellStats())
+
+    def test_delay_starts_when_admitted(self) -> None:
+        async def scenario(admit: bool) -> CellStats:
+            admitted = asyncio.Event()
+            if admit:
+                admitted.set()
+
+            async def work() -> list[str]:
+                await asyncio.sleep(0.1)
+                return ["fertig"]
+
+            stats = CellStats()
+            await AdvisorService._hedged(work, 0.01, stats, admitted)
+            return stats
+
+        assert asyncio.run(scenario(admit=False)).hedged == 0
+        assert asyncio.run(scenario(admit=True)).hedged == 1
+
+    def test_duplicate_wins_and_slow_call_is_cancelled(self) -> None:
+        calls: list[int] = []
+        cancelled: list[int] = []
+
+        async def work() -> list[str]:
+            call = len(calls)
+            calls.append(call)
+            try:
+                await asyncio.sleep(10 if call == 0 else 0)
+            except asyncio.CancelledError:
+                cancelled.append(call)
+                raise
+            return [f"call {call}"]
+
+        result, stats = self.run(work, 0.01)
+        assert result == ["call 1"]
+        assert cancelled == [0]
+        assert (stats.hedged, stats.hedge_wins) == (1, 1)
+
+    def test_failing_duplicate_leaves_the_original(self) -> None:
+        calls: list[int] = []
+
+        async def work() -> list[str]:
+            call = len(calls)
+            calls.append(call)
+            if call == 1:
+                raise RuntimeError("duplicate broke")
+            await asyncio.sleep(0.05)
+            return ["original"]
+
+        result, stats = self.run(work, 0.01)
+        assert result == ["original"]
+        assert (stats.hedged, stats.hedge_wins) == (1, 0)
+
+    def test_error_raised_when_every_call_fails(self) -> None:
+        async def work() -> list[str]:
+            raise RuntimeError("down")
+
+        with pytest.raises(RuntimeError):
+            self.run(work, None)
+
+
+class TestEventStream:
+    WINDOW_RULE = make_rule("Zahlen im Absatz", scope="window")
+
+    @staticmethod
+    def events(svc: AdvisorService, text: str = TEXT) -> list[Any]:
+        async def collect() -> list[Any]:
+            return [event async for event in svc.check_text_events(text, {"bundeskanzlei"})]
+
+        return asyncio.run(collect())
+
+    def test_violations_before_progress_and_done_last(self) -> None:
+        svc = make_service([DETECTION], rules=[RULE])
+        events = self.events(svc)
+        assert [type(e) for e in events] == [ViolationEvent, ProgressEvent, DoneEvent]
+        assert [e.seq for e in events] == [0, 1, 2]
+        assert events[0].violation.source == "3"
+        assert (events[1].stage, events[1].cells_checked, events[1].cells_total) == ("detection", 1, 1)
+        done = events[-1]
+        assert (done.checked, done.total, done.violations, done.skipped) == (1, 1, 1, 0)
+        assert set(done.timings_ms) == {"first_violation", "total"}
+
+    def test_identical_concurrent_checks_share_one_run(self) -> None:
+        svc = make_service([DETECTION], rules=[RULE])
+
+        async def collect() -> list[list[Any]]:
+            async def one() -> list[Any]:
+                return [event async for event in svc.check_text_events(TEXT, {"bundeskanzlei"})]
+
+            return await asyncio.gather(one(), one())
+
+        first, second = asyncio.run(collect())
+        assert first == second
+        assert [type(e) for e in first] == [ViolationEvent, ProgressEvent, DoneEvent]
+        assert len(svc.detection_agent.calls) == 1
+        assert (svc.flights.leaders, svc.flights.coalesced) == (1, 1)
+
+    def test_violation_sent_before_its_cell_completes(self) -> None:
+        seen = asyncio.Event()
+
+        class BlockingAgent(FakeDetectionAgent):
+            async def run_stream_output(
+                self, text: str, deps: RulesContainer, **kwargs: Any
+            ) -> AsyncIterator[DetectionResult]:
+                second = DETECTION.model_copy(update={"source": "neue"})
+                yield DetectionResult(violations=[DETECTION])
+                yield DetectionResult(violations=[DETECTION, second])
+                await asyncio.wait_for(seen.wait(), timeout=1)
+                yield DetectionResult(violations=[DETECTION, second])
+
+        svc = make_service([], rules=[RULE])
+        svc.detection_agent = BlockingAgent(lambda text, deps: DetectionResult(violations=[]))
+
+        async def collect() -> list[Any]:
+            events = []
+            async for event in svc.check_text_events(TEXT, {"bundeskanzlei"}):
+                if isinstance(event, ViolationEvent):
+                    seen.set()
+                events.append(event)
+            return events
+
+        events = asyncio.run(collect())
+        assert [type(e) for e in events] == [ViolationEvent, ViolationEvent, ProgressEvent, DoneEvent]
+
+    def test_cached_and_window_findings_are_events(self) -> None:
+        svc = make_service([], rules=[self.WINDOW_RULE])
+        svc.detection_agent.detect = detect_digits
+        text = "Eins 1.\n\nZwei 2."
+        self.events(svc, text)
+        events = self.events(svc, text.replace("Zwei", "Drei"))
+        assert [(type(e), getattr(e, "stage", None)) for e in events] == [
+            (ViolationEvent, None),
+            (ProgressEvent, "prefilter"),
+            (ViolationEvent, None),
+            (ProgressEvent, "detection"),
+            (DoneEvent, None),
+        ]
+        assert [e.violation.range.start for e in events if isinstance(e, ViolationEvent)] == [5, 14]
+
+    def test_containers_fold_the_events(self) -> None:
+        svc = make_service([DETECTION], rules=[RULE])
+        [container] = stream(svc, TEXT)
+        assert [v.source for v in container.violations] == ["3"]
+        assert (container.checked, container.total, container.cells_checked) == (1, 1, 1)
+
+    def test_no_rules(self) -> None:
+        events = self.events(make_service([]))
+        assert [type(e) for e in events] == [ProgressEvent, DoneEvent]
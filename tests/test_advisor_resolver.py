@@ -5,12 +5,28 @@ instantiated via ``__new__`` to bypass ``__init__`` (which loads rules files and
 builds agents) — the methods under test use no instance state.
 """
 
+import asyncio
+from typing import Any
+
 from text_mate_backend.models.rule_models import DetectionViolation, ResolvedDetection, Rule, ViolationRange
 from text_mate_backend.services.advisor import AdvisorService
+from text_mate_backend.services.span_resolver import SpanResolver, find_source, find_source_first
+from text_mate_backend.utils.interval_index import IntervalIndex
+from text_mate_backend.utils.text_index import TextIndex, normalize_whitespace
 
 
 def make_service() -> AdvisorService:
-    return AdvisorService.__new__(AdvisorService)
+    svc = AdvisorService.__new__(AdvisorService)
+    svc.span_resolver = SpanResolver(workers=0)
+    return svc
+
+
+def resolve(svc: AdvisorService, *args: Any, **kwargs: Any) -> ResolvedDetection | None:
+    return asyncio.run(svc._resolve_detection(*args, **kwargs))
+
+
+def resolve_all(svc: AdvisorService, *args: Any) -> list[ResolvedDetection]:
+    return asyncio.run(svc._resolve_and_dedup(*args))
 
 
 def rule_lookup(rule_name: str) -> dict[str, Rule]:
@@ -28,69 +44,91 @@ def rule_lookup(rule_name: str) -> dict[str, Rule]:
 
 class TestFindSource:
     def test_exact_match_returns_first_occurrence(self) -> None:
-        svc = make_service()
         text = "Die Uhrzeit 9:30 ist falsch. Auch 9:30 ist falsch."
-        pos, length = svc._find_source("9:30", text)
+        pos, length = find_source("9:30", TextIndex.from_text(text))
         assert text[pos : pos + length] == "9:30"
         assert pos == text.find("9:30")
 
     def test_case_insensitive_match(self) -> None:
-        svc = make_service()
         text = "Das Wort Beispiel steht hier."
-        pos, length = svc._find_source("BEISPIEL", text)
+        pos, length = find_source("BEISPIEL", TextIndex.from_text(text))
         assert text[pos : pos + length].lower() == "beispiel"
 
     def test_not_found_returns_none(self) -> None:
-        svc = make_service()
-        assert svc._find_source("kommt nicht vor", "Ein kurzer Text.") is None
+        assert find_source("kommt nicht vor", TextIndex.from_text("Ein kurzer Text.")) is None
 
     def test_empty_consumed_equivalent_to_none(self) -> None:
-        svc = make_service()
-        text = "zweimal 9:30 und nochmal 9:30."
-        assert svc._find_source("9:30", text, consumed=[]) == svc._find_source("9:30", text, consumed=None)
+        index = TextIndex.from_text("zweimal 9:30 und nochmal 9:30.")
+        assert find_source("9:30", index, consumed=IntervalIndex()) == find_source("9:30", index, consumed=None)
 
     def test_consumed_skips_to_next_occurrence(self) -> None:
-        svc = make_service()
         text = "Die Anhörung beginnt um 9:30 Uhr. Die zweite Sitzung beginnt um 9:30 Uhr am folgenden Tag."
         first = text.find("9:30")
         second = text.find("9:30", first + 1)
 
         # With the first occurrence consumed, the second is returned.
-        pos, length = svc._find_source("9:30", text, consumed=[(first, first + 4)])
+        pos, length = find_source("9:30", TextIndex.from_text(text), consumed=IntervalIndex([(first, first + 4)]))
         assert pos == second
         assert length == 4
         assert text[pos : pos + length] == "9:30"
 
     def test_consumed_two_occurrences_yields_third(self) -> None:
-        svc = make_service()
         text = "a a a"
         first = text.find("a")
         second = text.find("a", first + 1)
         third = text.find("a", second + 1)
 
-        pos, _ = svc._find_source("a", text, consumed=[(first, first + 1), (second, second + 1)])
+        pos, _ = find_source(
+            "a", TextIndex.from_text(text), consumed=IntervalIndex([(first, first + 1), (second, second + 1)])
+        )
         assert pos == third
 
     def test_consumed_all_returns_last_matchable(self) -> None:
-        svc = make_service()
         text = "nur einmal kommt das wort vor"
         only = text.find("wort")
         # Every occurrence consumed — must not loop forever and returns a position.
-        pos, _ = svc._find_source("wort", text, consumed=[(only, only + 4)])
+        pos, _ = find_source("wort", TextIndex.from_text(text), consumed=IntervalIndex([(only, only + 4)]))
         assert pos == only
 
+    def test_fuzzy_match_with_differing_first_character(self) -> None:
+        text = "Wir haben Ihr Gesuch um Verlängerung der Frist erhalten."
+        pos, length = find_source("Xesuch um Verlängerung", TextIndex.from_text(text))
+        assert text[pos : pos + length] == "Gesuch um Verlängerung"
+
+    def test_consumed_skips_to_next_fuzzy_occurrence(self) -> None:
+        text = "Die Frist ist abgelaufen. Leider: die Frist ist abgelaufen."
+        second = text.find("die")
+        index = TextIndex.from_text(text)
+        source = "die Frist ist abgelaufn"  # misspelt: only the fuzzy path finds it
+
+        pos, length = find_source(source, index)
+        assert pos == 0
+        pos, _ = find_source(source, index, consumed=IntervalIndex([(pos, pos + length)]))
+        assert pos == second
+
+    def test_consumed_skips_to_next_normalized_occurrence(self) -> None:
+        text = "neun  Uhr und neun   Uhr"
+        second = text.find("neun", 1)
+        pos, _ = find_source("neun Uhr", TextIndex.from_text(text), consumed=IntervalIndex([(0, 9)]))
+        assert pos == second
+
+    def test_consumed_deterministic_match_is_not_fuzzy_matched_elsewhere(self) -> None:
+        text = "Die Sitzung findet am Montag statt. Danach folgt Kaffee. Die Sitzung findet am Montag nicht statt."
+        source = "Die Sitzung findet am Montag statt"
+        pos, _ = find_source(source, TextIndex.from_text(text), consumed=IntervalIndex([(0, len(source))]))
+        assert pos == 0
+
 
 class TestWhitespaceNormalizedSpan:
     def test_collapsed_whitespace_span_reflects_original(self) -> None:
-        svc = make_service()
         # Source has a single space; the text has a double space. The exact and
         # case-insensitive finds miss, so the normalized path is used. The span
         # should cover the full double-space region in the original text.
         text = "xx  yy"
-        normalized_text = svc._normalize_whitespace(text)
+        normalized_text = normalize_whitespace(text)
         assert normalized_text == "xx yy"  # sanity: double space collapsed
 
-        found = svc._find_source_first("xx yy", text, 0)
+        found = find_source_first("xx yy", TextIndex.from_text(text), 0)
         assert found is not None
         pos, length = found
         assert pos == 0
@@ -107,12 +145,14 @@ class TestResolveDetection:
         second = text.find("9:30", first + 1)
 
         v1 = DetectionViolation(rule_name=rule_name, reason="Punkt statt Schreibweise", source="9:30")
-        r1 = svc._resolve_detection(v1, text, lookup, consumed_ranges=None)
+        r1 = resolve(svc, v1, TextIndex.from_text(text), lookup, consumed_ranges=None)
         assert r1 is not None
         assert r1.range.start == first
 
         # Second resolution sees the first range as consumed.
-        r2 = svc._resolve_detection(v1, text, lookup, consumed_ranges=[(r1.range.start, r1.range.end)])
+        r2 = resolve(
+            svc, v1, TextIndex.from_text(text), lookup, consumed_ranges=IntervalIndex([(r1.range.start, r1.range.end)])
+        )
         assert r2 is not None
         assert r2.range.start == second
         assert r2.range.start != r1.range.start
@@ -121,13 +161,13 @@ class TestResolveDetection:
         svc = make_service()
         lookup = rule_lookup("x")
         v = DetectionViolation(rule_name="x", reason="r", source="gibt es nicht im text")
-        assert svc._resolve_detection(v, "völlig anderer inhalt", lookup) is None
+        assert resolve(svc, v, TextIndex.from_text("völlig anderer inhalt"), lookup) is None
 
     def test_empty_source_returns_none(self) -> None:
         svc = make_service()
         lookup = rule_lookup("x")
         v = DetectionViolation(rule_name="x", reason="r", source="   ")
-        assert svc._resolve_detection(v, "irgendein text", lookup) is None
+        assert resolve(svc, v, TextIndex.from_text("irgendein text"), lookup) is None
 
 
 class TestResolveAndDedup:
@@ -142,7 +182,7 @@ class TestResolveAndDedup:
             DetectionViolation(rule_name=rule_name, reason="Punkt statt Schreibweise", source="9:30"),
             DetectionViolation(rule_name=rule_name, reason="Punkt statt Schreibweise", source="9:30"),
         ]
-        survivors = svc._resolve_and_dedup(violations, text, lookup)
+        survivors = resolve_all(svc, violations, TextIndex.from_text(text), lookup)
         assert len(survivors) == 2
         assert survivors[0].range.start != survivors[1].range.start
         assert {s.range.start for s in survivors} == {text.find("9:30"), text.find("9:30", text.find("9:30") + 1)}
@@ -158,9 +198,17 @@ class TestResolveAndDedup:
             DetectionViolation(rule_name=rule_name, reason="r", source="9:30"),
             DetectionViolation(rule_name=rule_name, reason="r", source="9:30 Uhr"),
         ]
-        survivors = svc._resolve_and_dedup(violations, text, lookup)
+        survivors = resolve_all(svc, violations, TextIndex.from_text(text), lookup)
         assert len(survivors) == 1
 
+    def test_repeated_report_of_consumed_snippet_is_dropped(self) -> None:
+        svc = make_service()
+        text = "Die Sitzung findet am Montag statt. Danach folgt Kaffee. Die Sitzung findet am Montag nicht statt."
+        rule_name = "Passiv vermeiden"
+        violation = DetectionViolation(rule_name=rule_name, reason="r", source="Die Sitzung findet am Montag statt")
+        survivors = resolve_all(svc, [violation, violation], TextIndex.from_text(text), rule_lookup(rule_name))
+        assert [(s.range.start, s.range.end) for s in survivors] == [(0, 34)]
+
     def test_distinct_rules_keep_separate(self) -> None:
         svc = make_service()
         text = "9:30 und gerade Anführungszeichen."
@@ -169,11 +217,18 @@ class TestResolveAndDedup:
             DetectionViolation(rule_name="Uhrzeit", reason="r", source="9:30"),
             DetectionViolation(rule_name="Guillemets", reason="r", source="gerade"),
         ]
-        survivors = svc._resolve_and_dedup(violations, text, lookup)
+        survivors = resolve_all(svc, violations, TextIndex.from_text(text), lookup)
         assert len(survivors) == 2
         assert {s.rule_name for s in survivors} == {"Uhrzeit", "Guillemets"}
 
 
+def spans(*detections: ResolvedDetection) -> dict[str, IntervalIndex]:
+    seen: dict[str, IntervalIndex] = {}
+    for detection in detections:
+        seen.setdefault(detection.rule_name, IntervalIndex()).add(detection.range.start, detection.range.end)
+    return seen
+
+
 class TestIsDuplicate:
     def _det(self, rule: str, start: int, end: int) -> ResolvedDetection:
         return ResolvedDetection(
@@ -188,81 +243,86 @@ class TestIsDuplicate:
 
     def test_overlapping_same_rule_is_duplicate(self) -> None:
         svc = make_service()
-        seen = [self._det("r", 10, 20)]
+        seen = spans(self._det("r", 10, 20))
         assert svc._is_duplicate(self._det("r", 15, 25), seen) is True
 
     def test_non_overlapping_same_rule_not_duplicate(self) -> None:
         svc = make_service()
-        seen = [self._det("r", 10, 20)]
+        seen = spans(self._det("r", 10, 20))
         assert svc._is_duplicate(self._det("r", 30, 40), seen) is False
 
     def test_same_start_is_duplicate(self) -> None:
         svc = make_service()
-        seen = [self._det("r", 10, 20)]
+        seen = spans(self._det("r", 10, 20))
         assert svc._is_duplicate(self._det("r", 10, 12), seen) is True
 
     def test_overlapping_different_rule_not_duplicate(self) -> None:
         svc = make_service()
-        seen = [self._det("r1", 10, 20)]
+        seen = spans(self._det("r1", 10, 20))
         assert svc._is_duplicate(self._det("r2", 15, 25), seen) is False
 
     def test_empty_seen_not_duplicate(self) -> None:
         svc = make_service()
-        assert svc._is_duplicate(self._det("r", 10, 20), []) is False
+        assert svc._is_duplicate(self._det("r", 10, 20), {}) is False
 
 
-class TestOverlapsAny:
+class TestIntervalOverlaps:
     def test_overlapping_range_found(self) -> None:
-        assert AdvisorService._overlaps_any((10, 20), [(15, 25)]) is True
+        assert IntervalIndex([(15, 25)]).overlaps(10, 20) is True
 
     def test_non_overlapping_not_found(self) -> None:
-        assert AdvisorService._overlaps_any((10, 20), [(30, 40)]) is False
+        assert IntervalIndex([(30, 40)]).overlaps(10, 20) is False
 
     def test_empty_ranges(self) -> None:
-        assert AdvisorService._overlaps_any((10, 20), []) is False
+        assert IntervalIndex().overlaps(10, 20) is False
 
     def test_adjacent_not_overlapping(self) -> None:
-        assert AdvisorService._overlaps_any((10, 20), [(20, 30)]) is False
+        assert IntervalIndex([(20, 30)]).overlaps(10, 20) is False
 
 
 class TestMapNormalizedToOriginal:
     def test_identity_when_no_extra_whitespace(self) -> None:
-        svc = make_service()
-        text = "abc def"
-        normalized = svc._normalize_whitespace(text)
-        assert svc._map_normalized_to_original(text, normalized, 4) == 4  # 'd'
+        index = TextIndex.from_text("abc def")
+        assert index.normalized_to_original(4) == 4  # 'd'
 
     def test_extra_whitespace_advances(self) -> None:
-        svc = make_service()
-        text = "abc  def"  # double space
-        normalized = svc._normalize_whitespace(text)  # "abc def"
+        index = TextIndex.from_text("abc  def")  # double space
+        assert index.normalized == "abc def"
         # 'd' is at normalized index 4 but original index 5 (after double space).
-        assert svc._map_normalized_to_original(text, normalized, 4) == 5
+        assert index.normalized_to_original(4) == 5
+
+    def test_end_of_normalized_text_maps_to_end_of_original(self) -> None:
+        index = TextIndex.from_text("abc \n\t ")
+        assert index.normalized_to_original(len(index.normalized)) == len(index.text)
+
+    def test_past_end_returns_none(self) -> None:
+        index = TextIndex.from_text("abc")
+        assert index.normalized_to_original(10) is None
 
 
 class TestToUtf16Offset:
     def test_bmp_text_unchanged(self) -> None:
         # All BMP (umlauts, ß) — UTF-16 code-unit count equals code-point count.
-        assert AdvisorService._to_utf16_offset("Grüße Anhörung", 6) == 6
+        assert TextIndex.from_text("Grüße Anhörung").to_utf16(6) == 6
 
     def test_supplementary_char_before_offset_counts_double(self) -> None:
         # 🎉 (U+1F389) is one Python code point but two UTF-16 units.
         text = "🎉Anhörung"
-        assert AdvisorService._to_utf16_offset(text, 1) == 2
+        assert TextIndex.from_text(text).to_utf16(1) == 2
 
     def test_supplementary_char_after_offset_ignored(self) -> None:
         text = "abc🎉"
-        assert AdvisorService._to_utf16_offset(text, 3) == 3
+        assert TextIndex.from_text(text).to_utf16(3) == 3
 
     def test_mixed_offsets(self) -> None:
         text = "a🎉b🎉c"  # code points: a(0) 🎉(1) b(2) 🎉(3) c(4)
-        assert AdvisorService._to_utf16_offset(text, 1) == 1  # "a"
-        assert AdvisorService._to_utf16_offset(text, 3) == 4  # "a🎉b" -> 1+2+1
-        assert AdvisorService._to_utf16_offset(text, 5) == 7  # whole string
+        assert TextIndex.from_text(text).to_utf16(1) == 1  # "a"
+        assert TextIndex.from_text(text).to_utf16(3) == 4  # "a🎉b" -> 1+2+1
+        assert TextIndex.from_text(text).to_utf16(5) == 7  # whole string
 
     def test_zero_and_past_end(self) -> None:
-        assert AdvisorService._to_utf16_offset("🎉abc", 0) == 0
-        assert AdvisorService._to_utf16_offset("🎉abc", 4) == 5
+        assert TextIndex.from_text("🎉abc").to_utf16(0) == 0
+        assert TextIndex.from_text("🎉abc").to_utf16(4) == 5
 
 
 class TestBuildViolationResultUtf16:
@@ -284,7 +344,7 @@ class TestBuildViolationResultUtf16:
         # units, so the JS-visible offsets are each +1 versus the code points.
         text = "Test 🎉 Anhörung."
         resolved = self._resolved(text, "Anhörung")
-        result = svc._build_violation_result(resolved, "Vorschlag", text)
+        result = svc._build_violation_result(resolved, "Vorschlag", TextIndex.from_text(text))
         assert result.range.start == resolved.range.start + 1
         assert result.range.end == resolved.range.end + 1
 
@@ -292,7 +352,7 @@ class TestBuildViolationResultUtf16:
         svc = make_service()
         text = "Grüße und Anhörung."
         resolved = self._resolved(text, "Anhörung")
-        result = svc._build_violation_result(resolved, "Vorschlag", text)
+        result = svc._build_violation_result(resolved, "Vorschlag", TextIndex.from_text(text))
         assert result.range.start == resolved.range.start
         assert result.range.end == resolved.range.end
 
@@ -300,7 +360,7 @@ class TestBuildViolationResultUtf16:
         svc = make_service()
         text = "Test 🎉 Anhörung."
         resolved = self._resolved(text, "Anhörung")
-        result = svc._build_violation_result(resolved, "Vorschlaß", text)
+        result = svc._build_violation_result(resolved, "Vorschlaß", TextIndex.from_text(text))
         assert result.source == "Anhörung"
         assert result.proposal == "Vorschlass"  # ß -> ss
         assert result.rule_name == resolved.rule_name
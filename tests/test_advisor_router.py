@@ -0,0 +1,9 @@
+import pytest
+
+# The router module imports the app container, which needs every service dependency.
+advisor_router = pytest.importorskip("text_mate_backend.routers.advisor")
+
+
+def test_any_number_of_documents_accepted() -> None:
+    docs = {f"collection-{i}" for i in range(12)}
+    assert advisor_router.AdvisorInput(text="Text", docs=docs).docs == docs
@@ -0,0 +1,82 @@
+"""Unit tests for the bit-parallel approximate substring search.
+
+Results are checked against a plain dynamic-programming edit distance over
+every span of small random texts.
+"""
+
+import random
+
+from text_mate_backend.utils.approximate_match import find_approximate
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def test_exact_occurrence_has_distance_zero() -> None:
+    text = "die anhörung beginnt um 9:30 uhr."
+    match = find_approximate("anhörung", text, 0.85)
+    assert match is not None
+    assert (text[match.start : match.end], match.distance) == ("anhörung", 0)
+
+
+def test_finds_snippet_whose_first_character_differs() -> None:
+    text = "wir haben ihr gesuch um verlängerung der frist erhalten."
+    match = find_approximate("xesuch um verlängerung", text, 0.85)
+    assert match is not None
+    assert text[match.start : match.end] == "gesuch um verlängerung"
+    assert match.distance == 1
+    assert match.similarity(22) == 1 - 1 / 22
+
+
+def test_too_distant_snippet_is_not_found() -> None:
+    assert find_approximate("vollständig anders", "die anhörung beginnt um 9:30 uhr.", 0.85) is None
+
+
+def test_honours_start() -> None:
+    text = "die frist ist abgelaufen. die frist ist abgelaufen."
+    second = text.find("die", 1)
+    match = find_approximate("die frist ist abgelaufn", text, 0.85, start=1)
+    assert match is not None
+    assert match.start == second
+
+
+def test_agrees_with_edit_distance_over_all_spans() -> None:
+    rng = random.Random(0)
+    for _ in range(500):
+        text = "".join(rng.choice("abc ") for _ in range(rng.randint(1, 30)))
+        needle = "".join(rng.choice("abc") for _ in range(rng.randint(1, 10)))
+        start = rng.randint(0, len(text))
+        min_similarity = rng.choice([0.5, 0.85])
+        spans = [(i, j) for i in range(start, len(text) + 1) for j in range(i + 1, len(text) + 1)]
+        best = min((edit_distance(needle, text[i:j]) for i, j in spans), default=len(needle))
+
+        match = find_approximate(needle, text, min_similarity, start)
+
+        if best > int(len(needle) * (1 - min_similarity)):
+            assert match is None
+            continue
+        assert match is not None
+        assert match.start >= start
+        assert match.distance == best == edit_distance(needle, text[match.start : match.end])
+        assert match.end == min(j for i, j in spans if edit_distance(needle, text[i:j]) == best)
+
+
+def test_agrees_with_full_scan_on_long_text() -> None:
+    # Long texts take the pigeonhole-filtered path; a single region must not change the result.
+    rng = random.Random(1)
+    for _ in range(50):
+        text = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(2000))
+        at = rng.randrange(1900)
+        needle = list(text[at : at + 40])
+        needle[rng.randrange(40)] = "#"
+        match = find_approximate("".join(needle), text, 0.85)
+        assert match is not None
+        assert match.distance == 1
+        assert abs(match.start - at) <= 1
@@ -0,0 +1,48 @@
+from text_mate_backend.models.rule_models import ResolvedDetection, ViolationRange
+from text_mate_backend.services.detection_voting import AgreementVoter
+
+
+def detection(rule: str, start: int, end: int) -> ResolvedDetection:
+    return ResolvedDetection(
+        rule_name=rule,
+        reason="r",
+        source="x" * (end - start),
+        range=ViolationRange(start=start, end=end),
+        file_name="doc.pdf",
+        page_number=1,
+        collection="bundeskanzlei",
+    )
+
+
+def test_accepted_once_when_votes_reached() -> None:
+    voter = AgreementVoter(3, {"a": 2})
+    first = detection("a", 0, 5)
+    assert voter.add(0, first) is None
+    assert voter.add(1, detection("a", 2, 7)) is first
+    assert voter.add(2, detection("a", 0, 5)) is None
+    assert voter.rejected() == []
+
+
+def test_votes_of_one_sample_count_once() -> None:
+    voter = AgreementVoter(3, {"a": 2})
+    assert voter.add(0, detection("a", 0, 5)) is None
+    assert voter.add(0, detection("a", 1, 4)) is None
+    [cluster] = voter.rejected()
+    assert voter.agreement(cluster) == 1 / 3
+
+
+def test_rules_and_disjoint_spans_form_separate_clusters() -> None:
+    voter = AgreementVoter(2, {"a": 2, "b": 2})
+    voter.add(0, detection("a", 0, 5))
+    voter.add(1, detection("b", 0, 5))
+    voter.add(1, detection("a", 5, 9))
+    assert [(c.detection.rule_name, c.detection.range.start) for c in voter.rejected()] == [
+        ("a", 0),
+        ("a", 5),
+        ("b", 0),
+    ]
+
+
+def test_unlisted_rule_needs_one_vote() -> None:
+    voter = AgreementVoter(3, {})
+    assert voter.add(2, detection("a", 0, 1)) is not None
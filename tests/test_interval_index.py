@@ -0,0 +1,121 @@
+"""Property tests for IntervalIndex and the interval-based advisor dedup.
+
+The reference functions below are the list scans the index replaces; on
+random inputs the index, and resolution and dedup built on it, must agree
+with them exactly.
+"""
+
+import asyncio
+import random
+
+from text_mate_backend.models.rule_models import DetectionViolation, ResolvedDetection, Rule
+from text_mate_backend.services.advisor import AdvisorService
+from text_mate_backend.services.span_resolver import SpanResolver, find_source_first
+from text_mate_backend.utils.interval_index import IntervalIndex
+from text_mate_backend.utils.text_index import TextIndex
+
+
+def reference_overlaps_any(rng: tuple[int, int], ranges: list[tuple[int, int]]) -> bool:
+    return any(min(rng[1], r[1]) > max(rng[0], r[0]) for r in ranges)
+
+
+def reference_reach(pos: int, ranges: list[tuple[int, int]]) -> int | None:
+    return max((end for begin, end in ranges if begin <= pos < end), default=None)
+
+
+def reference_find_source(source: str, index: TextIndex, consumed: list[tuple[int, int]]) -> tuple[int, int] | None:
+    found = reference_find_unconsumed(source, index, consumed, fuzzy=False)
+    return found if found is not None else reference_find_unconsumed(source, index, consumed, fuzzy=True)
+
+
+def reference_find_unconsumed(
+    source: str, index: TextIndex, consumed: list[tuple[int, int]], fuzzy: bool
+) -> tuple[int, int] | None:
+    first_found = None
+    min_start = 0
+    while True:
+        found = find_source_first(source, index, min_start, fuzzy)
+        if found is None or not consumed:
+            return found if not consumed else first_found
+        pos, match_len = found
+        if not reference_overlaps_any((pos, pos + match_len), consumed):
+            return found
+        first_found = first_found or found
+        min_start = max([pos + 1] + [end for begin, end in consumed if begin <= pos < end])
+
+
+def reference_resolve_and_dedup(violations: list[DetectionViolation], index: TextIndex) -> list[tuple[str, int, int]]:
+    survivors: list[tuple[str, int, int]] = []
+    consumed_by_rule: dict[str, list[tuple[int, int]]] = {}
+    for violation in violations:
+        source = violation.source.strip()
+        found = reference_find_source(source, index, consumed_by_rule.get(violation.rule_name, [])) if source else None
+        if found is None:
+            continue
+        start, end = found[0], min(found[0] + found[1], len(index.text))
+        if any(
+            rule == violation.rule_name and (min(s_end, end) - max(s_start, start) > 0 or s_start == start)
+            for rule, s_start, s_end in survivors
+        ):
+            continue
+        survivors.append((violation.rule_name, start, end))
+        consumed_by_rule.setdefault(violation.rule_name, []).append((start, end))
+    return survivors
+
+
+def random_intervals(rng: random.Random, count: int) -> list[tuple[int, int]]:
+    intervals = []
+    for _ in range(count):
+        start = rng.randint(0, 40)
+        intervals.append((start, start + rng.choice([0, 0, 1, 2, 3, 5, 8])))
+    return intervals
+
+
+def test_queries_agree_with_list_scans() -> None:
+    rng = random.Random(0)
+    for _ in range(300):
+        intervals = random_intervals(rng, rng.randint(0, 12))
+        index = IntervalIndex()
+        added: list[tuple[int, int]] = []
+        for start, end in intervals:
+            index.add(start, end)
+            added.append((start, end))
+            for pos in range(-1, 50):
+                assert index.reach(pos) == reference_reach(pos, added)
+                assert index.has_start(pos) == any(begin == pos for begin, _ in added)
+                for length in (0, 1, 3):
+                    assert index.overlaps(pos, pos + length) == reference_overlaps_any((pos, pos + length), added)
+
+
+def test_copy_is_independent() -> None:
+    index = IntervalIndex([(0, 5)])
+    clone = index.copy()
+    clone.add(10, 15)
+    assert (index.overlaps(10, 11), clone.overlaps(10, 11), len(index)) == (False, True, 1)
+
+
+def test_resolve_and_dedup_agrees_with_list_based_implementation() -> None:
+    rng = random.Random(1)
+    words = ["Frist", "frist", "9:30", "Uhr", "ß", "«Test»", "die", "Die  Frist", "ab"]
+    svc = AdvisorService.__new__(AdvisorService)
+    svc.span_resolver = SpanResolver(workers=0)
+    lookup = {
+        name: Rule(name=name, description="", file_name="", page_number=0, example="", collection="")
+        for name in ("a", "b")
+    }
+    for _ in range(200):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 30)))
+        index = TextIndex.from_text(text)
+        violations = []
+        for _ in range(rng.randint(0, 25)):
+            start = rng.randrange(len(text))
+            source = text[start : start + rng.randint(1, 12)]
+            if rng.random() < 0.2:
+                source = source.upper()
+            violations.append(DetectionViolation(rule_name=rng.choice("ab"), reason="r", source=source or "x"))
+
+        survivors: list[ResolvedDetection] = asyncio.run(svc._resolve_and_dedup(violations, index, lookup))
+
+        assert [(s.rule_name, s.range.start, s.range.end) for s in survivors] == reference_resolve_and_dedup(
+            violations, index
+        )
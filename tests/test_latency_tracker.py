@@ -0,0 +1,35 @@
+import pytest
+
+from text_mate_backend.utils.latency_tracker import LatencyTracker
+
+
+def test_no_percentile_before_min_samples() -> None:
+    tracker = LatencyTracker(window=10, min_samples=3)
+    tracker.record(1.0)
+    tracker.record(2.0)
+    assert tracker.percentile(95) is None
+    tracker.record(3.0)
+    assert tracker.percentile(95) == 3.0
+
+
+def test_nearest_rank() -> None:
+    tracker = LatencyTracker(window=100, min_samples=1)
+    for seconds in range(1, 101):
+        tracker.record(float(seconds))
+    assert tracker.percentile(50) == 50.0
+    assert tracker.percentile(95) == 95.0
+    assert tracker.percentile(100) == 100.0
+
+
+def test_window_forgets_old_durations() -> None:
+    tracker = LatencyTracker(window=3, min_samples=1)
+    for seconds in (100.0, 1.0, 2.0, 3.0):
+        tracker.record(seconds)
+    assert len(tracker) == 3
+    assert tracker.percentile(100) == 3.0
+
+
+@pytest.mark.parametrize(("window", "min_samples"), [(0, 1), (5, 0), (5, 6)])
+def test_rejects_invalid_sizes(window: int, min_samples: int) -> None:
+    with pytest.raises(ValueError):
+        LatencyTracker(window=window, min_samples=min_samples)
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from text_mate_backend.utils.llm_scheduler import LlmPriority, LlmScheduler
+
+
+async def hold(
+    scheduler: LlmScheduler, priority: LlmPriority, order: list[str], name: str, gate: asyncio.Event
+) -> None:
+    async with scheduler.slot(priority):
+        order.append(name)
+        await gate.wait()
+
+
+class TestLlmScheduler:
+    def test_rejects_non_positive_limit(self) -> None:
+        with pytest.raises(ValueError):
+            LlmScheduler(0)
+
+    def test_admits_up_to_limit_without_queueing(self) -> None:
+        async def scenario() -> None:
+            scheduler = LlmScheduler(2)
+            gate = asyncio.Event()
+            order: list[str] = []
+            tasks = [asyncio.create_task(hold(scheduler, LlmPriority.INTERACTIVE, order, n, gate)) for n in "ab"]
+            await asyncio.sleep(0)
+            assert scheduler.in_flight == 2
+            assert scheduler.queue_depth() == 0
+            gate.set()
+            await asyncio.gather(*tasks)
+            assert scheduler.in_flight == 0
+
+        asyncio.run(scenario())
+
+    def test_higher_priority_served_first(self) -> None:
+        async def scenario() -> None:
+            scheduler = LlmScheduler(1)
+            first_gate = asyncio.Event()
+            gate = asyncio.Event()
+            gate.set()
+            order: list[str] = []
+
+            blocker = asyncio.create_task(hold(scheduler, LlmPriority.ADVISOR_DETECTION, order, "blocker", first_gate))
+            await asyncio.sleep(0)
+            proposal = asyncio.create_task(hold(scheduler, LlmPriority.ADVISOR_PROPOSAL, order, "proposal", gate))
+            detection = asyncio.create_task(hold(scheduler, LlmPriority.ADVISOR_DETECTION, order, "detection", gate))
+            synonym = asyncio.create_task(hold(scheduler, LlmPriority.INTERACTIVE, order, "synonym", gate))
+            await asyncio.sleep(0)
+            assert scheduler.queue_depth() == 3
+            assert scheduler.queue_depth(LlmPriority.INTERACTIVE) == 1
+
+            first_gate.set()
+            await asyncio.gather(blocker, proposal, detection, synonym)
+            assert order == ["blocker", "synonym", "detection", "proposal"]
+
+        asyncio.run(scenario())
+
+    def test_fifo_within_priority(self) -> None:
+        async def scenario() -> None:
+            scheduler = LlmScheduler(1)
+            first_gate = asyncio.Event()
+            gate = asyncio.Event()
+            gate.set()
+            order: list[str] = []
+            blocker = asyncio.create_task(hold(scheduler, LlmPriority.QUICK_ACTION, order, "blocker", first_gate))
+            await asyncio.sleep(0)
+            queued = []
+            for name in ["q1", "q2", "q3"]:
+                queued.append(asyncio.create_task(hold(scheduler, LlmPriority.QUICK_ACTION, order, name, gate)))
+                await asyncio.sleep(0)
+            first_gate.set()
+            await asyncio.gather(blocker, *queued)
+            assert order == ["blocker", "q1", "q2", "q3"]
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_is_removed_and_never_runs(self) -> None:
+        async def scenario() -> None:
+            scheduler = LlmScheduler(1)
+            first_gate = asyncio.Event()
+            gate = asyncio.Event()
+            gate.set()
+            order: list[str] = []
+            blocker = asyncio.create_task(hold(scheduler, LlmPriority.QUICK_ACTION, order, "blocker", first_gate))
+            await asyncio.sleep(0)
+            doomed = asyncio.create_task(hold(scheduler, LlmPriority.INTERACTIVE, order, "doomed", gate))
+            survivor = asyncio.create_task(hold(scheduler, LlmPriority.ADVISOR_PROPOSAL, order, "survivor", gate))
+            await asyncio.sleep(0)
+            assert scheduler.queue_depth() == 2
+
+            doomed.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await doomed
+            assert scheduler.queue_depth() == 1
+
+            first_gate.set()
+            await asyncio.gather(blocker, survivor)
+            assert order == ["blocker", "survivor"]
+            assert scheduler.in_flight == 0
+            assert scheduler.stats()["interactive"]["cancelled"] == 1
+
+        asyncio.run(scenario())
+
+    def test_slot_released_on_error(self) -> None:
+        async def scenario() -> None:
+            scheduler = LlmScheduler(1)
+            with pytest.raises(RuntimeError):
+                async with scheduler.slot(LlmPriority.INTERACTIVE):
+                    raise RuntimeError("boom")
+            assert scheduler.in_flight == 0
+
+        asyncio.run(scenario())
+
+    def test_wait_time_recorded(self) -> None:
+        async def scenario() -> None:
+            scheduler = LlmScheduler(1)
+            first_gate = asyncio.Event()
+            gate = asyncio.Event()
+            gate.set()
+            order: list[str] = []
+            blocker = asyncio.create_task(hold(scheduler, LlmPriority.QUICK_ACTION, order, "blocker", first_gate))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(hold(scheduler, LlmPriority.ADVISOR_DETECTION, order, "waiter", gate))
+            await asyncio.sleep(0.02)
+            first_gate.set()
+            await asyncio.gather(blocker, waiter)
+            stats = scheduler.stats()["advisor_detection"]
+            assert stats["granted"] == 1
+            assert stats["queued"] == 1
+            assert stats["max_wait_ms"] >= 10
+
+        asyncio.run(scenario())
@@ -0,0 +1,156 @@
+"""Unit tests for the deterministic checker stage (RuleCheckerEngine, CheckerSpec)."""
+
+import random
+import re
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from text_mate_backend.models.rule_models import CheckerSpec, Rule, RulesContainer
+from text_mate_backend.services.rule_checker import RuleCheckerEngine
+
+
+def make_rule(name: str, **checker: object) -> Rule:
+    return Rule(
+        name=name,
+        description="",
+        file_name="doc.pdf",
+        page_number=1,
+        example="",
+        collection="bundeskanzlei",
+        checker=CheckerSpec.model_validate(checker) if checker else None,
+    )
+
+
+def deciding(name: str, pattern: str, **extra: object) -> Rule:
+    return make_rule(name, pattern=pattern, decides=True, reason="r", translate={"x": "x"}, **extra)
+
+
+class TestCheckerSpec:
+    def test_named_groups_rejected(self) -> None:
+        with pytest.raises(ValidationError):
+            CheckerSpec(pattern="(?P<name>a)")
+
+    def test_backreferences_rejected(self) -> None:
+        with pytest.raises(ValidationError):
+            CheckerSpec(pattern=r"(a)\1")
+
+    def test_invalid_regex_rejected(self) -> None:
+        with pytest.raises(ValidationError):
+            CheckerSpec(pattern="(unclosed")
+
+    def test_deciding_checker_requires_output(self) -> None:
+        with pytest.raises(ValidationError):
+            CheckerSpec(pattern="ß", decides=True, reason="r")
+
+    def test_checker_not_serialized_into_prompts(self) -> None:
+        rule = deciding("Eszett", "ß")
+        assert "checker" not in rule.model_dump_json()
+        assert "checker" not in str(RulesContainer.model_json_schema())
+
+
+class TestRuleCheckerEngine:
+    def test_empty_engine(self) -> None:
+        engine = RuleCheckerEngine([make_rule("no checker")])
+        assert engine.scan("irgendein Text") == []
+        assert engine.deciding_rules == []
+
+    def test_proposal_from_replacement_and_translate(self) -> None:
+        engine = RuleCheckerEngine(
+            [
+                make_rule("Eszett", pattern=r"\w*ß\w*", decides=True, reason="r", translate={"ß": "ss"}),
+                make_rule("Uhrzeit", pattern=r"(\d{1,2}):(\d{2})", decides=True, reason="r", replacement=r"\1.\2"),
+            ]
+        )
+        hits = engine.scan("Gemäß Plan um 9:30 Uhr an der Straße.")
+        assert [(h.rule.name, h.source, h.proposal) for h in hits] == [
+            ("Eszett", "Gemäß", "Gemäss"),
+            ("Uhrzeit", "9:30", "9.30"),
+            ("Eszett", "Straße", "Strasse"),
+        ]
+
+    def test_overlapping_rules_at_same_position_both_reported(self) -> None:
+        engine = RuleCheckerEngine([deciding("Uhrzeit", r"\d{1,2}:\d{2}"), deciding("Volle Stunde", r"\d{1,2}:00")])
+        hits = engine.scan("um 8:00 Uhr")
+        assert [(h.rule.name, h.start, h.end) for h in hits] == [("Uhrzeit", 3, 7), ("Volle Stunde", 3, 7)]
+
+    def test_rule_overlapping_inside_other_rule_match(self) -> None:
+        engine = RuleCheckerEngine([deciding("Quotes", r'"[^"]*"'), deciding("Eszett", r"\w*ß\w*")])
+        hits = engine.scan('Die "Straße" ist gesperrt.')
+        assert [(h.rule.name, h.source) for h in hits] == [("Quotes", '"Straße"'), ("Eszett", "Straße")]
+
+    def test_exceptions_skip_matches(self) -> None:
+        engine = RuleCheckerEngine([deciding("Eszett", r"\w*ß\w*", exceptions=["Strauß"])])
+        assert [h.source for h in engine.scan("Johann Strauß grüßt.")] == ["grüßt"]
+
+    def test_ignore_case(self) -> None:
+        engine = RuleCheckerEngine([deciding("Meeting", r"meeting", ignore_case=True)])
+        assert [h.source for h in engine.scan("Das Meeting und das MEETING.")] == ["Meeting", "MEETING"]
+
+    def test_trigger_only_rules_skipped_unless_requested(self) -> None:
+        engine = RuleCheckerEngine([make_rule("Kurze Zahlen", pattern=r"\b\d\b"), deciding("Eszett", "ß")])
+        assert [h.rule.name for h in engine.scan("3 Maß")] == ["Eszett"]
+        assert [h.rule.name for h in engine.scan("3 Maß", deciding_only=False)] == ["Kurze Zahlen", "Eszett"]
+        assert [r.name for r in engine.deciding_rules] == ["Eszett"]
+
+    def test_triggered_rules_honour_exceptions(self) -> None:
+        engine = RuleCheckerEngine(
+            [
+                make_rule("Kurze Zahlen", pattern=r"\d", exceptions=["0"]),
+                make_rule("Phot", pattern="ph"),
+                deciding("E", "ß"),
+            ]
+        )
+        assert [r.name for r in engine.trigger_rules] == ["Kurze Zahlen", "Phot"]
+        assert engine.triggered_rules("Seite 0, Maß") == set()
+        assert engine.triggered_rules("3 Graphen") == {"Kurze Zahlen", "Phot"}
+
+    def test_matches_per_rule_finditer_on_random_texts(self) -> None:
+        patterns = [r"a+b?", r"\bab\b", r"b{2,}", r"(?<=a)ba", r"[ab]{3}", r"\w*ß\w*"]
+        rules = [deciding(f"r{i}", pattern) for i, pattern in enumerate(patterns)]
+        engine = RuleCheckerEngine(rules)
+        rng = random.Random(42)
+        for _ in range(300):
+            text = "".join(rng.choice("ab ß.") for _ in range(rng.randint(0, 40)))
+            got = sorted((h.rule.name, h.start, h.end) for h in engine.scan(text))
+            expected = sorted(
+                (f"r{i}", m.start(), m.end())
+                for i, pattern in enumerate(patterns)
+                for m in re.finditer(pattern, text)
+                if m.end() > m.start()
+            )
+            assert got == expected, text
+
+
+@pytest.fixture(scope="module")
+def engine() -> RuleCheckerEngine:
+    rules: list[Rule] = []
+    for path in sorted(Path("assets/docs/rules").glob("*.json")):
+        rules.extend(RulesContainer.model_validate_json(path.read_text()).rules)
+    return RuleCheckerEngine(rules)
+
+
+class TestRepositoryCheckers:
+    def test_eszett(self, engine: RuleCheckerEngine) -> None:
+        hits = engine.scan("Gemäß dem Beschluss wird die Bahnhofstraße saniert.")
+        assert [(h.source, h.proposal) for h in hits] == [("Gemäß", "Gemäss"), ("Bahnhofstraße", "Bahnhofstrasse")]
+
+    @staticmethod
+    def triggers(engine: RuleCheckerEngine, rule: str, text: str) -> list[str]:
+        return [h.source for h in engine.scan(text, deciding_only=False) if h.rule.name.startswith(rule)]
+
+    def test_guillemets_is_a_trigger_for_every_quote_form(self, engine: RuleCheckerEngine) -> None:
+        # Inch marks and apostrophes share the characters: the LLM judges.
+        text = 'Die Zeitung "Der Bund", „Politik heute“, ‚Zitat‘ und »Echo«; 12" breit.'
+        assert engine.scan(text) == []
+        assert self.triggers(engine, "Guillemets", text) == ['"', '"', "„", "“", "‚", "‘", "»", '"']
+
+    def test_uhrzeit_is_a_trigger(self, engine: RuleCheckerEngine) -> None:
+        # Scales and verse references share the pattern: the LLM judges.
+        text = "Beginn um 9:30 Uhr, Massstab 1:25 000, Matthäus 5:12, Ziffern 1:2:3 nicht."
+        assert engine.scan(text) == []
+        assert self.triggers(engine, "Uhrzeit", text) == ["9:30", "1:25", "5:12"]
+
+    def test_correct_text_has_no_hits(self, engine: RuleCheckerEngine) -> None:
+        assert engine.scan("Die Sitzung beginnt um 14.30 Uhr an der Strasse «Zum Bund».") == []
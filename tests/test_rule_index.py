@@ -0,0 +1,107 @@
+"""Unit tests for the advisor rule store (RuleIndex)."""
+
+from text_mate_backend.models.rule_models import Rule
+from text_mate_backend.services.rule_index import LAYOUTS, RuleIndex
+from text_mate_backend.services.rule_packer import pack_rules
+
+
+def make_rule(name: str, description: str, collection: str = "bundeskanzlei") -> Rule:
+    return Rule(
+        name=name, description=description, file_name="doc.pdf", page_number=1, example="", collection=collection
+    )
+
+
+ANGLIZISMEN = make_rule("Anglizismen", "Unnötige Anglizismen wie Meeting oder Deadline ersetzen")
+FLOSKELN = make_rule("Floskeln", "Steife Floskeln wie höflich ersuchen vermeiden", collection="merkblatt")
+ZAHLEN = make_rule("Zahlen", "Kurze Zahlen im Fliesstext ausschreiben")
+INDEX = RuleIndex([ANGLIZISMEN, FLOSKELN, ZAHLEN])
+
+
+class TestSelect:
+    def test_selects_by_collection_in_sorted_order(self) -> None:
+        assert INDEX.select(["merkblatt", "bundeskanzlei"]) == [ANGLIZISMEN, ZAHLEN, FLOSKELN]
+        assert INDEX.select({"merkblatt"}) == [FLOSKELN]
+
+    def test_unknown_collection_selects_nothing(self) -> None:
+        assert INDEX.select(["unbekannt"]) == []
+
+    def test_collections(self) -> None:
+        assert INDEX.collections == {"bundeskanzlei", "merkblatt"}
+
+    def test_no_limit_on_number_of_collections(self) -> None:
+        rules = [make_rule(f"r{i}", "x", collection=f"c{i}") for i in range(50)]
+        assert len(RuleIndex(rules).select(f"c{i}" for i in range(50))) == 50
+
+
+class TestLookup:
+    def test_rules_of_the_selection_by_name(self) -> None:
+        assert INDEX.lookup(["bundeskanzlei", "unbekannt"]) == {"Anglizismen": ANGLIZISMEN, "Zahlen": ZAHLEN}
+
+    def test_built_once_per_selection(self) -> None:
+        assert INDEX.lookup({"merkblatt", "bundeskanzlei"}) is INDEX.lookup(["bundeskanzlei", "merkblatt"])
+
+    def test_selected_list_is_the_caller_s(self) -> None:
+        selected = INDEX.select(["bundeskanzlei"])
+        selected.clear()
+        assert INDEX.select(["bundeskanzlei"]) == [ANGLIZISMEN, ZAHLEN]
+
+
+class TestLayout:
+    def test_matches_pack_rules(self) -> None:
+        rules = INDEX.select(["bundeskanzlei", "merkblatt"])
+        for capacity in (1, 5, 50):
+            assert INDEX.layout(rules, capacity) == pack_rules(rules, capacity)
+
+    def test_packed_once_per_rules_and_capacity(self) -> None:
+        index = RuleIndex([ANGLIZISMEN, FLOSKELN, ZAHLEN])
+        first = index.layout([ANGLIZISMEN, ZAHLEN], 50)
+        again = index.layout([ANGLIZISMEN, ZAHLEN], 50)
+        assert again is not first
+        assert all(a is b for a, b in zip(again, first, strict=True))
+        assert index.layout([ANGLIZISMEN, ZAHLEN], 5)[0] is not first[0]
+        assert index.layout([ZAHLEN, ANGLIZISMEN], 50)[0] is not first[0]
+
+    def test_equal_rules_of_other_content_are_packed_anew(self) -> None:
+        index = RuleIndex([])
+        short = make_rule("Regel", "kurz")
+        long = make_rule("Regel", "lang " * 40)
+        assert index.layout([short, ZAHLEN], 30) == [[short, ZAHLEN]]
+        assert index.layout([long, ZAHLEN], 30) == [[long], [ZAHLEN]]
+
+    def test_bounded(self) -> None:
+        index = RuleIndex([])
+        for capacity in range(1, LAYOUTS + 6):
+            index.layout([ZAHLEN], capacity)
+        assert len(index._layouts) == LAYOUTS
+
+
+def test_report() -> None:
+    report = INDEX.report()
+    assert report["rules"] == 3
+    assert report["collections"] == 2
+    assert report["prompt_tokens"] == sum(rule.prompt_tokens for rule in INDEX.rules)
+    assert report["prompt_json_bytes"] == sum(len(rule.model_dump_json().encode()) for rule in INDEX.rules)
+
+
+class TestScores:
+    def test_related_rule_scores_highest(self) -> None:
+        scores = INDEX.scores("Bitte das Meeting vor der Deadline ansetzen.", INDEX.rules)
+        assert max(scores, key=scores.__getitem__) == "Anglizismen"
+        assert all(0.0 <= score <= 1.0 for score in scores.values())
+
+    def test_best_paragraph_counts(self) -> None:
+        paragraph = "Bitte das Meeting vor der Deadline ansetzen."
+        filler = "\n\n".join(["Der Bericht wurde heute veröffentlicht."] * 20)
+        alone = INDEX.scores(paragraph, [ANGLIZISMEN])["Anglizismen"]
+        diluted = INDEX.scores(f"{filler}\n\n{paragraph}", [ANGLIZISMEN])["Anglizismen"]
+        assert diluted == alone
+
+    def test_rules_unknown_at_load_score_zero(self) -> None:
+        assert INDEX.scores("Meeting", [make_rule("Neu", "Meeting")]) == {"Neu": 0.0}
+
+    def test_empty_text_scores_zero(self) -> None:
+        assert INDEX.scores("  ", [ANGLIZISMEN]) == {"Anglizismen": 0.0}
+
+    def test_rules_without_text_are_supported(self) -> None:
+        empty = make_rule("Leer", "")
+        assert RuleIndex([empty]).scores("Text", [empty]) == {"Leer": 0.0}
@@ -0,0 +1,69 @@
+import pytest
+
+from text_mate_backend.models.rule_models import Rule
+from text_mate_backend.services.rule_packer import pack_rules
+from text_mate_tools.bench_advisor import load_rules
+
+
+def make_rule(name: str, collection: str, tokens: int) -> Rule:
+    rule = Rule(name=name, description="", file_name="f.pdf", page_number=1, example="", collection=collection)
+    rule.__dict__["prompt_tokens"] = tokens  # overrides the cached estimate
+    return rule
+
+
+def names(batches: list[list[Rule]]) -> list[list[str]]:
+    return [[rule.name for rule in batch] for batch in batches]
+
+
+class TestPromptTokens:
+    def test_estimate_is_cached_and_grows_with_content(self) -> None:
+        short = Rule(name="a", description="x", file_name="f", page_number=1, example="", collection="c")
+        long_ = short.model_copy(update={"description": "x" * 400})
+        assert long_.prompt_tokens > short.prompt_tokens
+        assert short.prompt_tokens == short.__dict__["prompt_tokens"]
+
+    def test_estimate_does_not_affect_serialization(self) -> None:
+        rule = make_rule("a", "c", 10)
+        assert "prompt_tokens" not in rule.model_dump()
+
+
+class TestPackRules:
+    def test_rejects_non_positive_capacity(self) -> None:
+        with pytest.raises(ValueError):
+            pack_rules([make_rule("a", "c", 1)], 0)
+
+    def test_empty_input(self) -> None:
+        assert pack_rules([], 100) == []
+
+    def test_fits_in_one_batch(self) -> None:
+        rules = [make_rule(n, "c", 10) for n in "abc"]
+        assert names(pack_rules(rules, 100)) == [["a", "b", "c"]]
+
+    def test_collections_never_share_a_batch(self) -> None:
+        rules = [make_rule("b1", "b", 10), make_rule("a1", "a", 10), make_rule("b2", "b", 10)]
+        assert names(pack_rules(rules, 100)) == [["a1"], ["b1", "b2"]]
+
+    def test_batches_are_balanced(self) -> None:
+        # Slicing three rules per batch would give 120 / 60 tokens.
+        rules = [make_rule(n, "c", t) for n, t in zip("abcdef", (50, 40, 30, 30, 20, 10), strict=True)]
+        batches = pack_rules(rules, 100)
+        assert [sum(rule.prompt_tokens for rule in batch) for batch in batches] == [90, 90]
+        assert names(batches) == [["a", "d", "f"], ["b", "c", "e"]]
+
+    def test_opens_more_batches_when_rules_do_not_fit(self) -> None:
+        rules = [make_rule(n, "c", 60) for n in "abc"]
+        batches = pack_rules(rules, 100)
+        assert len(batches) == 3
+
+    def test_oversized_rule_gets_its_own_batch(self) -> None:
+        rules = [make_rule("big", "c", 500), make_rule("a", "c", 10), make_rule("b", "c", 10)]
+        assert sorted(names(pack_rules(rules, 100))) == [["a", "b"], ["big"]]
+
+    @pytest.mark.parametrize("capacity", [200, 800, 2000, 100_000])
+    def test_repository_rules_packed_once_within_capacity(self, capacity: int) -> None:
+        rules = load_rules()
+        batches = pack_rules(rules, capacity)
+        assert sorted(rule.name for batch in batches for rule in batch) == sorted(rule.name for rule in rules)
+        for batch in batches:
+            assert len({rule.collection for rule in batch}) == 1
+            assert len(batch) == 1 or sum(rule.prompt_tokens for rule in batch) <= capacity
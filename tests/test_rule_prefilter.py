@@ -0,0 +1,82 @@
+"""Unit tests for the advisor relevance prefilter (RulePrefilter)."""
+
+from pathlib import Path
+
+import pytest
+
+from text_mate_backend.models.rule_models import CheckerSpec, Rule
+from text_mate_backend.services.rule_checker import RuleCheckerEngine
+from text_mate_backend.services.rule_index import RuleIndex
+from text_mate_backend.services.rule_prefilter import RulePrefilter
+from text_mate_tools.advisor_eval.models import EvalCase
+from text_mate_tools.bench_advisor import load_rules
+
+
+def make_rule(name: str, description: str, pattern: str | None = None) -> Rule:
+    return Rule(
+        name=name,
+        description=description,
+        file_name="doc.pdf",
+        page_number=1,
+        example="",
+        collection="bundeskanzlei",
+        checker=CheckerSpec(pattern=pattern) if pattern else None,
+    )
+
+
+ZAHLEN = make_rule("Zahlen", "Kurze Zahlen im Fliesstext ausschreiben", pattern=r"\d")
+ANGLIZISMEN = make_rule("Anglizismen", "Unnötige Anglizismen wie Meeting oder Deadline ersetzen")
+FLOSKELN = make_rule("Floskeln", "Steife Floskeln wie höflich ersuchen vermeiden")
+RULES = [ZAHLEN, ANGLIZISMEN, FLOSKELN]
+INDEX = RuleIndex(RULES)
+
+
+def names(rules: list[Rule]) -> list[str]:
+    return [rule.name for rule in rules]
+
+
+class TestRulePrefilter:
+    def test_unknown_mode_rejected(self) -> None:
+        with pytest.raises(ValueError):
+            RulePrefilter(INDEX, mode="sometimes")
+
+    def test_off_keeps_everything(self) -> None:
+        decision = RulePrefilter(INDEX, mode="off").apply("Kein Treffer.", RULES, RuleCheckerEngine(RULES))
+        assert names(decision.kept) == names(RULES)
+        assert decision.skipped == decision.dropped == []
+
+    def test_conservative_skips_only_rules_without_trigger(self) -> None:
+        prefilter = RulePrefilter(INDEX, mode="conservative", min_score=1.0)
+        decision = prefilter.apply("Das Meeting findet statt.", RULES, RuleCheckerEngine(RULES))
+        assert names(decision.skipped) == ["Zahlen"]
+        assert names(decision.kept) == ["Anglizismen", "Floskeln"]
+        assert decision.dropped == []
+
+    def test_aggressive_drops_low_scores_but_keeps_triggered_rules(self) -> None:
+        prefilter = RulePrefilter(INDEX, mode="aggressive", min_score=0.2)
+        decision = prefilter.apply("Am 3. Meeting gab es eine Deadline.", RULES, RuleCheckerEngine(RULES))
+        assert names(decision.kept) == ["Zahlen", "Anglizismen"]
+        assert names(decision.dropped) == ["Floskeln"]
+
+    def test_cut_off_keeps_most_relevant_rules_in_input_order(self) -> None:
+        prefilter = RulePrefilter(INDEX, mode="off", max_rules=2)
+        decision = prefilter.apply("Steife Floskeln und ein Meeting.", RULES, RuleCheckerEngine(RULES))
+        assert names(decision.ranked_out) == ["Zahlen"]
+        assert names(decision.kept) == ["Anglizismen", "Floskeln"]
+
+    def test_cut_off_applies_after_skipping(self) -> None:
+        prefilter = RulePrefilter(INDEX, mode="conservative", max_rules=2)
+        decision = prefilter.apply("Steife Floskeln und ein Meeting.", RULES, RuleCheckerEngine(RULES))
+        assert names(decision.skipped) == ["Zahlen"]
+        assert decision.ranked_out == []
+
+
+def test_conservative_mode_keeps_every_expected_rule_of_the_eval_cases() -> None:
+    rules = load_rules()
+    prefilter = RulePrefilter(RuleIndex(rules), mode="conservative")
+    for path in sorted(Path("evals/advisor/cases").glob("*.json")):
+        case = EvalCase.model_validate_json(path.read_text())
+        selected = [rule for rule in rules if rule.collection in case.collections]
+        decision = prefilter.apply(case.text, selected, RuleCheckerEngine(selected))
+        expected = {violation.rule_name for violation in case.expected}
+        assert not expected & set(names(decision.skipped)), case.id
@@ -0,0 +1,49 @@
+import json
+
+from text_mate_backend.agents.agent_types.violation_detection_agent import render_instruction
+from text_mate_backend.agents.rule_prompt import render_rules, schema_text
+from text_mate_backend.models.rule_models import DetectionResult, Rule, RulesContainer
+from text_mate_tools.bench_advisor import render_legacy_instruction
+
+
+def make_rule(**update: object) -> Rule:
+    # Built fresh: model_copy would carry over the cached prompt_block.
+    fields: dict[str, object] = {
+        "name": "Kurze Zahlen",
+        "description": "Kurze Zahlen ausschreiben.",
+        "file_name": "regeln.pdf",
+        "page_number": 42,
+        "example": "Falsch: 3 | Richtig: drei",
+        "collection": "bundeskanzlei",
+    }
+    return Rule.model_validate(fields | update)
+
+
+RULE = make_rule()
+
+
+def test_rule_block_holds_only_what_the_model_needs() -> None:
+    block = render_rules([RULE, make_rule(name="Guillemets")])
+    assert block == (
+        "### Kurze Zahlen\nKurze Zahlen ausschreiben.\nBeispiel: Falsch: 3 | Richtig: drei\n\n"
+        "### Guillemets\nKurze Zahlen ausschreiben.\nBeispiel: Falsch: 3 | Richtig: drei"
+    )
+    assert "regeln.pdf" not in block and "42" not in block and "bundeskanzlei" not in block
+
+
+def test_schema_text_is_computed_once() -> None:
+    text = schema_text(DetectionResult)
+    assert schema_text(DetectionResult) is text
+    assert json.loads(text) == DetectionResult.model_json_schema()
+
+
+def test_instruction_is_smaller_than_legacy_rendering() -> None:
+    deps = RulesContainer(rules=[RULE] * 10)
+    compact = render_instruction(deps)
+    assert "### Kurze Zahlen" in compact
+    assert len(compact) < len(render_legacy_instruction(deps))
+
+
+def test_prompt_tokens_follow_the_block() -> None:
+    longer = make_rule(file_name="x" * 400)
+    assert longer.prompt_tokens == RULE.prompt_tokens
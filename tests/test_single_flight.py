@@ -0,0 +1,160 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+
+from text_mate_backend.utils.single_flight import SingleFlight, single_flight_key
+
+
+def test_key_separates_parts() -> None:
+    assert single_flight_key("ab", "c") != single_flight_key("a", "bc")
+    assert single_flight_key("a", "b") == single_flight_key("a", "b")
+
+
+def test_concurrent_calls_share_one_computation() -> None:
+    calls = 0
+
+    async def compute() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def scenario() -> list[int]:
+        flights = SingleFlight("test")
+        results = await asyncio.gather(*(flights.run("k", compute) for _ in range(3)))
+        assert flights.stats() == {"leaders": 1, "coalesced": 2, "coalesced_rate": 2 / 3}
+        return list(results)
+
+    assert asyncio.run(scenario()) == [42, 42, 42]
+    assert calls == 1
+
+
+def test_ended_computations_are_not_shared() -> None:
+    calls = 0
+
+    async def compute() -> int:
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def scenario() -> tuple[int, int]:
+        flights = SingleFlight("test")
+        return await flights.run("k", compute), await flights.run("k", compute)
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_error_reaches_every_caller() -> None:
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario() -> list[BaseException | int]:
+        flights = SingleFlight("test")
+        return await asyncio.gather(flights.run("k", fail), flights.run("k", fail), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_leaves_computation_to_the_others() -> None:
+    cancelled = False
+
+    async def compute() -> str:
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        return "done"
+
+    async def scenario() -> str:
+        flights = SingleFlight("test")
+        leaving = asyncio.create_task(flights.run("k", compute))
+        staying = asyncio.create_task(flights.run("k", compute))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(scenario()) == "done"
+    assert not cancelled
+
+
+def test_last_caller_leaving_cancels_computation() -> None:
+    cancelled = asyncio.Event()
+
+    async def compute() -> str:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "done"
+
+    async def scenario() -> tuple[bool, str]:
+        flights = SingleFlight("test")
+        caller = asyncio.create_task(flights.run("k", compute))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        async def quick() -> str:
+            return "fresh"
+
+        # A new caller starts a new computation instead of joining the cancelled one.
+        return cancelled.is_set(), await flights.run("k", quick)
+
+    assert asyncio.run(scenario()) == (True, "fresh")
+
+
+async def numbers(gate: asyncio.Event) -> AsyncIterator[int]:
+    yield 1
+    await gate.wait()
+    yield 2
+    yield 3
+
+
+def test_late_subscriber_gets_the_whole_stream() -> None:
+    produced = 0
+
+    async def counted(gate: asyncio.Event) -> AsyncIterator[int]:
+        nonlocal produced
+        produced += 1
+        async for item in numbers(gate):
+            yield item
+
+    async def scenario() -> tuple[list[int], list[int]]:
+        flights = SingleFlight("test")
+        gate = asyncio.Event()
+        early = flights.stream("k", lambda: counted(gate))
+        first = [await anext(early)]
+        late = asyncio.create_task(_collect(flights.stream("k", lambda: counted(gate))))
+        await asyncio.sleep(0)
+        gate.set()
+        first += [item async for item in early]
+        return first, await late
+
+    assert asyncio.run(scenario()) == ([1, 2, 3], [1, 2, 3])
+    assert produced == 1
+
+
+def test_stream_error_follows_the_items_before_it() -> None:
+    async def failing() -> AsyncIterator[int]:
+        yield 1
+        raise ValueError("boom")
+
+    async def scenario() -> list[int]:
+        flights = SingleFlight("test")
+        received: list[int] = []
+        with pytest.raises(ValueError):
+            async for item in flights.stream("k", failing):
+                received.append(item)
+        return received
+
+    assert asyncio.run(scenario()) == [1]
+
+
+async def _collect(stream: AsyncIterator[int]) -> list[int]:
+    return [item async for item in stream]
@@ -0,0 +1,53 @@
+import asyncio
+import gc
+
+from text_mate_backend.services.span_resolver import SpanResolver, find_source
+from text_mate_backend.utils.interval_index import IntervalIndex
+from text_mate_backend.utils.text_index import TextIndex
+
+TEXT = "Die Frist ist abgelaufen. Wir haben Ihr Gesuch um Verlängerung der Frist erhalten."
+SOURCES = ["Frist", "gesuch um", "Xesuch um Verlängerung", "die Frist ist abgelaufn", "kommt nicht vor"]
+
+
+def resolve_all(resolver: SpanResolver, index: TextIndex) -> list[tuple[int, int] | None]:
+    async def scenario() -> list[tuple[int, int] | None]:
+        return [await resolver.find_source(source, index, IntervalIndex([(0, 5)])) for source in SOURCES]
+
+    return asyncio.run(scenario())
+
+
+def test_exact_hits_are_resolved_inline() -> None:
+    resolver = SpanResolver(workers=0)
+    index = TextIndex.from_text(TEXT)
+    assert resolve_all(resolver, index) == [find_source(source, index, IntervalIndex([(0, 5)])) for source in SOURCES]
+    assert resolver.stats() == {"mode": "inline", "inline": 5, "offloaded": 0, "offloaded_ms": 0}
+
+
+def test_worker_processes_agree_with_inline_and_get_the_text_once() -> None:
+    resolver = SpanResolver(workers=2, threads=False)
+    index = TextIndex.from_text(TEXT)
+    try:
+        found = resolve_all(resolver, index)
+        shipped = len(resolver._segments)
+        stats = resolver.stats()
+        del index
+        gc.collect()
+        released = not resolver._segments
+    finally:
+        resolver.close()
+
+    assert found == [find_source(source, TextIndex.from_text(TEXT), IntervalIndex([(0, 5)])) for source in SOURCES]
+    assert (stats["mode"], stats["inline"], stats["offloaded"]) == ("processes", 2, 3)
+    assert shipped == 1
+    assert released
+
+
+def test_worker_threads_agree_with_inline() -> None:
+    resolver = SpanResolver(workers=2, threads=True)
+    index = TextIndex.from_text(TEXT)
+    try:
+        found = resolve_all(resolver, index)
+    finally:
+        resolver.close()
+    assert found == [find_source(source, index, IntervalIndex([(0, 5)])) for source in SOURCES]
+    assert (resolver.mode, resolver.inline, resolver.offloaded, resolver._segments) == ("threads", 2, 3, {})
@@ -0,0 +1,185 @@
+"""Unit tests for the per-request TextIndex used by advisor span resolution.
+
+The reference functions below are the straightforward per-call implementations
+the index replaces; the index must agree with them on every offset.
+"""
+
+import random
+
+import pytest
+
+from text_mate_backend.utils.text_index import (
+    TextIndex,
+    group_into_windows,
+    normalize_whitespace,
+    split_into_paragraphs,
+    split_into_search_units,
+)
+
+SAMPLES = [
+    "",
+    "abc",
+    "Die Anhörung beginnt um 9:30 Uhr.  Die zweite   Sitzung\tbeginnt\n\num 9:30 Uhr.",
+    "  führende und nachfolgende Leerzeichen  ",
+    "Ein Satz... noch einer?! Und ein dritter\nohne Punkt",
+    "Test 🎉 Anhörung. 👍🏽 Grüße und Dank!",
+    "...",
+]
+
+
+def reference_map_normalized_to_original(original: str, normalized: str, norm_pos: int) -> int | None:
+    orig_pos = 0
+    norm_idx = 0
+    while norm_idx < norm_pos and orig_pos < len(original):
+        if normalized[norm_idx] == original[orig_pos] and not original[orig_pos].isspace():
+            norm_idx += 1
+            orig_pos += 1
+        elif normalized[norm_idx].isspace() and original[orig_pos].isspace():
+            norm_idx += 1
+            orig_pos += 1
+            while orig_pos < len(original) and original[orig_pos].isspace():
+                orig_pos += 1
+        else:
+            return None
+    return orig_pos if norm_idx == norm_pos else None
+
+
+def reference_surrounding_unit(text: str, pos: int) -> tuple[str, int] | None:
+    for unit_text, unit_start in split_into_search_units(text):
+        if unit_start <= pos < unit_start + len(unit_text):
+            return unit_text, unit_start
+    return None
+
+
+def reference_utf16(text: str, offset: int) -> int:
+    return sum(2 if ord(ch) >= 0x10000 else 1 for ch in text[:offset])
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    alphabet = "ab ß.!?\n\t  🎉Ü"
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+class TestTextIndexMatchesReference:
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_views(self, text: str) -> None:
+        index = TextIndex.from_text(text)
+        assert index.lower == text.lower()
+        assert index.normalized == normalize_whitespace(text)
+        assert list(index.units) == split_into_search_units(text)
+
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_normalized_offsets(self, text: str) -> None:
+        index = TextIndex.from_text(text)
+        for norm_pos in range(len(index.normalized) + 2):
+            assert index.normalized_to_original(norm_pos) == reference_map_normalized_to_original(
+                text, index.normalized, norm_pos
+            )
+
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_unit_lookup(self, text: str) -> None:
+        index = TextIndex.from_text(text)
+        for pos in range(len(text) + 1):
+            assert index.unit_at(pos) == reference_surrounding_unit(text, pos)
+
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_utf16_offsets(self, text: str) -> None:
+        index = TextIndex.from_text(text)
+        for pos in range(len(text) + 2):
+            assert index.to_utf16(pos) == reference_utf16(text, pos)
+
+    def test_randomised_texts(self) -> None:
+        rng = random.Random(1234)
+        for _ in range(200):
+            text = random_text(rng, rng.randint(0, 60))
+            index = TextIndex.from_text(text)
+            for pos in range(len(text) + 1):
+                assert index.unit_at(pos) == reference_surrounding_unit(text, pos)
+                assert index.to_utf16(pos) == reference_utf16(text, pos)
+            for norm_pos in range(len(index.normalized) + 1):
+                assert index.normalized_to_original(norm_pos) == reference_map_normalized_to_original(
+                    text, index.normalized, norm_pos
+                )
+
+
+class TestTextIndexBmpShortcut:
+    def test_bmp_text_has_no_utf16_table(self) -> None:
+        assert TextIndex.from_text("Grüße Anhörung").utf16_offsets is None
+
+    def test_supplementary_text_has_utf16_table(self) -> None:
+        assert TextIndex.from_text("🎉Anhörung").utf16_offsets is not None
+
+
+class TestSplitIntoParagraphs:
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [
+            ("", []),
+            ("  \n ", []),
+            ("Ein Absatz.", ["Ein Absatz."]),
+            ("Zeile eins\nZeile zwei", ["Zeile eins", "Zeile zwei"]),
+            (" Erster. \n \n  Zweiter.\n", ["Erster.", "Zweiter."]),
+            ("A\n\n\n  \n\nB", ["A", "B"]),
+        ],
+    )
+    def test_spans(self, text: str, expected: list[str]) -> None:
+        assert [text[start:end] for start, end in split_into_paragraphs(text)] == expected
+
+    def test_long_paragraph_breaks_at_sentences(self) -> None:
+        text = "Erster Satz. Zweiter Satz! Dritter Satz?\nKurz."
+        spans = split_into_paragraphs(text, 26)
+        assert [text[start:end] for start, end in spans] == ["Erster Satz. Zweiter Satz!", "Dritter Satz?", "Kurz."]
+
+    def test_long_sentence_stays_whole(self) -> None:
+        text = "Ein langer Satz ohne Ende. Kurz."
+        assert [text[start:end] for start, end in split_into_paragraphs(text, 10)] == [
+            "Ein langer Satz ohne Ende.",
+            "Kurz.",
+        ]
+
+
+class TestGroupIntoWindows:
+    TEXT = "Eins.\n\nZwei.\n\nDrei ist länger.\n\nVier."
+
+    def windows(self, spans: list[tuple[int, int]], max_chars: int) -> list[list[str]]:
+        return [
+            [self.TEXT[start:end] for start, end in window]
+            for window in group_into_windows(self.TEXT, spans, max_chars)
+        ]
+
+    def test_adjacent_paragraphs_fill_a_window(self) -> None:
+        spans = split_into_paragraphs(self.TEXT)
+        assert self.windows(spans, 14) == [["Eins.", "Zwei."], ["Drei ist länger."], ["Vier."]]
+        assert self.windows(spans, 1000) == [["Eins.", "Zwei.", "Drei ist länger.", "Vier."]]
+
+    def test_window_never_skips_a_paragraph(self) -> None:
+        first, _, third, fourth = split_into_paragraphs(self.TEXT)
+        assert self.windows([first, third, fourth], 1000) == [["Eins."], ["Drei ist länger.", "Vier."]]
+
+    def test_single_newline_text_is_chunked(self) -> None:
+        text = "\n".join(f"Absatz {i} hat einen Satz. Und noch einen." for i in range(100))
+        windows = group_into_windows(text, split_into_paragraphs(text, 200), 200)
+        assert len(windows) == 25
+        assert all(window[-1][1] - window[0][0] <= 200 for window in windows)
+
+    def test_oversized_paragraph_forms_its_own_window(self) -> None:
+        assert self.windows(split_into_paragraphs(self.TEXT), 3) == [
+            ["Eins."],
+            ["Zwei."],
+            ["Drei ist länger."],
+            ["Vier."],
+        ]
+
+
+class TestNeighbouringSentences:
+    INDEX = TextIndex.from_text("Erster Satz. Zweiter Satz.\n\nDritter Satz")
+
+    def test_sentence_before(self) -> None:
+        assert self.INDEX.sentence_before(0) == ""
+        assert self.INDEX.sentence_before(self.INDEX.text.index("Dritter")) == "Zweiter Satz."
+        assert self.INDEX.sentence_before(self.INDEX.text.index("Satz.")) == ""
+
+    def test_sentence_after(self) -> None:
+        assert self.INDEX.sentence_after(self.INDEX.text.index("Satz. Zweiter") + 5) == "Zweiter Satz."
+        assert self.INDEX.sentence_after(self.INDEX.text.index("Dritter") - 1) == "Dritter Satz"
+        assert self.INDEX.sentence_after(len(self.INDEX.text)) == ""
@@ -0,0 +1,74 @@
+import pytest
+
+from text_mate_backend.utils.ttl_cache import TtlLruCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(max_bytes: int = 10, ttl: float = 60, clock: FakeClock | None = None) -> TtlLruCache[str]:
+    return TtlLruCache(max_bytes=max_bytes, ttl_seconds=ttl, sizeof=len, clock=clock or FakeClock())
+
+
+class TestTtlLruCache:
+    def test_rejects_negative_limits(self) -> None:
+        with pytest.raises(ValueError):
+            make_cache(max_bytes=-1)
+
+    def test_hit_and_miss_counted(self) -> None:
+        cache = make_cache()
+        assert cache.get("a") is None
+        cache.put("a", "xyz")
+        assert cache.get("a") == "xyz"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["bytes"]) == (1, 1, 3)
+        assert stats["hit_rate"] == 0.5
+
+    def test_least_recently_used_evicted_by_byte_cap(self) -> None:
+        cache = make_cache(max_bytes=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        assert cache.get("a") == "aaaa"  # b is now least recently used
+        cache.put("c", "cccc")
+        assert cache.get("b") is None
+        assert cache.get("a") == "aaaa"
+        assert cache.get("c") == "cccc"
+        assert cache.evictions == 1
+        assert cache.stats()["bytes"] == 8
+
+    def test_replacing_a_key_updates_size(self) -> None:
+        cache = make_cache(max_bytes=10)
+        cache.put("a", "aaaaaaaa")
+        cache.put("a", "aa")
+        assert cache.stats()["bytes"] == 2
+        assert len(cache) == 1
+
+    def test_oversized_entry_not_stored(self) -> None:
+        cache = make_cache(max_bytes=3)
+        cache.put("a", "abc")
+        cache.put("b", "abcd")
+        assert cache.get("b") is None
+        assert cache.get("a") == "abc"
+        assert cache.evictions == 0
+
+    def test_expired_entry_is_a_miss(self) -> None:
+        clock = FakeClock()
+        cache = make_cache(ttl=10, clock=clock)
+        cache.put("a", "x")
+        clock.now = 9.9
+        assert cache.get("a") == "x"
+        clock.now = 10.0
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+        assert len(cache) == 0
+
+    def test_disabled_cache_stores_nothing(self) -> None:
+        cache = make_cache(max_bytes=0)
+        cache.put("a", "x")
+        assert cache.get("a") is None
+        assert not cache.enabled